@@ -1,20 +1,41 @@
-﻿from flask import Flask, render_template, redirect, url_for, session, request, jsonify
+﻿from flask import Flask, render_template, redirect, url_for, session, request, jsonify, g, send_file, abort, send_from_directory
 from flask import Response
 from functools import wraps
-from datetime import timedelta, date, datetime
+from collections import OrderedDict
+from datetime import timedelta, datetime, timezone
 import os
 import json
+import bisect
+import copy
+import cProfile
+import importlib
+import io
+import mimetypes
+import pstats
+import random
+import re
 import sqlite3
-import subprocess
+import sys
 import time
 import threading
-from urllib.error import HTTPError, URLError
-from urllib.request import urlopen, Request as UrlRequest
-from urllib.parse import quote
+import gzip
+import http.client
+from urllib.request import urlopen
+from urllib.parse import quote, urlsplit
+from werkzeug.http import parse_accept_header
+from werkzeug.security import safe_join
 
-app = Flask(__name__)
+try:
+    import brotli
+except ImportError:  # brotli opsiyonel; yoksa yalnizca gzip kullanilir
+    brotli = None
+
+# realpath: deploy_delta.py release symlink'ini degistirdiginde eski worker'lar
+# kapanana kadar kendi release'inin sablon/statik dosyalarini okumaya devam eder.
+BASE_DIR = os.path.dirname(os.path.realpath(__file__))
+
+app = Flask(__name__, root_path=BASE_DIR)
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.environ.get('MAZZEL_DATA_DIR', os.path.join(BASE_DIR, 'data'))
 
 SETTINGS_FILE = os.environ.get('MAZZEL_SETTINGS_FILE', os.path.join(DATA_DIR, 'settings.json'))
@@ -53,19 +74,462 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-# Ayarlar dosyasi: SETTINGS_FILE env ile override edilebilir.
+# ── Metrics (Prometheus text format) ────────────────────────
+# Sayaclar ve histogramlar process icinde tutulur, /metrics Prometheus text formatinda
+# doner. Sicak yolda maliyet bir lock + bisect; cache oranlari gibi degerler yalnizca
+# scrape aninda mevcut stats() fonksiyonlarindan okunur. gunicorn altinda her worker
+# kendi degerlerini tutar; cevap veren worker gateway_process_start_time_seconds{pid}'de gorunur.
+_metrics_raw = (os.environ.get('MAZZEL_METRICS') or 'on').lower().strip()
+MAZZEL_METRICS_ENABLED = _metrics_raw in ('1', 'true', 'yes', 'on')
+MAZZEL_METRICS_TOKEN = os.environ.get('MAZZEL_METRICS_TOKEN')
+# Localhost'tan tokensiz scrape yalnizca acikca istenirse: reverse proxy X-Forwarded-For
+# eklemezse ya da ayni makinedeki herhangi bir surec icin /metrics acik kalmasin.
+_metrics_allow_local_raw = (os.environ.get('MAZZEL_METRICS_ALLOW_LOCAL') or 'off').lower().strip()
+MAZZEL_METRICS_ALLOW_LOCAL = _metrics_allow_local_raw in ('1', 'true', 'yes', 'on')
+
+_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# SQLite ifadeleri ve JSON store okuma/yazma icin daha ince taneli kovalar.
+_FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+def _metric_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _metric_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_metric_label_value(value)}"' for name, value in pairs) + '}'
+
+
+def _metric_number(value):
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for labelvalues, value in items:
+            yield self.name, _metric_labels(self.labelnames, labelvalues), value
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=_LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}  # labelvalues -> [kova sayilari (+Inf dahil), toplam]
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self):
+        with self._lock:
+            items = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._series.items())
+        for labelvalues, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                yield (self.name + '_bucket',
+                       _metric_labels(self.labelnames, labelvalues, [('le', _metric_number(bound))]),
+                       cumulative)
+            labels = _metric_labels(self.labelnames, labelvalues)
+            yield self.name + '_sum', labels, total
+            yield self.name + '_count', labels, cumulative
+
+
+class CallbackMetric:
+    """Gauge/counter whose samples are read from a function at scrape time."""
+
+    def __init__(self, name, documentation, labelnames, collect, kind='gauge'):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+        self._collect = collect
+
+    def samples(self):
+        for labelvalues, value in self._collect():
+            if value is not None:
+                yield self.name, _metric_labels(self.labelnames, labelvalues), value
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            try:
+                samples = list(metric.samples())
+            except Exception as e:
+                app.logger.warning('Metric %s could not be collected: %s', metric.name, e)
+                continue
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in samples:
+                lines.append(f'{name}{labels} {_metric_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+_metrics = MetricsRegistry()
+_http_requests = _metrics.register(Counter(
+    'gateway_http_requests_total', 'HTTP requests handled, by Flask endpoint.',
+    ('endpoint', 'method', 'status')))
+_http_request_duration = _metrics.register(Histogram(
+    'gateway_http_request_duration_seconds', 'Time until the response object is ready.',
+    ('endpoint', 'method', 'status')))
+_upstream_duration = _metrics.register(Histogram(
+    'gateway_upstream_request_duration_seconds', 'Upstream time to headers (and small bodies).',
+    ('upstream', 'method', 'status')))
+_upstream_errors = _metrics.register(Counter(
+    'gateway_upstream_errors_total', 'Upstream calls that failed or were rejected locally.',
+    ('upstream', 'kind')))
+_sqlite_query_duration = _metrics.register(Histogram(
+    'gateway_sqlite_query_duration_seconds', 'SQLite statement execution time.',
+    ('db', 'operation', 'table'), _FAST_BUCKETS))
+_sqlite_fetch_duration = _metrics.register(Histogram(
+    'gateway_sqlite_fetch_duration_seconds', 'SQLite time spent stepping result rows in fetch*().',
+    ('db', 'operation', 'table'), _FAST_BUCKETS))
+_store_duration = _metrics.register(Histogram(
+    'gateway_store_duration_seconds', 'JSON store load/save time.',
+    ('store', 'operation'), _FAST_BUCKETS))
+
+
+def _observe_store(store, operation, started):
+    _store_duration.observe(time.perf_counter() - started, store, operation)
+
+
+_SQL_TABLE_PATTERN = re.compile(r'\b(?:FROM|INTO|UPDATE|TABLE(?: IF NOT EXISTS)?|ON)\s+"?(\w+)', re.IGNORECASE)
+_sql_labels_cache = {}
+
+
+def _sql_labels(sql):
+    """(operation, table) for a statement; cached since the app uses a fixed set of queries."""
+    labels = _sql_labels_cache.get(sql)
+    if labels is None:
+        words = sql.split(None, 1)
+        operation = words[0].upper() if words else ''
+        match = _SQL_TABLE_PATTERN.search(sql)
+        labels = (operation, match.group(1) if match else '')
+        if len(_sql_labels_cache) < 1024:
+            _sql_labels_cache[sql] = labels
+    return labels
+
+
+class _TimedCursor(sqlite3.Cursor):
+    """sqlite3 cursor that records statement and fetch time per (operation, table)."""
+
+    _metric_labels = ('', '', '')
+
+    def execute(self, sql, parameters=()):
+        self._metric_labels = (self.connection.metrics_db,) + _sql_labels(sql)
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _sqlite_query_duration.observe(time.perf_counter() - started, *self._metric_labels)
 
-# TETRA local autostart (Windows only)
-TETRA_URL_DEFAULT = 'http://localhost:5173/'
-TETRA_HEALTH_URL_DEFAULT = 'http://localhost:3001/api/health'
-TETRA_AUTOSTART = os.environ.get('TETRA_AUTOSTART', 'auto').lower()
-TETRA_START_SCRIPT = os.environ.get(
-    'TETRA_START_SCRIPT',
-    os.path.join(os.path.dirname(__file__), 'start-tetra-local.bat')
-)
+    def executemany(self, sql, seq_of_parameters):
+        self._metric_labels = (self.connection.metrics_db,) + _sql_labels(sql)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _sqlite_query_duration.observe(time.perf_counter() - started, *self._metric_labels)
+
+    def _timed_fetch(self, fetch, *args):
+        started = time.perf_counter()
+        try:
+            return fetch(*args)
+        finally:
+            _sqlite_fetch_duration.observe(time.perf_counter() - started, *self._metric_labels)
+
+    def fetchone(self):
+        return self._timed_fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed_fetch(super().fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._timed_fetch(super().fetchall)
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3.connect(..., factory=TimedConnection); metrics_db names the database in labels."""
+
+    metrics_db = 'sqlite'
+
+    def cursor(self, factory=_TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def _connect_timed(path, db_name):
+    if not MAZZEL_METRICS_ENABLED:
+        return sqlite3.connect(path)
+    conn = sqlite3.connect(path, factory=TimedConnection)
+    conn.metrics_db = db_name
+    return conn
+
+
+@app.before_request
+def _metrics_start_timer():
+    if MAZZEL_METRICS_ENABLED:
+        g._metrics_started = time.perf_counter()
+
+
+@app.after_request
+def _metrics_observe_request(resp):
+    # Ilk kaydedilen after_request en son calisir: sure sikistirmayi da kapsar.
+    started = g.pop('_metrics_started', None)
+    if started is not None:
+        endpoint = request.url_rule.endpoint if request.url_rule is not None else 'unmatched'
+        labels = (endpoint, request.method, str(resp.status_code))
+        _http_requests.inc(*labels)
+        _http_request_duration.observe(time.perf_counter() - started, *labels)
+    return resp
+
+
+def _metrics_authorized():
+    if MAZZEL_METRICS_TOKEN and request.headers.get('Authorization') == f'Bearer {MAZZEL_METRICS_TOKEN}':
+        return True
+    if 'user' in session:
+        return True
+    if not MAZZEL_METRICS_ALLOW_LOCAL:
+        return False
+    # nginx arkasinda tum istekler 127.0.0.1'den gelir; X-Forwarded-For olanlar disaridandir.
+    return request.remote_addr in ('127.0.0.1', '::1') and 'X-Forwarded-For' not in request.headers
+
+
+@app.route('/metrics')
+def metrics():
+    if not MAZZEL_METRICS_ENABLED:
+        return jsonify({'error': 'Metrics disabled'}), 404
+    if not _metrics_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    resp = Response(_metrics.render(), mimetype='text/plain')
+    resp.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    resp.headers['Cache-Control'] = 'no-store'
+    return resp
+
+
+# ── Per-request profiling ───────────────────────────────────
+# Tek bir istek cProfile ile olculur: giris yapmis kullanici "X-Mazzel-Profile: 1" header'i
+# veya ?_profile=1 ile, script'ler MAZZEL_PROFILE_TOKEN ile ya da MAZZEL_PROFILE_SAMPLE_RATE
+# oraninda rastgele secilir. Profil (.prof, pstats formati) ve metadata (.json) cevap
+# gonderildikten sonra PROFILES_DIR'e yazilir. Profillenmeyen istek yalnizca bir header
+# bakisi oder. Python 3.12+ cProfile'i process genelinde tek olabildiginden ayni anda
+# tek istek profillenir; digerleri normal calisir.
+_profiling_raw = (os.environ.get('MAZZEL_PROFILING') or 'on').lower().strip()
+MAZZEL_PROFILING_ENABLED = _profiling_raw in ('1', 'true', 'yes', 'on')
+MAZZEL_PROFILE_TOKEN = os.environ.get('MAZZEL_PROFILE_TOKEN')
+PROFILES_DIR = os.environ.get('MAZZEL_PROFILES_DIR', os.path.join(DATA_DIR, 'profiles'))
+try:
+    MAZZEL_PROFILE_SAMPLE_RATE = float(os.environ.get('MAZZEL_PROFILE_SAMPLE_RATE', '0'))
+    MAZZEL_PROFILE_KEEP = int(os.environ.get('MAZZEL_PROFILE_KEEP', '100'))
+except Exception:
+    MAZZEL_PROFILE_SAMPLE_RATE = 0.0
+    MAZZEL_PROFILE_KEEP = 100
+
+_PROFILE_ID_PATTERN = re.compile(r'^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$')
+_PROFILE_SORT_KEYS = ('cumulative', 'tottime', 'ncalls')
+_profile_slot = threading.Lock()
+
+
+def _profile_trigger():
+    """Why this request should be profiled ('header', 'query', 'token', 'sample') or None."""
+    header = request.headers.get('X-Mazzel-Profile')
+    if header:
+        if MAZZEL_PROFILE_TOKEN and header == MAZZEL_PROFILE_TOKEN:
+            return 'token'
+        if header == '1' and 'user' in session:
+            return 'header'
+    elif request.args.get('_profile') == '1' and 'user' in session:
+        return 'query'
+    if (MAZZEL_PROFILE_SAMPLE_RATE > 0 and random.random() < MAZZEL_PROFILE_SAMPLE_RATE
+            and request.endpoint not in ('static', 'metrics')):
+        return 'sample'
+    return None
+
+
+@app.before_request
+def _profile_start():
+    if not MAZZEL_PROFILING_ENABLED:
+        return
+    trigger = _profile_trigger()
+    if trigger is None or not _profile_slot.acquire(blocking=False):
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:  # baska bir profiler (debugger vb.) zaten aktif
+        _profile_slot.release()
+        return
+    g._profile = (profiler, trigger, time.perf_counter(), time.thread_time())
+
+
+@app.after_request
+def _profile_finish(resp):
+    state = g.pop('_profile', None)
+    if state is None:
+        return resp
+    profiler, trigger, started, cpu_started = state
+    profiler.disable()
+    _profile_slot.release()
+    meta = {
+        'id': datetime.now().strftime('%Y%m%dT%H%M%S') + '-' + os.urandom(4).hex(),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'method': request.method,
+        'path': request.path,
+        'query': request.query_string.decode('utf-8', errors='replace'),
+        'endpoint': request.endpoint,
+        'status': resp.status_code,
+        'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+        'cpu_ms': round((time.thread_time() - cpu_started) * 1000, 2),
+        'streamed': resp.is_streamed,
+        'trigger': trigger,
+        'user': session.get('user'),
+    }
+    resp.headers['X-Profile-Id'] = meta['id']
+    # Diske yazma cevap istemciye ulastiktan sonra yapilir.
+    resp.call_on_close(lambda: _save_profile(profiler, meta))
+    return resp
+
+
+def _save_profile(profiler, meta):
+    try:
+        stats = pstats.Stats(profiler)
+        meta['total_calls'] = stats.total_calls
+        top = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:15]
+        meta['top'] = [{'function': pstats.func_std_string(func), 'ncalls': nc,
+                        'tottime_ms': round(tt * 1000, 3), 'cumtime_ms': round(ct * 1000, 3)}
+                       for func, (_cc, nc, tt, ct, _callers) in top]
+        if stats.stats:
+            (filename, line, name), (_cc, _nc, tt, _ct, _callers) = max(
+                stats.stats.items(), key=lambda item: item[1][2])
+            meta['hotspot'] = {'function': pstats.func_std_string((os.path.basename(filename), line, name)),
+                               'tottime_ms': round(tt * 1000, 3)}
+        os.makedirs(PROFILES_DIR, exist_ok=True)
+        base = os.path.join(PROFILES_DIR, meta['id'])
+        stats.dump_stats(base + '.prof')
+        with open(base + '.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        _prune_profiles()
+    except Exception as e:
+        app.logger.warning('Profile %s could not be saved: %s', meta['id'], e)
+
+
+def _prune_profiles():
+    ids = sorted(name[:-5] for name in os.listdir(PROFILES_DIR) if name.endswith('.json'))
+    for profile_id in ids[:max(0, len(ids) - MAZZEL_PROFILE_KEEP)]:
+        for ext in ('.json', '.prof'):
+            try:
+                os.remove(os.path.join(PROFILES_DIR, profile_id + ext))
+            except OSError:
+                pass
+
+
+def _list_profiles(limit=100):
+    try:
+        names = sorted((n for n in os.listdir(PROFILES_DIR) if n.endswith('.json')), reverse=True)
+    except OSError:
+        return []
+    profiles = []
+    for name in names[:limit]:
+        try:
+            with open(os.path.join(PROFILES_DIR, name), 'r', encoding='utf-8') as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return profiles
 
-_tetra_start_lock = threading.Lock()
-_tetra_starting = False
+
+def _profile_paths(profile_id):
+    if not _PROFILE_ID_PATTERN.match(profile_id):
+        abort(404)
+    base = os.path.join(PROFILES_DIR, profile_id)
+    if not os.path.exists(base + '.json'):
+        abort(404)
+    return base + '.json', base + '.prof'
+
+
+# Ortak sidebar modullere de kopyalanir; Profiller linki yalnizca bu route'un
+# oldugu gateway'de gosterilir.
+app.jinja_env.globals['profiles_enabled'] = True
+
+@app.route('/admin/profiles')
+@login_required
+def admin_profiles():
+    return render_template('page_profiles.html', user=session['user'], active_page='profiles',
+                           profiles=_list_profiles(), enabled=MAZZEL_PROFILING_ENABLED,
+                           sample_rate=MAZZEL_PROFILE_SAMPLE_RATE, profile=None)
+
+
+@app.route('/admin/profiles/<profile_id>')
+@login_required
+def admin_profile_detail(profile_id):
+    meta_path, prof_path = _profile_paths(profile_id)
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    sort = request.args.get('sort', 'cumulative')
+    if sort not in _PROFILE_SORT_KEYS:
+        sort = 'cumulative'
+    out = io.StringIO()
+    pstats.Stats(prof_path, stream=out).strip_dirs().sort_stats(sort).print_stats(60)
+    return render_template('page_profiles.html', user=session['user'], active_page='profiles',
+                           profile=meta, report=out.getvalue(), sort=sort, sort_keys=_PROFILE_SORT_KEYS)
+
+
+@app.route('/admin/profiles/<profile_id>/download')
+@login_required
+def admin_profile_download(profile_id):
+    _meta_path, prof_path = _profile_paths(profile_id)
+    return send_file(prof_path, mimetype='application/octet-stream', as_attachment=True,
+                     download_name=f'{profile_id}.prof')
+
+# Ayarlar dosyasi: SETTINGS_FILE env ile override edilebilir.
 
 def _is_http_url(url):
     return url.startswith('http://') or url.startswith('https://')
@@ -79,37 +543,188 @@ def _url_ok(url, timeout=1.0):
     except Exception:
         return False
 
-def _launch_start_script():
-    # Use the Windows shell "start" to open new consoles reliably.
-    try:
-        subprocess.Popen(f'start "" "{TETRA_START_SCRIPT}"', shell=True)
-    except Exception:
-        pass
 
-def _maybe_start_tetra(tetra_url, health_url):
-    global _tetra_starting
-    if os.name != 'nt':
-        return
-    if TETRA_AUTOSTART not in ('1', 'true', 'yes', 'auto'):
-        return
-    if _url_ok(tetra_url) and _url_ok(health_url):
-        return
-    if not os.path.exists(TETRA_START_SCRIPT):
-        return
-    with _tetra_start_lock:
-        if _tetra_starting:
-            return
-        _tetra_starting = True
+# ── Upstream health monitor & circuit breaker ───────────────
+# Upstream durumlari arka plan thread'inde periyodik olarak yoklanip cache'lenir;
+# request thread'leri yalnizca cache'lenmis durumu okur. TOKIDB icin circuit breaker
+# ardisik hatalardan sonra acilir ve istekleri 503 + Retry-After ile hemen reddeder.
+try:
+    HEALTH_CHECK_INTERVAL_SEC = float(os.environ.get('HEALTH_CHECK_INTERVAL_SEC', '10'))
+    TOKIDB_BREAKER_FAILURES = int(os.environ.get('TOKIDB_BREAKER_FAILURES', '5'))
+    TOKIDB_BREAKER_RESET_SEC = float(os.environ.get('TOKIDB_BREAKER_RESET_SEC', '30'))
+except Exception:
+    HEALTH_CHECK_INTERVAL_SEC = 10.0
+    TOKIDB_BREAKER_FAILURES = 5
+    TOKIDB_BREAKER_RESET_SEC = 30.0
+
+
+class CircuitBreaker:
+    """Closed -> open after N consecutive failures -> half-open trial after reset_timeout."""
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_started_at = None
+        self.rejected = 0
+
+    def allow(self):
+        """Return (allowed, retry_after_seconds)."""
+        now = time.monotonic()
+        with self._lock:
+            if self.state == 'closed':
+                return True, 0
+            if self.state == 'open':
+                remaining = self.opened_at + self.reset_timeout - now
+                if remaining > 0:
+                    self.rejected += 1
+                    return False, max(1, int(remaining + 0.999))
+                self.state = 'half_open'
+                self.trial_started_at = None
+            # half_open: tek deneme istegi; takilan deneme reset_timeout sonra tekrarlanir.
+            if self.trial_started_at is None or now - self.trial_started_at > self.reset_timeout:
+                self.trial_started_at = now
+                return True, 0
+            self.rejected += 1
+            return False, 1
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self.trial_started_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+                self.trial_started_at = None
+
+    def stats(self):
+        with self._lock:
+            return {'state': self.state, 'failures': self.failures, 'rejected': self.rejected}
+
+
+class HealthMonitor:
+    """Probe registered upstream URLs in a background thread and cache the result."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._targets = {}   # name -> (url, on_result)
+        self._status = {}    # name -> dict
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def watch(self, name, url, on_result=None):
+        with self._lock:
+            self._targets[name] = (url, on_result)
+            self._status.setdefault(name, {'url': url, 'ok': None, 'checked_at': None,
+                                           'latency_ms': None, 'consecutive_failures': 0})
+
+    def status(self, name):
+        with self._lock:
+            return dict(self._status.get(name) or {'ok': None})
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(st) for name, st in self._status.items()}
+
+    def probe(self, name):
+        url, on_result = self._targets[name]
+        started = time.monotonic()
+        ok = _url_ok(url)
+        with self._lock:
+            st = self._status[name]
+            st['ok'] = ok
+            st['checked_at'] = datetime.now().isoformat(timespec='seconds')
+            st['latency_ms'] = round((time.monotonic() - started) * 1000, 1)
+            st['consecutive_failures'] = 0 if ok else st['consecutive_failures'] + 1
+        if on_result is not None:
+            on_result(ok)
+        return ok
+
+    def request_probe(self):
+        self._wake.set()
+
+    @property
+    def started(self):
+        return self._thread is not None
+
+    def _run(self):
+        while not self._stop.is_set():
+            for name in list(self._targets):
+                try:
+                    self.probe(name)
+                except Exception as e:
+                    app.logger.warning('Health probe %s failed: %s', name, e)
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='health-monitor', daemon=True)
+            self._thread.start()
+
+
+_tokidb_breaker = CircuitBreaker('tokidb', TOKIDB_BREAKER_FAILURES, TOKIDB_BREAKER_RESET_SEC)
+_health_monitor = HealthMonitor(HEALTH_CHECK_INTERVAL_SEC)
+
+# ── Settings cache ──────────────────────────────────────────
+# settings.json bellekte surumlu olarak tutulur; save_settings surumu artirir. Baska
+# bir worker dosyayi degistirirse mtime en gec MAZZEL_SETTINGS_RECHECK_SEC sonra fark edilir.
+try:
+    MAZZEL_SETTINGS_RECHECK_SEC = float(os.environ.get('MAZZEL_SETTINGS_RECHECK_SEC', '2'))
+except Exception:
+    MAZZEL_SETTINGS_RECHECK_SEC = 2.0
+
+_settings_lock = threading.Lock()
+_settings_state = {'version': 0, 'settings': None, 'mtime': None, 'checked_at': 0.0}
+
+
+def _settings_mtime():
     try:
-        _launch_start_script()
-        for _ in range(20):
-            if _url_ok(tetra_url):
-                break
-            time.sleep(0.5)
-    finally:
-        _tetra_starting = False
+        return os.path.getmtime(SETTINGS_FILE)
+    except OSError:
+        return None
+
+
+def _settings_snapshot():
+    """Return (version, settings) from the cache; the dict is shared and must not be mutated."""
+    now = time.monotonic()
+    with _settings_lock:
+        state = _settings_state
+        if state['settings'] is not None and now - state['checked_at'] < MAZZEL_SETTINGS_RECHECK_SEC:
+            return state['version'], state['settings']
+        mtime = _settings_mtime()
+        if state['settings'] is None or mtime != state['mtime']:
+            state['settings'] = _read_settings_file()
+            state['mtime'] = mtime
+            state['version'] += 1
+        state['checked_at'] = now
+        return state['version'], state['settings']
+
+
+def settings_version():
+    return _settings_snapshot()[0]
+
 
 def load_settings():
+    """Return a private copy of the settings; callers may modify and save_settings() it."""
+    return copy.deepcopy(_settings_snapshot()[1])
+
+
+def _read_settings_file():
     default_settings = {
         "theme": "dark",
         "site_title": "Mazzel Works Portal",
@@ -133,9 +748,9 @@ def load_settings():
             {"name": "Hizmetler", "url": "/hizmetler", "enabled": True},
             {"name": "Referanslar", "url": "/referanslar", "enabled": True},
             {"name": "İletişim", "url": "/iletisim", "enabled": True}
-        ],
-        "notifications": []
+        ]
     }
+    started = time.perf_counter()
     try:
         if os.path.exists(SETTINGS_FILE):
             with open(SETTINGS_FILE, 'r', encoding='utf-8') as f:
@@ -143,64 +758,824 @@ def load_settings():
                 default_settings.update(saved)
     except:
         pass
+    _observe_store('settings', 'load', started)
     return default_settings
 
 def save_settings(settings):
+    started = time.perf_counter()
     try:
         os.makedirs(os.path.dirname(SETTINGS_FILE), exist_ok=True)
         with open(SETTINGS_FILE, 'w', encoding='utf-8') as f:
             json.dump(settings, f, ensure_ascii=False, indent=2)
-        return True
     except:
         return False
-
-# ── Vite manifest loader for masrafci ──────────────────────────
-_masrafci_manifest_cache = None
-_masrafci_manifest_cache_mtime = None
-
-def _load_masrafci_manifest():
-    """Load Vite manifest for the masrafci app. Returns dict with 'js' and 'css' keys, or None."""
-    global _masrafci_manifest_cache, _masrafci_manifest_cache_mtime
-
-    manifest_path = os.path.join(BASE_DIR, 'static', 'apps', 'masrafci', '.vite', 'manifest.json')
-    if not os.path.exists(manifest_path):
-        _masrafci_manifest_cache = None
-        _masrafci_manifest_cache_mtime = None
-        return None
-
-    # In production mode, cache until manifest mtime changes.
-    manifest_mtime = os.path.getmtime(manifest_path)
-    if (
-        not app.debug
-        and _masrafci_manifest_cache is not None
-        and _masrafci_manifest_cache_mtime == manifest_mtime
-    ):
-        return _masrafci_manifest_cache
+    finally:
+        _observe_store('settings', 'save', started)
+    with _settings_lock:
+        # Yeniden okumak yerine kaydedilen icerik dogrudan yeni surum olur.
+        _settings_state['settings'] = copy.deepcopy(settings)
+        _settings_state['mtime'] = _settings_mtime()
+        _settings_state['version'] += 1
+        _settings_state['checked_at'] = time.monotonic()
+    _page_cache.clear()
+    return True
+
+
+# ── Rendered page cache ─────────────────────────────────────
+# Ayarlara bagli sayfalar (landing, login, hizmetler, ...) ayar surumu + tema + kullanici
+# anahtariyla bir kez render edilir; sonraki istekler dosya okumadan ve Jinja'siz doner.
+_page_cache_raw = (os.environ.get('MAZZEL_PAGE_CACHE') or 'on').lower().strip()
+MAZZEL_PAGE_CACHE_ENABLED = _page_cache_raw in ('1', 'true', 'yes', 'on')
+try:
+    MAZZEL_PAGE_CACHE_MAX_ENTRIES = int(os.environ.get('MAZZEL_PAGE_CACHE_MAX_ENTRIES', '256'))
+except Exception:
+    MAZZEL_PAGE_CACHE_MAX_ENTRIES = 256
+
+
+class PageCache:
+    """Small LRU of rendered HTML (plus precompressed variants) keyed by render inputs."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'clears': 0}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters['hits'] += 1
+            return entry
+
+    def put(self, key, body):
+        entry = {'body': body,
+                 'variants': _precompressed_variants([('Content-Type', 'text/html')], body)}
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters['evictions'] += 1
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.counters['clears'] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else None
+        return stats
+
+
+_page_cache = PageCache(MAZZEL_PAGE_CACHE_MAX_ENTRIES)
+
+
+def _render_cached_page(template, **context):
+    """render_template with the current settings, served from the page cache when possible."""
+    version, settings = _settings_snapshot()
+    if not MAZZEL_PAGE_CACHE_ENABLED or app.debug:
+        return render_template(template, settings=settings, **context)
+    key = (request.path, template, version, settings.get('theme'), context.get('user'),
+           context.get('active_page'))
+    entry = _page_cache.get(key)
+    if entry is None:
+        entry = _page_cache.put(key, render_template(template, settings=settings, **context).encode('utf-8'))
+    body, encoding = _select_cached_variant(entry, request.headers.get('Accept-Encoding'))
+    resp = Response(body, mimetype='text/html')
+    if encoding is not None:
+        resp.headers['Content-Encoding'] = encoding
+    if entry['variants']:
+        resp.vary.add('Accept-Encoding')
+    return resp
+
+# ── Fingerprinted static assets ─────────────────────────────
+# build_assets.py paylasilan css/js dosyalarinin icerik hash'li kopyalarini (.gz/.br ile)
+# static/dist'e ve manifest.json'a yazar. Sablonlar asset_url() ile hash'li adi alir; ad
+# icerikle degistigi icin bu dosyalar bir yil "immutable" cache'lenir. Manifest yoksa veya
+# debug modunda orijinal static/ dosyalari kullanilir.
+STATIC_DIST_DIR = os.path.join(BASE_DIR, 'static', 'dist')
+STATIC_IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+_static_manifest_cache = None
+_static_manifest_cache_mtime = None
+
+def _load_static_manifest():
+    """Load static/dist/manifest.json ({source name: {'file': hashed name, ...}}), or {}."""
+    global _static_manifest_cache, _static_manifest_cache_mtime
+
+    manifest_path = os.path.join(STATIC_DIST_DIR, 'manifest.json')
+    try:
+        manifest_mtime = os.path.getmtime(manifest_path)
+    except OSError:
+        _static_manifest_cache = None
+        _static_manifest_cache_mtime = None
+        return {}
+    if _static_manifest_cache is not None and _static_manifest_cache_mtime == manifest_mtime:
+        return _static_manifest_cache
 
     try:
         with open(manifest_path, 'r', encoding='utf-8') as f:
             manifest = json.load(f)
     except (json.JSONDecodeError, OSError):
-        _masrafci_manifest_cache = None
-        _masrafci_manifest_cache_mtime = None
+        return {}
+    _static_manifest_cache = manifest
+    _static_manifest_cache_mtime = manifest_mtime
+    return manifest
+
+
+def asset_url(filename):
+    """URL for a shared static asset, fingerprinted when build_assets.py has been run."""
+    if not app.debug:
+        entry = _load_static_manifest().get(filename)
+        if entry:
+            return url_for('static_dist', filename=entry['file'])
+    return url_for('static', filename=filename)
+
+
+app.jinja_env.globals['asset_url'] = asset_url
+
+
+@app.route('/static/dist/<path:filename>')
+def static_dist(filename):
+    path = safe_join(STATIC_DIST_DIR, filename)
+    if path is None or filename == 'manifest.json' or not os.path.isfile(path):
+        abort(404)
+    served, encoding = filename, None
+    accept_encoding = request.headers.get('Accept-Encoding')
+    if accept_encoding:
+        accepted = parse_accept_header(accept_encoding)
+        for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if accepted[candidate] and os.path.isfile(path + suffix):
+                served, encoding = filename + suffix, candidate
+                break
+    resp = send_from_directory(STATIC_DIST_DIR, served,
+                               mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                               max_age=STATIC_IMMUTABLE_MAX_AGE)
+    if encoding is not None:
+        resp.headers['Content-Encoding'] = encoding
+    resp.vary.add('Accept-Encoding')
+    resp.cache_control.public = True
+    resp.cache_control.immutable = True
+    return resp
+
+
+# ── Upstream HTTP connection pool ───────────────────────────
+# Proxied TOKIDB calls reuse keep-alive connections instead of opening a new TCP
+# connection per request; in-use connections per host are capped.
+try:
+    TOKIDB_POOL_MAXSIZE = int(os.environ.get('TOKIDB_POOL_MAXSIZE', '10'))
+except Exception:
+    TOKIDB_POOL_MAXSIZE = 10
+UPSTREAM_IDLE_TIMEOUT_SEC = 30.0
+UPSTREAM_STREAM_CHUNK = 64 * 1024
+
+_HOP_BY_HOP_HEADERS = {
+    'connection',
+    'keep-alive',
+    'proxy-authenticate',
+    'proxy-authorization',
+    'te',
+    'trailers',
+    'transfer-encoding',
+    'upgrade',
+}
+
+
+class UpstreamBusy(Exception):
+    """Raised when every pooled connection to a host stays in use past the timeout."""
+
+
+class UpstreamPool:
+    """Thread-safe keep-alive connection pool keyed by (scheme, host, port)."""
+
+    _IDEMPOTENT = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+    def __init__(self, maxsize_per_host=10, idle_timeout=UPSTREAM_IDLE_TIMEOUT_SEC):
+        self.maxsize_per_host = max(1, maxsize_per_host)
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._idle = {}    # key -> [(conn, last_used), ...]
+        self._slots = {}   # key -> BoundedSemaphore
+        self.created = 0
+        self.reused = 0
+
+    def _slot(self, key):
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._slots[key] = threading.BoundedSemaphore(self.maxsize_per_host)
+            return slot
+
+    def _take_idle(self, key):
+        now = time.monotonic()
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                conn, last_used = idle.pop()
+                if now - last_used < self.idle_timeout:
+                    self.reused += 1
+                    return conn
+                conn.close()
         return None
 
-    entry = None
-    for value in manifest.values():
-        if isinstance(value, dict) and value.get('isEntry'):
-            entry = value
-            break
-    if entry is None:
+    def _new_conn(self, key, timeout):
+        scheme, host, port = key
+        cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        with self._lock:
+            self.created += 1
+        return cls(host, port, timeout=timeout)
+
+    def _put_idle(self, key, conn):
+        with self._lock:
+            self._idle.setdefault(key, []).append((conn, time.monotonic()))
+
+    def urlopen(self, method, url, body=None, headers=None, timeout=10.0):
+        """Send a request and return an UpstreamResponse; the caller must close() it."""
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+        target = parts.path or '/'
+        if parts.query:
+            target = f"{target}?{parts.query}"
+        slot = self._slot(key)
+        if not slot.acquire(timeout=timeout):
+            raise UpstreamBusy(f'No free connection to {key[1]}:{key[2]}')
+        try:
+            conn = self._take_idle(key)
+            reused = conn is not None
+            if conn is None:
+                conn = self._new_conn(key, timeout)
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            try:
+                conn.request(method, target, body=body, headers=headers or {})
+                resp = conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                # Idle keep-alive baglantisi sunucu tarafinda kapanmis olabilir: bir kez tekrar dene.
+                if not reused or method not in self._IDEMPOTENT:
+                    raise
+                conn = self._new_conn(key, timeout)
+                conn.request(method, target, body=body, headers=headers or {})
+                resp = conn.getresponse()
+        except BaseException:
+            slot.release()
+            raise
+        return UpstreamResponse(self, key, conn, resp, slot)
+
+    def stats(self):
+        with self._lock:
+            idle = sum(len(v) for v in self._idle.values())
+        return {'created': self.created, 'reused': self.reused, 'idle': idle}
+
+
+class UpstreamResponse:
+    def __init__(self, pool, key, conn, resp, slot):
+        self._pool = pool
+        self._key = key
+        self._conn = conn
+        self._resp = resp
+        self._slot = slot
+        self.status = resp.status
+        self.headers = resp.headers
+
+    def iter_content(self, chunk_size=UPSTREAM_STREAM_CHUNK):
+        try:
+            while True:
+                chunk = self._resp.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            self.close()
+
+    def read(self):
+        try:
+            return self._resp.read()
+        finally:
+            self.close()
+
+    def close(self):
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        # Govde sonuna kadar okunduysa baglanti havuza geri doner.
+        if self._resp.isclosed() and not self._resp.will_close:
+            self._pool._put_idle(self._key, conn)
+        else:
+            conn.close()
+        self._slot.release()
+
+
+_upstream_pool = UpstreamPool(maxsize_per_host=TOKIDB_POOL_MAXSIZE)
+
+
+# ── Response compression ────────────────────────────────────
+# Upstream'in sikistirdigi govdeler oldugu gibi aktarilir. Gateway'in kendi JSON/HTML
+# cevaplari esik ustundeyse gzip/brotli ile sikistirilir; cache'lenen TOKIDB cevaplari
+# icin sikistirilmis varyantlar bir kez uretilip saklanir.
+_gateway_compression_raw = (os.environ.get('GATEWAY_COMPRESSION') or 'on').lower().strip()
+GATEWAY_COMPRESSION_ENABLED = _gateway_compression_raw in ('1', 'true', 'yes', 'on')
+try:
+    GATEWAY_COMPRESS_MIN_BYTES = int(os.environ.get('GATEWAY_COMPRESS_MIN_BYTES', '1024'))
+except Exception:
+    GATEWAY_COMPRESS_MIN_BYTES = 1024
+
+_COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+)
+# Istek aninda hiz, onceden sikistirilan (cache) varyantlarda oran onceliklidir.
+_COMPRESS_LEVELS = {'gzip': 6, 'br': 5}
+_PRECOMPRESS_LEVELS = {'gzip': 9, 'br': 9}
+
+
+def _supported_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def _negotiate_encoding(accept_encoding):
+    """Pick the best response encoding for an Accept-Encoding header value, or None."""
+    if not accept_encoding:
+        return None
+    return parse_accept_header(accept_encoding).best_match(_supported_encodings())
+
+
+def _is_compressible(content_type):
+    return bool(content_type) and content_type.lower().startswith(_COMPRESSIBLE_TYPES)
+
+
+def _compress_body(body, encoding, levels=_COMPRESS_LEVELS):
+    if encoding == 'br':
+        return brotli.compress(body, quality=levels['br'])
+    return gzip.compress(body, compresslevel=levels['gzip'], mtime=0)
+
+
+class CompressionStats:
+    """Byte counters for gateway-side compression and upstream pass-through."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.encodings = {}   # encoding -> {'responses', 'bytes_in', 'bytes_out'}
+        self.counters = {'passthrough': 0, 'precompressed_hits': 0, 'below_threshold': 0}
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def record(self, encoding, bytes_in, bytes_out):
+        with self._lock:
+            bucket = self.encodings.setdefault(encoding, {'responses': 0, 'bytes_in': 0, 'bytes_out': 0})
+            bucket['responses'] += 1
+            bucket['bytes_in'] += bytes_in
+            bucket['bytes_out'] += bytes_out
+
+    def stats(self):
+        with self._lock:
+            encodings = {name: dict(bucket) for name, bucket in self.encodings.items()}
+            stats = dict(self.counters)
+        bytes_in = sum(b['bytes_in'] for b in encodings.values())
+        bytes_out = sum(b['bytes_out'] for b in encodings.values())
+        stats.update(
+            enabled=GATEWAY_COMPRESSION_ENABLED,
+            available=list(_supported_encodings()),
+            min_bytes=GATEWAY_COMPRESS_MIN_BYTES,
+            encodings=encodings,
+            bytes_saved=bytes_in - bytes_out,
+            ratio=round(bytes_out / bytes_in, 4) if bytes_in else None,
+        )
+        return stats
+
+
+_compression_stats = CompressionStats()
+
+
+def _precompressed_variants(headers, body):
+    """Build {encoding: bytes} for a cacheable identity body worth compressing."""
+    if not GATEWAY_COMPRESSION_ENABLED or len(body) < GATEWAY_COMPRESS_MIN_BYTES:
+        return {}
+    content_type = ''
+    for key, value in headers:
+        lower = key.lower()
+        if lower == 'content-encoding':
+            return {}
+        if lower == 'content-type':
+            content_type = value
+    if not _is_compressible(content_type):
+        return {}
+    variants = {}
+    for encoding in _supported_encodings():
+        compressed = _compress_body(body, encoding, _PRECOMPRESS_LEVELS)
+        if len(compressed) < len(body):
+            variants[encoding] = compressed
+    return variants
+
+
+def _select_cached_variant(entry, accept_encoding):
+    """Return (body, encoding) for a cache entry given the client's Accept-Encoding."""
+    variants = entry.get('variants') or {}
+    if variants:
+        encoding = _negotiate_encoding(accept_encoding)
+        if encoding in variants:
+            body = variants[encoding]
+            _compression_stats.count('precompressed_hits')
+            _compression_stats.record(encoding, len(entry['body']), len(body))
+            return body, encoding
+    return entry['body'], None
+
+
+@app.after_request
+def _compress_response(resp):
+    """gzip/br large, buffered, compressible responses the client accepts."""
+    if not GATEWAY_COMPRESSION_ENABLED or 'Content-Encoding' in resp.headers:
+        return resp
+    if (resp.direct_passthrough or resp.is_streamed or resp.status_code < 200
+            or resp.status_code in (204, 206, 304) or request.method == 'HEAD'
+            or not _is_compressible(resp.mimetype)
+            or 'no-transform' in resp.headers.get('Cache-Control', '')):
+        return resp
+    resp.vary.add('Accept-Encoding')
+    encoding = _negotiate_encoding(request.headers.get('Accept-Encoding'))
+    if encoding is None:
+        return resp
+    body = resp.get_data()
+    if len(body) < GATEWAY_COMPRESS_MIN_BYTES:
+        _compression_stats.count('below_threshold')
+        return resp
+    compressed = _compress_body(body, encoding)
+    if len(compressed) >= len(body):
+        return resp
+    resp.set_data(compressed)
+    resp.headers['Content-Encoding'] = encoding
+    etag, weak = resp.get_etag()
+    if etag and not weak:
+        # Sikistirilmis temsil bayt bayt ayni degil: ETag zayif olarak isaretlenir.
+        resp.set_etag(etag, weak=True)
+    _compression_stats.record(encoding, len(body), len(compressed))
+    return resp
+
+
+# ── TOKIDB response cache ───────────────────────────────────
+# Idempotent GET'ler icin path bazli TTL; sure dolunca bayat cevap hemen donulur ve
+# arka planda tazelenir (stale-while-revalidate). Yazma istekleri cache'i atlar ve
+# ilgili kaynagin kayitlarini gecersiz kilar.
+_tokidb_cache_raw = (os.environ.get('TOKIDB_CACHE') or 'on').lower().strip()
+TOKIDB_CACHE_ENABLED = _tokidb_cache_raw in ('1', 'true', 'yes', 'on')
+# (upstream path prefix, ttl saniye, stale saniye); ilk eslesen kural kullanilir.
+TOKIDB_CACHE_RULES_DEFAULT = [
+    ('/api/cities', 300, 900),
+    ('/api/companies', 120, 600),
+    ('/api/projects', 60, 300),
+]
+try:
+    TOKIDB_CACHE_RULES = [tuple(r) for r in json.loads(os.environ['TOKIDB_CACHE_RULES'])]
+except (KeyError, ValueError, TypeError):
+    TOKIDB_CACHE_RULES = TOKIDB_CACHE_RULES_DEFAULT
+try:
+    TOKIDB_CACHE_MAX_BYTES = int(os.environ.get('TOKIDB_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+    TOKIDB_CACHE_MAX_ENTRY_BYTES = int(os.environ.get('TOKIDB_CACHE_MAX_ENTRY_BYTES', str(1024 * 1024)))
+except Exception:
+    TOKIDB_CACHE_MAX_BYTES = 32 * 1024 * 1024
+    TOKIDB_CACHE_MAX_ENTRY_BYTES = 1024 * 1024
+
+
+class ResponseCache:
+    """Byte-capped LRU cache of upstream responses with TTL and stale windows."""
+
+    def __init__(self, rules, max_bytes, max_entry_bytes):
+        self.rules = rules
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> entry dict
+        self._refreshing = set()
+        self._bytes = 0
+        self.counters = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'bypass': 0,
+                         'refreshes': 0, 'refresh_errors': 0, 'evictions': 0, 'invalidations': 0}
+
+    def rule_for(self, path):
+        for prefix, ttl, stale in self.rules:
+            if path == prefix or path.startswith(prefix.rstrip('/') + '/'):
+                return ttl, stale
         return None
 
-    prefix = 'apps/masrafci/'
-    result = {
-        'js': url_for('static', filename=prefix + entry['file']),
-        'css': [url_for('static', filename=prefix + c) for c in entry.get('css', [])],
-    }
-    _masrafci_manifest_cache = result
-    _masrafci_manifest_cache_mtime = manifest_mtime
-    return result
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def get(self, key):
+        """Return (entry, 'fresh' | 'stale') or (None, None)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.counters['misses'] += 1
+                return None, None
+            age = now - entry['stored_at']
+            if age > entry['ttl'] + entry['stale']:
+                self._drop(key)
+                self.counters['misses'] += 1
+                return None, None
+            self._entries.move_to_end(key)
+            if age <= entry['ttl']:
+                self.counters['hits'] += 1
+                return entry, 'fresh'
+            self.counters['stale_hits'] += 1
+            return entry, 'stale'
+
+    def put(self, key, status, headers, body, ttl, stale, variants=None):
+        if len(body) > self.max_entry_bytes:
+            return
+        variants = variants or {}
+        size = len(body) + sum(len(v) for v in variants.values())
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = {
+                'status': status, 'headers': headers, 'body': body, 'variants': variants,
+                'size': size, 'ttl': ttl, 'stale': stale, 'stored_at': time.monotonic(),
+            }
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+                self.counters['evictions'] += 1
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry['size']
+
+    def invalidate_prefix(self, path_prefix):
+        """Drop entries for ``path_prefix`` and paths below it (segment boundary)."""
+        # '/api/projects' '/api/projects-archive' kayitlarini dusurmemeli.
+        subtree = path_prefix.rstrip('/') + '/'
+        with self._lock:
+            paths = {k: urlsplit(k[0]).path for k in self._entries}
+            for key in [k for k, path in paths.items() if path == path_prefix or path.startswith(subtree)]:
+                self._drop(key)
+                self.counters['invalidations'] += 1
+
+    def refresh_async(self, key, fetch):
+        """Run ``fetch()`` in a background thread unless a refresh for key is running."""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def _run():
+            try:
+                fetch()
+                self.count('refreshes')
+            except Exception:
+                self.count('refresh_errors')
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=_run, name='tokidb-cache-refresh', daemon=True).start()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats.update(entries=len(self._entries), bytes=self._bytes, max_bytes=self.max_bytes)
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['hits'] + stats['stale_hits']) / lookups, 4) if lookups else None
+        return stats
+
+
+_tokidb_cache = ResponseCache(TOKIDB_CACHE_RULES, TOKIDB_CACHE_MAX_BYTES, TOKIDB_CACHE_MAX_ENTRY_BYTES)
+
+
+# ── Single-flight coalescing ────────────────────────────────
+# Ayni anda gelen ozdes GET'ler (url + Accept) tek upstream istegine indirgenir;
+# sonuc tum bekleyenlere dagitilir. Upstream yalnizca gateway'in internal token'ini
+# gordugu icin auth kapsami tum kullanicilar icin aynidir.
+try:
+    TOKIDB_COALESCE_MAX_BYTES = int(os.environ.get('TOKIDB_COALESCE_MAX_BYTES', str(1024 * 1024)))
+except Exception:
+    TOKIDB_COALESCE_MAX_BYTES = 1024 * 1024
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one execution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> {'done': Event, 'result': ..., 'error': ...}
+        self.counters = {'leaders': 0, 'coalesced': 0, 'unshareable': 0}
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def do(self, key, fn, timeout=None):
+        """Return (result, shared); shared is True for callers that waited on a leader."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = {'done': threading.Event(), 'result': None, 'error': None}
+                self.counters['leaders'] += 1
+                leader = True
+            else:
+                self.counters['coalesced'] += 1
+                leader = False
+
+        if not leader:
+            if not call['done'].wait(timeout):
+                raise TimeoutError('Coalesced upstream call timed out')
+            if call['error'] is not None:
+                raise call['error']
+            return call['result'], True
+
+        try:
+            call['result'] = fn()
+            return call['result'], False
+        except BaseException as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call['done'].set()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters, in_flight=len(self._calls))
+        return stats
+
+
+_tokidb_flight = SingleFlight()
+
+
+def _cacheable_headers(header_items):
+    """Return the storable header list, or None if the response must not be cached."""
+    stored = []
+    for key, value in header_items:
+        lower = key.lower()
+        if lower == 'set-cookie':
+            return None
+        if lower == 'cache-control' and ('no-store' in value.lower() or 'private' in value.lower()):
+            return None
+        if lower not in _HOP_BY_HOP_HEADERS:
+            stored.append((key, value))
+    return stored
+
+
+def _fetch_upstream_get(url, headers, timeout):
+    """GET url; small bodies are read fully so the result can be shared between waiters."""
+    started = time.perf_counter()
+    upstream_resp = _upstream_pool.urlopen('GET', url, headers=headers, timeout=timeout)
+    fetched = {'status': upstream_resp.status, 'headers': list(upstream_resp.headers.items()),
+               'body': None, 'stream': None}
+    length = upstream_resp.headers.get('Content-Length')
+    if length and length.isdigit() and int(length) <= TOKIDB_COALESCE_MAX_BYTES:
+        fetched['body'] = upstream_resp.read()
+    else:
+        fetched['stream'] = upstream_resp
+    _upstream_duration.observe(time.perf_counter() - started, 'tokidb', 'GET', str(upstream_resp.status))
+    return fetched
+
+
+def _store_in_cache(key, fetched, rule):
+    if rule is None or fetched['status'] != 200 or fetched['body'] is None:
+        return
+    stored_headers = _cacheable_headers(fetched['headers'])
+    if stored_headers is not None:
+        variants = _precompressed_variants(stored_headers, fetched['body'])
+        _tokidb_cache.put(key, fetched['status'], stored_headers, fetched['body'], *rule, variants=variants)
+
+
+def _refresh_cache_entry(key, url, headers, timeout, rule):
+    fetched, shared = _tokidb_flight.do(key, lambda: _fetch_upstream_get(url, headers, timeout), timeout + 1)
+    if fetched['stream'] is not None and not shared:
+        fetched['stream'].close()
+    if not shared:
+        _store_in_cache(key, fetched, rule)
+
+
+def _cached_entry_parts(entry, state, accept_encoding):
+    """Return (body, header items) for serving a cache entry to the client."""
+    body, encoding = _select_cached_variant(entry, accept_encoding)
+    headers = [(key, value) for key, value in entry['headers'] if key.lower() != 'content-length']
+    if encoding is not None:
+        headers.append(('Content-Encoding', encoding))
+    if entry.get('variants'):
+        headers.append(('Vary', 'Accept-Encoding'))
+    headers.append(('X-Cache', 'HIT' if state == 'fresh' else 'STALE'))
+    headers.append(('Age', str(int(time.monotonic() - entry['stored_at']))))
+    return body, headers
+
+
+def _cached_response(entry, state):
+    body, headers = _cached_entry_parts(entry, state, request.headers.get('Accept-Encoding'))
+    resp = Response(body, status=entry['status'])
+    for key, value in headers:
+        if key.lower() == 'vary':
+            resp.vary.add(value)
+        else:
+            resp.headers[key] = value
+    return resp
+
+
+def _upstream_request_headers(incoming):
+    """Build the header dict forwarded to TOKIDB from the incoming request headers."""
+    headers = {}
+    # Forward only the minimal set of headers we need; Accept-Encoding lets upstream
+    # gzip reach the browser untouched.
+    for name in ('Content-Type', 'Accept', 'Accept-Encoding'):
+        value = incoming.get(name)
+        if value is not None:
+            headers[name] = value
+    if TOKIDB_INTERNAL_TOKEN:
+        headers['X-TOKIDB-INTERNAL-TOKEN'] = TOKIDB_INTERNAL_TOKEN
+    return headers
+
+
+def _tokidb_target_url(subpath, query_string=b''):
+    # Flask decodes path params, so re-encode to preserve spaces/Turkish chars safely.
+    encoded_subpath = quote(subpath.lstrip('/'), safe='/')
+    target_url = f"{TOKIDB_BASE_URL}/api/{encoded_subpath}"
+    if query_string:
+        target_url = f"{target_url}?{query_string.decode('utf-8', errors='ignore')}"
+    return target_url
+
+
+# ── TOKIDB proxy: threaded ve ASGI modunun ortak adimlari ─────
+# _proxy_url (Flask) ve asgi.AsyncTokidbProxy ayni istek/yanit sekillendirmesini,
+# cache ve breaker kararlarini bu yardimcilardan alir; yalnizca I/O farklidir.
+TOKIDB_PROXY_METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+
+def _tokidb_request_plan(method, url, incoming):
+    """Return (headers, upstream_path, rule, cache_key, flight_key) for a proxied call."""
+    headers = _upstream_request_headers(incoming)
+    upstream_path = urlsplit(url).path
+    rule = _tokidb_cache.rule_for(upstream_path) if TOKIDB_CACHE_ENABLED and method == 'GET' else None
+    cache_key = (url, headers.get('Accept', ''))
+    flight_key = cache_key
+    if rule is not None:
+        # Cache'e kodlanmamis govde alinir; sikistirilmis varyantlar gateway'de uretilir.
+        headers['Accept-Encoding'] = 'identity'
+    else:
+        flight_key = cache_key + (headers.get('Accept-Encoding', ''),)
+    return headers, upstream_path, rule, cache_key, flight_key
+
+
+def _tokidb_cache_lookup(cache_key, url, headers, timeout, rule):
+    """Return (entry, state) for a cacheable GET, or (None, None).
+
+    Stale entries are served and refreshed in the background.
+    """
+    if rule is None:
+        if TOKIDB_CACHE_ENABLED:
+            _tokidb_cache.count('bypass')
+        return None, None
+    entry, state = _tokidb_cache.get(cache_key)
+    if entry is not None and state == 'stale':
+        _tokidb_cache.refresh_async(
+            cache_key, lambda: _refresh_cache_entry(cache_key, url, headers, timeout, rule))
+    return entry, state
+
+
+def _tokidb_circuit_reply():
+    """Return None if the breaker allows the call, else (payload, status, extra headers)."""
+    allowed, retry_after = _tokidb_breaker.allow()
+    if allowed:
+        return None
+    _upstream_errors.inc('tokidb', 'circuit_open')
+    payload = {'success': False, 'error': 'Upstream unavailable', 'details': 'Circuit open'}
+    return payload, 503, [('Retry-After', str(retry_after))]
+
+
+def _tokidb_failure_reply(exc, timed_out):
+    """Count an upstream failure and return the (payload, status) sent to the client."""
+    if isinstance(exc, UpstreamBusy):
+        _upstream_errors.inc('tokidb', 'busy')
+        return {'success': False, 'error': 'Upstream busy', 'details': str(exc)}, 503
+    _tokidb_breaker.record_failure()
+    _upstream_errors.inc('tokidb', 'timeout' if timed_out else 'unavailable')
+    return {'success': False, 'error': 'Upstream unavailable', 'details': str(exc) or type(exc).__name__}, 502
+
+
+def _tokidb_response_headers(method, upstream_path, fetched, rule):
+    """Record a successful upstream call and return the header items for the client."""
+    _tokidb_breaker.record_success()
+    if method not in ('GET', 'HEAD') and fetched['status'] < 400 and TOKIDB_CACHE_ENABLED:
+        # /api/projects/123 guncellenince /api/projects altindaki tum kayitlar dusurulur.
+        segments = upstream_path.split('/')
+        _tokidb_cache.invalidate_prefix('/'.join(segments[:3]))
+    if any(key.lower() == 'content-encoding' for key, _value in fetched['headers']):
+        _compression_stats.count('passthrough')
+    headers = [(key, value) for key, value in fetched['headers'] if key.lower() not in _HOP_BY_HOP_HEADERS]
+    if rule is not None:
+        headers.append(('X-Cache', 'MISS'))
+    return headers
 
 
 def _proxy_url(url, timeout=TOKIDB_TIMEOUT_SEC):
@@ -209,66 +1584,59 @@ def _proxy_url(url, timeout=TOKIDB_TIMEOUT_SEC):
     if method not in ('GET', 'HEAD'):
         body = request.get_data() or b''
 
-    headers = {}
-    # Forward only the minimal set of headers we need.
-    for name in ('Content-Type', 'Accept'):
-        if name in request.headers:
-            headers[name] = request.headers[name]
-    if TOKIDB_INTERNAL_TOKEN:
-        headers['X-TOKIDB-INTERNAL-TOKEN'] = TOKIDB_INTERNAL_TOKEN
-
-    upstream_req = UrlRequest(url, data=body, headers=headers, method=method)
-
-    def _build_response(status, payload, upstream_headers):
-        resp = Response(payload, status=status)
-        hop_by_hop = {
-            'connection',
-            'keep-alive',
-            'proxy-authenticate',
-            'proxy-authorization',
-            'te',
-            'trailers',
-            'transfer-encoding',
-            'upgrade',
-            'content-length',
-        }
-        if upstream_headers:
-            for key, value in upstream_headers.items():
-                if key.lower() in hop_by_hop:
-                    continue
-                resp.headers[key] = value
+    headers, upstream_path, rule, cache_key, flight_key = _tokidb_request_plan(method, url, request.headers)
+    entry, state = _tokidb_cache_lookup(cache_key, url, headers, timeout, rule)
+    if entry is not None:
+        return _cached_response(entry, state)
+
+    circuit = _tokidb_circuit_reply()
+    if circuit is not None:
+        payload, status, extra = circuit
+        resp = jsonify(payload)
+        resp.status_code = status
+        resp.headers.extend(extra)
         return resp
 
     try:
-        with urlopen(upstream_req, timeout=timeout) as upstream_resp:
-            return _build_response(
-                upstream_resp.status,
-                upstream_resp.read(),
-                upstream_resp.headers,
-            )
-    except HTTPError as e:
-        try:
-            payload = e.read()
-        except Exception:
-            payload = b''
-        return _build_response(e.code, payload, getattr(e, 'headers', None))
-    except URLError as e:
-        return jsonify({
-            'success': False,
-            'error': 'Upstream unavailable',
-            'details': str(e),
-        }), 502
+        if method == 'GET':
+            fetched, shared = _tokidb_flight.do(
+                flight_key, lambda: _fetch_upstream_get(url, headers, timeout), timeout + 1)
+            if shared and fetched['body'] is None:
+                # Lider govdeyi akitti, paylasilamaz: bu istek kendi baglantisini acar.
+                _tokidb_flight.count('unshareable')
+                fetched = _fetch_upstream_get(url, headers, timeout)
+            elif not shared:
+                _store_in_cache(cache_key, fetched, rule)
+        else:
+            started = time.perf_counter()
+            upstream_resp = _upstream_pool.urlopen(method, url, body=body, headers=headers, timeout=timeout)
+            _upstream_duration.observe(time.perf_counter() - started, 'tokidb', method, str(upstream_resp.status))
+            fetched = {'status': upstream_resp.status, 'headers': list(upstream_resp.headers.items()),
+                       'body': upstream_resp.read() if method == 'HEAD' else None,
+                       'stream': None if method == 'HEAD' else upstream_resp}
+    except (UpstreamBusy, OSError, http.client.HTTPException) as e:
+        payload, status = _tokidb_failure_reply(e, isinstance(e, TimeoutError))
+        return jsonify(payload), status
+
+    # Buyuk govdeler parca parca tarayiciya akitilir; gateway'de tamamen tutulmaz.
+    payload = fetched['body'] if fetched['body'] is not None else fetched['stream'].iter_content()
+    resp = Response(payload, status=fetched['status'])
+    for key, value in _tokidb_response_headers(method, upstream_path, fetched, rule):
+        resp.headers[key] = value
+    if fetched['stream'] is not None:
+        # Generator hic baslamadan kapanirsa finally calismaz; havuz slotu
+        # Response kapanisinda da birakilir (close() tekrar cagrilabilir).
+        resp.call_on_close(fetched['stream'].close)
+    return resp
 
 @app.route('/')
 def index():
     if 'user' in session:
         return redirect(url_for('dashboard'))
-    settings = load_settings()
-    return render_template('login.html', settings=settings)
+    return _render_cached_page('login.html')
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
-    settings = load_settings()
     if request.method == 'POST':
         username = request.form.get('username')
         password = request.form.get('password')
@@ -277,15 +1645,15 @@ def login():
             if MAZZEL_SESSION_PERMANENT:
                 session.permanent = True
             return redirect(url_for('dashboard'))
-        return render_template('login.html', error="Hatalı kullanıcı adı veya şifre", settings=settings)
-    return render_template('login.html', settings=settings)
+        return render_template('login.html', error="Hatalı kullanıcı adı veya şifre",
+                               settings=_settings_snapshot()[1])
+    return _render_cached_page('login.html')
 
 @app.route('/dashboard')
 def dashboard():
     if 'user' not in session:
         return redirect(url_for('login'))
-    settings = load_settings()
-    return render_template('dashboard.html', user=session['user'], settings=settings, active_page='dashboard')
+    return _render_cached_page('dashboard.html', user=session['user'], active_page='dashboard')
 
 @app.route('/settings', methods=['GET', 'POST'])
 def settings_page():
@@ -329,919 +1697,435 @@ def api_settings():
         save_settings(settings)
         return jsonify({'success': True})
     
-    return jsonify(load_settings())
-
-@app.route('/api/notification', methods=['POST'])
-def add_notification():
-    if 'user' not in session:
-        return jsonify({'error': 'Unauthorized'}), 401
-    
-    settings = load_settings()
-    data = request.json
-    settings['notifications'].append({
-        'message': data.get('message', ''),
-        'type': data.get('type', 'info')
-    })
-    save_settings(settings)
-    return jsonify({'success': True})
-
-@app.route('/api/tokidb/health', methods=['GET'])
-@login_required
-def tokidb_health():
-    return _proxy_url(f"{TOKIDB_BASE_URL}/health")
-
-@app.route('/api/tokidb/<path:subpath>', methods=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'])
-@login_required
-def tokidb_api_proxy(subpath):
-    # Flask decodes path params, so re-encode to preserve spaces/Turkish chars safely.
-    encoded_subpath = quote(subpath.lstrip('/'), safe='/')
-    target_url = f"{TOKIDB_BASE_URL}/api/{encoded_subpath}"
-    if request.query_string:
-        target_url = f"{target_url}?{request.query_string.decode('utf-8', errors='ignore')}"
-    return _proxy_url(target_url)
-
-@app.route('/tetra/')
-@login_required
-def tetra():
-    """TETRA AI Münazara sistemi - standalone sayfaya yönlendir"""
-    # Local: http://localhost:5173/
-    # Production: /tetra-app/
-    tetra_url = os.environ.get('TETRA_URL', TETRA_URL_DEFAULT)
-    health_url = os.environ.get('TETRA_HEALTH_URL', TETRA_HEALTH_URL_DEFAULT)
-    _maybe_start_tetra(tetra_url, health_url)
-    if not _url_ok(tetra_url):
-        return (
-            "<!DOCTYPE html>"
-            "<html lang='en'>"
-            "<head>"
-            "<meta charset='utf-8'/>"
-            "<meta name='viewport' content='width=device-width, initial-scale=1'/>"
-            "<meta http-equiv='refresh' content='3'/>"
-            "<title>Starting TETRA...</title>"
-            "<style>"
-            "body{font-family:Arial,Helvetica,sans-serif;margin:0;display:flex;min-height:100vh;"
-            "align-items:center;justify-content:center;background:#0b1220;color:#e2e8f0}"
-            ".box{max-width:520px;padding:24px 28px;border:1px solid #1e293b;border-radius:12px;"
-            "background:#0f172a;box-shadow:0 10px 30px rgba(0,0,0,0.3)}"
-            "h1{margin:0 0 8px;font-size:20px}"
-            "p{margin:6px 0;color:#94a3b8;font-size:14px;line-height:1.5}"
-            "</style>"
-            "</head>"
-            "<body>"
-            "<div class='box'>"
-            "<h1>Starting TETRA...</h1>"
-            "<p>Services are starting on your machine. This page will refresh in a few seconds.</p>"
-            "<p>If it keeps loading, check that Node.js is installed and the terminal windows opened.</p>"
-            "</div>"
-            "</body>"
-            "</html>"
-        )
-    return redirect(tetra_url)
-
-
-@app.route('/logout')
-def logout():
-    session.pop('user', None)
-    return redirect(url_for('login'))
-
-# Moduller icin placeholder
-@app.route('/teklif/')
-def teklif():
-    if 'user' not in session:
-        return redirect(url_for('login'))
-    return render_template('module_placeholder.html', user=session['user'], module_name="Teklif Hazırlama", module_icon="fa-file-invoice-dollar", active_page='teklif')
-
-@app.route('/mail/')
-@login_required
-def mail():
-    return render_template('module_placeholder.html', user=session['user'], module_name="Mazzel Mail", module_icon="fa-envelope", active_page='mail')
-
-@app.route('/maliyet/')
-@login_required
-def maliyet():
-    return render_template('module_placeholder.html',
-                         module_name="Maliyet Hesaplama",
-                         module_icon="fa-calculator",
-                         active_page='maliyet',
-                         user=session.get('user'))
-
-@app.route('/masrafci/')
-@login_required
-def masrafci():
-    manifest = _load_masrafci_manifest()
-    if manifest is None:
-        return render_template('module_placeholder.html',
-                             module_name="Masrafçı",
-                             module_icon="fa-wallet",
-                             active_page='masrafci',
-                             user=session.get('user'))
-    return render_template('page_masrafci.html',
-                         active_page='masrafci',
-                         user=session.get('user'),
-                         masrafci_js=manifest['js'],
-                         masrafci_css=manifest['css'])
-
-@app.route('/tokidb/')
-@login_required
-def tokidb_dashboard():
-    return render_template('tokidb/dashboard.html', user=session['user'], active_page='tokidb')
-
-@app.route('/tokidb/projects')
-@login_required
-def tokidb_projects():
-    return render_template('tokidb/projects.html', user=session['user'], active_page='tokidb_projects')
-
-@app.route('/tokidb/projects/<toki_id>')
-@login_required
-def tokidb_project_detail(toki_id):
-    return render_template('tokidb/project_detail.html', user=session['user'], active_page='tokidb_projects', toki_id=toki_id)
-
-@app.route('/tokidb/cities')
-@login_required
-def tokidb_cities():
-    return render_template('tokidb/cities.html', user=session['user'], active_page='tokidb_cities')
-
-@app.route('/tokidb/companies')
-@login_required
-def tokidb_companies():
-    return render_template('tokidb/companies.html', user=session['user'], active_page='tokidb_companies')
-
-@app.route('/tokidb/companies/<name>')
-@login_required
-def tokidb_company_detail(name):
-    return render_template('tokidb/company_detail.html', user=session['user'], active_page='tokidb_companies', company_name=name)
-
-@app.route('/tokidb/watchlist')
-@login_required
-def tokidb_watchlist():
-    return render_template('tokidb/watchlist.html', user=session['user'], active_page='tokidb_watchlist')
-
-@app.route('/tokidb/admin')
-@login_required
-def tokidb_admin():
-    return render_template('tokidb/admin.html', user=session['user'], active_page='tokidb_admin')
-
-def load_nesting_data():
-    default_data = {"customers": [], "materials": [], "nesting_projects": []}
-    try:
-        if os.path.exists(NESTING_DATA_FILE):
-            with open(NESTING_DATA_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-    except:
-        pass
-    return default_data
-
-@app.route('/nesting/')
-@login_required
-def nesting():
-    data = load_nesting_data()
-    return render_template('page_nesting.html', 
-                         active_page='nesting',
-                         user=session.get('user'),
-                         customers=data.get('customers', []),
-                         materials=data.get('materials', []),
-                         edge_bands=data.get('edge_bands', []),
-                         material_categories=data.get('material_categories', []))
-
-@app.route('/nesting/projects')
-@login_required
-def nesting_projects():
-    data = load_nesting_data()
-    return render_template('page_nesting_projects.html', 
-                         active_page='nesting_list',
-                         user=session.get('user'),
-                         projects=data.get('nesting_projects', []),
-                         customers=data.get('customers', []))
-
-def save_nesting_data(data):
-    try:
-        os.makedirs(os.path.dirname(NESTING_DATA_FILE), exist_ok=True)
-        with open(NESTING_DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        return True
-    except:
-        return False
-
-@app.route('/api/nesting/project', methods=['POST'])
-@login_required
-def save_nesting_project():
-    try:
-        project_data = request.json
-        data = load_nesting_data()
-        
-        # Check if updating existing or creating new
-        project_id = project_data.get('id')
-        if project_id:
-            # Update existing
-            for i, p in enumerate(data['nesting_projects']):
-                if p['id'] == project_id:
-                    data['nesting_projects'][i] = project_data
-                    break
-        else:
-            # Create new with unique ID
-            import time
-            project_data['id'] = f"nest_{int(time.time())}"
-            project_data['created_at'] = time.strftime('%Y-%m-%d')
-            data['nesting_projects'].append(project_data)
-        
-        save_nesting_data(data)
-        return jsonify({'success': True, 'id': project_data['id']})
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-@app.route('/api/nesting/project/<project_id>', methods=['GET'])
-@login_required
-def get_nesting_project(project_id):
-    data = load_nesting_data()
-    for p in data['nesting_projects']:
-        if p['id'] == project_id:
-            return jsonify(p)
-    return jsonify({'error': 'Project not found'}), 404
-
-@app.route('/api/nesting/project/<project_id>', methods=['DELETE'])
-@login_required
-def delete_nesting_project(project_id):
-    data = load_nesting_data()
-    data['nesting_projects'] = [p for p in data['nesting_projects'] if p['id'] != project_id]
-    save_nesting_data(data)
-    return jsonify({'success': True})
-
-@app.route('/api/nesting/materials', methods=['GET'])
-@login_required
-def get_materials():
-    data = load_nesting_data()
-    category = request.args.get('category')
-    materials = data.get('materials', [])
-    if category:
-        materials = [m for m in materials if m.get('category') == category]
-    return jsonify(materials)
-
-@app.route('/api/nesting/customers', methods=['GET'])
-@login_required
-def get_customers():
-    data = load_nesting_data()
-    return jsonify(data.get('customers', []))
-
-# === CUSTOMER CRUD ===
-@app.route('/api/customers', methods=['GET'])
-@login_required
-def api_get_customers():
-    data = load_nesting_data()
-    return jsonify(data.get('customers', []))
-
-@app.route('/api/customers', methods=['POST'])
-@login_required
-def api_create_customer():
-    try:
-        customer = request.json
-        data = load_nesting_data()
-        import time
-        customer['id'] = f"cust_{int(time.time())}"
-        customer['created_at'] = time.strftime('%Y-%m-%d')
-        customer['status'] = 'active'
-        if 'customers' not in data:
-            data['customers'] = []
-        data['customers'].append(customer)
-        save_nesting_data(data)
-        return jsonify({'success': True, 'id': customer['id']})
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-@app.route('/api/customers/<customer_id>', methods=['GET'])
-@login_required
-def api_get_customer(customer_id):
-    data = load_nesting_data()
-    for c in data.get('customers', []):
-        if c['id'] == customer_id:
-            return jsonify(c)
-    return jsonify({'error': 'Customer not found'}), 404
-
-@app.route('/api/customers/<customer_id>', methods=['PUT'])
-@login_required
-def api_update_customer(customer_id):
-    try:
-        updated = request.json
-        data = load_nesting_data()
-        for i, c in enumerate(data.get('customers', [])):
-            if c['id'] == customer_id:
-                updated['id'] = customer_id
-                data['customers'][i] = updated
-                save_nesting_data(data)
-                return jsonify({'success': True})
-        return jsonify({'error': 'Customer not found'}), 404
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-@app.route('/api/customers/<customer_id>', methods=['DELETE'])
-@login_required
-def api_delete_customer(customer_id):
-    data = load_nesting_data()
-    data['customers'] = [c for c in data.get('customers', []) if c['id'] != customer_id]
-    save_nesting_data(data)
-    return jsonify({'success': True})
-
-# === MATERIAL CRUD ===
-@app.route('/api/materials', methods=['GET'])
-@login_required
-def api_get_materials():
-    data = load_nesting_data()
-    category = request.args.get('category')
-    materials = data.get('materials', [])
-    if category:
-        materials = [m for m in materials if m.get('category') == category]
-    return jsonify(materials)
-
-@app.route('/api/materials', methods=['POST'])
-@login_required
-def api_create_material():
-    try:
-        material = request.json
-        data = load_nesting_data()
-        import time
-        material['id'] = f"mat_{int(time.time())}"
-        material['status'] = 'active'
-        if 'materials' not in data:
-            data['materials'] = []
-        data['materials'].append(material)
-        save_nesting_data(data)
-        return jsonify({'success': True, 'id': material['id']})
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-@app.route('/api/materials/<material_id>', methods=['PUT'])
-@login_required
-def api_update_material(material_id):
-    try:
-        updated = request.json
-        data = load_nesting_data()
-        for i, m in enumerate(data.get('materials', [])):
-            if m['id'] == material_id:
-                updated['id'] = material_id
-                data['materials'][i] = updated
-                save_nesting_data(data)
-                return jsonify({'success': True})
-        return jsonify({'error': 'Material not found'}), 404
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    return jsonify(_settings_snapshot()[1])
+
+# ── Notifications ───────────────────────────────────────────
+# Bildirimler settings.json yerine kendi SQLite deposunda tutulur: en fazla
+# NOTIFICATIONS_MAX kayitlik halka tampon + saklama suresi, kullanici basina okundu
+# isareti. Yeni bildirimler SSE ile itilir; ayni surecte aninda, diger worker'lardan
+# gelenler en gec NOTIFICATIONS_POLL_SEC icinde. Akis long-poll gibi calisir: ilk
+# bildirim grubunu gonderince ya da NOTIFICATIONS_STREAM_MAX_SEC dolunca kapanir ve
+# tarayici Last-Event-ID ile yeniden baglanir. Her acik akis bir gthread is
+# parcacigini tutar (bkz. serve.py MAZZEL_THREADS).
+NOTIFICATIONS_DB_PATH = os.environ.get('MAZZEL_NOTIFICATIONS_DB', os.path.join(DATA_DIR, 'notifications.db'))
+try:
+    NOTIFICATIONS_MAX = int(os.environ.get('NOTIFICATIONS_MAX', '500'))
+    NOTIFICATIONS_RETENTION_DAYS = int(os.environ.get('NOTIFICATIONS_RETENTION_DAYS', '30'))
+    NOTIFICATIONS_POLL_SEC = float(os.environ.get('NOTIFICATIONS_POLL_SEC', '2'))
+    NOTIFICATIONS_STREAM_MAX_SEC = float(os.environ.get('NOTIFICATIONS_STREAM_MAX_SEC', '25'))
+except Exception:
+    NOTIFICATIONS_MAX = 500
+    NOTIFICATIONS_RETENTION_DAYS = 30
+    NOTIFICATIONS_POLL_SEC = 2.0
+    NOTIFICATIONS_STREAM_MAX_SEC = 25.0
+NOTIFICATIONS_PAGE_SIZE_MAX = 100
+_NOTIFICATION_TYPES = ('info', 'success', 'warning', 'error')
+_NOTIFICATIONS_SCHEMA_VERSION = 1
 
-@app.route('/api/materials/<material_id>', methods=['DELETE'])
-@login_required
-def api_delete_material(material_id):
-    data = load_nesting_data()
-    data['materials'] = [m for m in data.get('materials', []) if m['id'] != material_id]
-    save_nesting_data(data)
-    return jsonify({'success': True})
+_notifications_cond = threading.Condition()
+_notifications_latest_id = 0   # bu surecte bilinen en yeni bildirim
+_notifications_migrated = False
+_notifications_schema_lock = threading.Lock()
 
-@app.route('/api/categories', methods=['GET'])
-@login_required
-def api_get_categories():
-    data = load_nesting_data()
-    return jsonify(data.get('material_categories', []))
 
-# === PAGE ROUTES ===
-@app.route('/musteriler/')
-@login_required
-def musteriler():
-    data = load_nesting_data()
-    return render_template('page_musteriler.html', 
-                         user=session['user'], 
-                         active_page='musteriler',
-                         customers=data.get('customers', []))
-
-@app.route('/malzemeler/')
-@login_required
-def malzemeler():
-    data = load_nesting_data()
-    return render_template('page_malzemeler.html', 
-                         user=session['user'], 
-                         active_page='malzemeler',
-                         materials=data.get('materials', []),
-                         categories=data.get('material_categories', []))
+def _notifications_now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
 
-@app.route('/raporlar/')
-@login_required
-def raporlar():
-    if 'user' not in session:
-        return redirect(url_for('login'))
-    return render_template('module_placeholder.html', user=session['user'], module_name="Raporlar", module_icon="fa-chart-bar")
-
-@app.route('/hizmetler')
-def hizmetler():
-    settings = load_settings()
-    return render_template('page_hizmetler.html', settings=settings)
-
-@app.route('/referanslar')
-def referanslar():
-    settings = load_settings()
-    return render_template('page_referanslar.html', settings=settings)
-
-@app.route('/iletisim')
-def iletisim():
-    settings = load_settings()
-    return render_template('page_iletisim.html', settings=settings)
 
-# ── Masrafci SQLite Backend ──────────────────────────────────
-MASRAFCI_DB_PATH = os.path.join(DATA_DIR, 'masrafci.db')
+def _get_notifications_db():
+    global _notifications_migrated
+    os.makedirs(os.path.dirname(NOTIFICATIONS_DB_PATH), exist_ok=True)
+    conn = _connect_timed(NOTIFICATIONS_DB_PATH, 'notifications')
+    conn.row_factory = sqlite3.Row
+    if _notifications_migrated:
+        return conn
+    with _notifications_schema_lock:
+        _init_notifications_db(conn)
+        _notifications_migrated = True
+    return conn
 
-_MASRAFCI_ALLOWED_FIELDS = {
-    'type', 'ad', 'tutar', 'ay', 'tarih', 'kategori', 'kurum',
-    'odeme_yontemi', 'son_odeme', 'durum', 'taksit_sayisi',
-    'taksit_odenen', 'aylik_tutar', 'kart', 'otomatik_odeme',
-    'telefon', 'iban', 'notlar', 'abone_no',
-}
 
-def _get_masrafci_db():
-    os.makedirs(os.path.dirname(MASRAFCI_DB_PATH), exist_ok=True)
-    conn = sqlite3.connect(MASRAFCI_DB_PATH)
-    conn.row_factory = sqlite3.Row
+def _init_notifications_db(conn):
     conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA foreign_keys = ON")
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS records (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user TEXT NOT NULL,
-            type TEXT NOT NULL CHECK(type IN ('harcama','fatura','kredikarti','alacakli')),
-            ad TEXT NOT NULL,
-            tutar REAL DEFAULT 0,
-            ay TEXT,
-            tarih TEXT,
-            kategori TEXT,
-            kurum TEXT,
-            odeme_yontemi TEXT,
-            son_odeme TEXT,
-            durum TEXT DEFAULT 'odenmedi',
-            taksit_sayisi INTEGER,
-            taksit_odenen INTEGER DEFAULT 0,
-            aylik_tutar REAL,
-            kart TEXT,
-            otomatik_odeme INTEGER DEFAULT 0,
-            telefon TEXT,
-            iban TEXT,
-            notlar TEXT,
-            abone_no TEXT,
-            created_at TEXT DEFAULT (datetime('now','localtime'))
-        )
-    """)
-    try:
-        conn.execute("ALTER TABLE records ADD COLUMN abone_no TEXT")
-    except sqlite3.OperationalError:
-        pass  # kolon zaten var
     conn.execute("""
-        CREATE TABLE IF NOT EXISTS bill_reminder_rules (
+        CREATE TABLE IF NOT EXISTS notifications (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user TEXT NOT NULL,
-            provider_key TEXT NOT NULL,
-            display_name TEXT NOT NULL,
-            enabled INTEGER DEFAULT 1,
-            expected_start_day INTEGER NOT NULL DEFAULT 1 CHECK(expected_start_day BETWEEN 1 AND 28),
-            expected_end_day INTEGER NOT NULL DEFAULT 28 CHECK(expected_end_day BETWEEN 1 AND 28),
-            lead_days INTEGER NOT NULL DEFAULT 3 CHECK(lead_days BETWEEN 0 AND 14),
-            last_prompted_month TEXT,
-            snooze_until TEXT,
-            created_at TEXT DEFAULT (datetime('now','localtime')),
-            updated_at TEXT DEFAULT (datetime('now','localtime')),
-            UNIQUE(user, provider_key)
+            message TEXT NOT NULL,
+            type TEXT NOT NULL DEFAULT 'info',
+            created_by TEXT,
+            created_at TEXT NOT NULL
         )
     """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_notifications_created ON notifications (created_at)")
     conn.execute("""
-        CREATE TABLE IF NOT EXISTS bill_reminder_events (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            rule_id INTEGER NOT NULL REFERENCES bill_reminder_rules(id) ON DELETE CASCADE,
-            month TEXT NOT NULL,
-            status TEXT NOT NULL DEFAULT 'pending'
-                CHECK(status IN ('pending','prompted','entered','skipped_month','dismissed')),
-            prompted_at TEXT,
-            answered_at TEXT,
-            linked_record_id INTEGER REFERENCES records(id) ON DELETE SET NULL,
-            created_at TEXT DEFAULT (datetime('now','localtime')),
-            UNIQUE(rule_id, month)
+        CREATE TABLE IF NOT EXISTS notification_reads (
+            user TEXT PRIMARY KEY,
+            last_read_id INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT
         )
     """)
-    return conn
-
-def _row_to_dict(row):
-    d = dict(row)
-    d['otomatik_odeme'] = bool(d.get('otomatik_odeme'))
-    return d
-
-
-def _normalize_provider_key(raw: str) -> str:
-    _TR_MAP = str.maketrans({
-        '\u00e7': 'c', '\u00c7': 'c',  # ç, Ç
-        '\u015f': 's', '\u015e': 's',  # ş, Ş
-        '\u011f': 'g', '\u011e': 'g',  # ğ, Ğ
-        '\u00fc': 'u', '\u00dc': 'u',  # ü, Ü
-        '\u00f6': 'o', '\u00d6': 'o',  # ö, Ö
-        '\u0131': 'i', '\u0130': 'i',  # ı, İ
-    })
-    text = (raw or '').strip().lower().translate(_TR_MAP)
-    return ' '.join(text.split())
-
-
-def _run_reminder_check(conn, user, month):
-    today = date.today()
-    today_day = today.day
-    today_iso = today.isoformat()
-
-    rules = conn.execute(
-        "SELECT * FROM bill_reminder_rules WHERE user = ? AND enabled = 1",
-        (user,)
-    ).fetchall()
-
-    fatura_records = conn.execute(
-        "SELECT kurum FROM records WHERE user = ? AND type = 'fatura' AND ay = ?",
-        (user, month)
-    ).fetchall()
-    fatura_keys = {_normalize_provider_key(r['kurum'] or '') for r in fatura_records}
-
-    for rule in rules:
-        provider_key = rule['provider_key']
-
-        # Bu ay icin fatura zaten girilmis mi?
-        if provider_key in fatura_keys:
-            continue
-
-        # Gun araligi kontrolu (lead_days dahil)
-        start_day = max(1, rule['expected_start_day'] - rule['lead_days'])
-        end_day = rule['expected_end_day']
-        if not (start_day <= today_day <= end_day):
-            continue
-
-        # Snooze kontrolu
-        snooze = rule['snooze_until']
-        if snooze and snooze > today_iso:
-            continue
-
-        # Bu rule+month icin event var mi?
-        existing = conn.execute(
-            "SELECT id FROM bill_reminder_events WHERE rule_id = ? AND month = ?",
-            (rule['id'], month)
-        ).fetchone()
-        if existing:
-            continue
-
-        # Yeni pending event olustur
-        conn.execute(
-            "INSERT INTO bill_reminder_events (rule_id, month, status) VALUES (?, ?, 'pending')",
-            (rule['id'], month)
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= _NOTIFICATIONS_SCHEMA_VERSION:
+        return
+    # settings.json icindeki eski bildirim listesi bir kez depoya tasinir. Worker'lar
+    # ayni anda baslayabildigi icin once yazma kilidi alinir ve surum kilit altinda
+    # yeniden okunur; kilidi ikinci alan worker tasimayi tekrarlamaz.
+    conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= _NOTIFICATIONS_SCHEMA_VERSION:
+            conn.rollback()
+            return
+        settings = load_settings()
+        legacy = settings.pop('notifications', None) or []
+        now = _notifications_now()
+        conn.executemany(
+            "INSERT INTO notifications (message, type, created_at) VALUES (?, ?, ?)",
+            [(str(n.get('message', '')), n.get('type') or 'info', now) for n in legacy if isinstance(n, dict)]
         )
+        conn.execute(f"PRAGMA user_version = {_NOTIFICATIONS_SCHEMA_VERSION}")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    # Ayarlar ancak tasima commit edildikten sonra temizlenir.
+    if legacy:
+        save_settings(settings)
 
-    conn.commit()
 
-    # Tum pending event'leri don (rule bilgileriyle birlikte)
-    rows = conn.execute("""
-        SELECT e.*, r.display_name, r.provider_key, r.expected_start_day, r.expected_end_day
-        FROM bill_reminder_events e
-        JOIN bill_reminder_rules r ON e.rule_id = r.id
-        WHERE r.user = ? AND e.month = ? AND e.status = 'pending'
-        ORDER BY r.expected_start_day ASC
-    """, (user, month)).fetchall()
-    return [dict(r) for r in rows]
+def _trim_notifications(conn, newest_id):
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=NOTIFICATIONS_RETENTION_DAYS)).strftime('%Y-%m-%d %H:%M:%S')
+    conn.execute("DELETE FROM notifications WHERE id <= ? OR created_at < ?",
+                 (newest_id - NOTIFICATIONS_MAX, cutoff))
 
-@app.route('/api/masrafci/records', methods=['GET'])
-@login_required
-def masrafci_records_list():
-    record_type = request.args.get('type')
-    month = request.args.get('month')
-    conn = _get_masrafci_db()
-    try:
-        clauses = ['user = ?']
-        params = [session['user']]
-        if record_type:
-            clauses.append('type = ?')
-            params.append(record_type)
-        if month:
-            clauses.append('ay = ?')
-            params.append(month)
-        sql = f"SELECT * FROM records WHERE {' AND '.join(clauses)} ORDER BY created_at DESC"
-        rows = conn.execute(sql, params).fetchall()
-        return jsonify([_row_to_dict(r) for r in rows])
-    finally:
-        conn.close()
 
-@app.route('/api/masrafci/records', methods=['POST'])
-@login_required
-def masrafci_records_create():
-    data = request.get_json(silent=True) or {}
-    ad = (data.get('ad') or '').strip()
-    record_type = data.get('type', '')
-    if not ad:
-        return jsonify({'error': 'ad alanı zorunludur'}), 400
-    if record_type not in ('harcama', 'fatura', 'kredikarti', 'alacakli'):
-        return jsonify({'error': 'Geçersiz kayıt tipi'}), 400
-
-    filtered = {k: data[k] for k in _MASRAFCI_ALLOWED_FIELDS if k in data}
-    filtered['user'] = session['user']
-    if 'otomatik_odeme' in filtered:
-        filtered['otomatik_odeme'] = 1 if filtered['otomatik_odeme'] else 0
-
-    cols = list(filtered.keys())
-    placeholders = ', '.join(['?'] * len(cols))
-    col_names = ', '.join(cols)
-    values = [filtered[c] for c in cols]
-
-    conn = _get_masrafci_db()
+def add_notification_entry(message, type='info', created_by=None):
+    """Append a notification, trim the ring buffer and wake SSE listeners; returns the row."""
+    global _notifications_latest_id
+    created_at = _notifications_now()
+    conn = _get_notifications_db()
     try:
-        cur = conn.execute(f"INSERT INTO records ({col_names}) VALUES ({placeholders})", values)
+        cur = conn.execute(
+            "INSERT INTO notifications (message, type, created_by, created_at) VALUES (?, ?, ?, ?)",
+            (message, type, created_by, created_at)
+        )
+        new_id = cur.lastrowid
+        _trim_notifications(conn, new_id)
         conn.commit()
-        return jsonify({'success': True, 'id': cur.lastrowid}), 201
     finally:
         conn.close()
+    with _notifications_cond:
+        _notifications_latest_id = max(_notifications_latest_id, new_id)
+        _notifications_cond.notify_all()
+    return {'id': new_id, 'message': message, 'type': type, 'created_by': created_by, 'created_at': created_at}
 
-@app.route('/api/masrafci/records/<int:record_id>', methods=['DELETE'])
-@login_required
-def masrafci_records_delete(record_id):
-    conn = _get_masrafci_db()
-    try:
-        row = conn.execute("SELECT user FROM records WHERE id = ?", (record_id,)).fetchone()
-        if row is None:
-            return jsonify({'error': 'Kayıt bulunamadı'}), 404
-        if row['user'] != session['user']:
-            return jsonify({'error': 'Yetkiniz yok'}), 403
-        conn.execute("DELETE FROM records WHERE id = ?", (record_id,))
-        conn.commit()
-        return jsonify({'success': True})
-    finally:
-        conn.close()
 
-@app.route('/api/masrafci/summary', methods=['GET'])
-@login_required
-def masrafci_summary():
-    month = request.args.get('month')
-    user = session['user']
-    conn = _get_masrafci_db()
+def _notifications_after(last_id, limit=NOTIFICATIONS_PAGE_SIZE_MAX):
+    conn = _get_notifications_db()
     try:
-        params_base = [user]
-        month_clause = ''
-        if month:
-            month_clause = ' AND ay = ?'
-            params_base.append(month)
-
-        # Toplam gider
-        row = conn.execute(
-            f"SELECT COALESCE(SUM(tutar), 0) AS total FROM records WHERE user = ?{month_clause}",
-            params_base
-        ).fetchone()
-        toplam_gider = row['total']
-
-        # Kategori dağılımı
         rows = conn.execute(
-            f"SELECT kategori, SUM(tutar) AS total, COUNT(*) AS cnt FROM records WHERE user = ?{month_clause} GROUP BY kategori ORDER BY total DESC",
-            params_base
-        ).fetchall()
-        kategori_dagilimi = [{'kategori': r['kategori'] or 'Belirtilmemiş', 'toplam': r['total'], 'adet': r['cnt']} for r in rows]
-
-        # Yaklaşan faturalar (ödenmemiş)
-        fatura_params = [user]
-        fatura_month = ''
-        if month:
-            fatura_month = ' AND ay = ?'
-            fatura_params.append(month)
-        faturalar = conn.execute(
-            f"SELECT * FROM records WHERE user = ? AND type = 'fatura' AND durum != 'odendi'{fatura_month} ORDER BY son_odeme ASC LIMIT 5",
-            fatura_params
-        ).fetchall()
-
-        # Aktif taksitler
-        taksit_params = [user]
-        taksit_month = ''
-        if month:
-            taksit_month = ' AND ay = ?'
-            taksit_params.append(month)
-        taksitler = conn.execute(
-            f"SELECT * FROM records WHERE user = ? AND type = 'kredikarti' AND taksit_sayisi > 0{taksit_month} ORDER BY created_at DESC LIMIT 5",
-            taksit_params
-        ).fetchall()
-
-        # Son işlemler
-        son_params = [user]
-        son_month = ''
-        if month:
-            son_month = ' AND ay = ?'
-            son_params.append(month)
-        son_islemler = conn.execute(
-            f"SELECT * FROM records WHERE user = ?{son_month} ORDER BY created_at DESC LIMIT 10",
-            son_params
+            "SELECT * FROM notifications WHERE id > ? ORDER BY id ASC LIMIT ?", (last_id, limit)
         ).fetchall()
-
-        # Pending reminder sayisi
-        pending_count = conn.execute(
-            """SELECT COUNT(*) AS cnt FROM bill_reminder_events e
-               JOIN bill_reminder_rules r ON e.rule_id = r.id
-               WHERE r.user = ? AND e.month = ? AND e.status = 'pending'""",
-            (user, month or getCurrentMonth())
-        ).fetchone()['cnt']
-
-        return jsonify({
-            'toplam_gider': toplam_gider,
-            'kategori_dagilimi': kategori_dagilimi,
-            'yaklasan_faturalar': [_row_to_dict(r) for r in faturalar],
-            'aktif_taksitler': [_row_to_dict(r) for r in taksitler],
-            'son_islemler': [_row_to_dict(r) for r in son_islemler],
-            'pending_reminders': pending_count,
-        })
     finally:
         conn.close()
+    return [dict(r) for r in rows]
 
 
-def getCurrentMonth():
-    now = date.today()
-    return f"{now.year}-{now.month:02d}"
-
-
-# ── Reminder API Endpoints ──────────────────────────────────
-
-@app.route('/api/masrafci/reminder-rules', methods=['GET'])
-@login_required
-def masrafci_reminder_rules_list():
-    conn = _get_masrafci_db()
+def _latest_notification_id():
+    conn = _get_notifications_db()
     try:
-        rows = conn.execute(
-            "SELECT * FROM bill_reminder_rules WHERE user = ? ORDER BY display_name ASC",
-            (session['user'],)
-        ).fetchall()
-        result = []
-        for r in rows:
-            d = dict(r)
-            d['enabled'] = bool(d.get('enabled'))
-            result.append(d)
-        return jsonify(result)
+        return conn.execute("SELECT COALESCE(MAX(id), 0) FROM notifications").fetchone()[0]
     finally:
         conn.close()
 
 
-@app.route('/api/masrafci/reminder-rules', methods=['POST'])
-@login_required
-def masrafci_reminder_rules_create():
+@app.route('/api/notification', methods=['POST'])
+def add_notification():
+    if 'user' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
     data = request.get_json(silent=True) or {}
-    display_name = (data.get('display_name') or '').strip()
-    if not display_name:
-        return jsonify({'error': 'display_name zorunludur'}), 400
+    message = str(data.get('message', '')).strip()
+    if not message:
+        return jsonify({'error': 'message alanı zorunludur'}), 400
+    notification_type = data.get('type', 'info')
+    if notification_type not in _NOTIFICATION_TYPES:
+        notification_type = 'info'
+    entry = add_notification_entry(message, notification_type, session['user'])
+    return jsonify({'success': True, 'id': entry['id']})
 
-    provider_key = _normalize_provider_key(display_name)
-    if not provider_key:
-        return jsonify({'error': 'Geçersiz kurum adı'}), 400
 
-    expected_start_day = data.get('expected_start_day', 1)
-    expected_end_day = data.get('expected_end_day', 28)
-    lead_days = data.get('lead_days', 3)
+@app.route('/api/notifications', methods=['GET'])
+@login_required
+def notifications_list():
+    """Newest-first page of notifications; ``before`` is the next_cursor of the previous page."""
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), NOTIFICATIONS_PAGE_SIZE_MAX)
+        before = int(request.args['before']) if request.args.get('before') else None
+    except ValueError:
+        return jsonify({'error': 'Geçersiz limit/before'}), 400
 
-    conn = _get_masrafci_db()
+    conn = _get_notifications_db()
     try:
-        conn.execute(
-            """INSERT INTO bill_reminder_rules
-               (user, provider_key, display_name, expected_start_day, expected_end_day, lead_days)
-               VALUES (?, ?, ?, ?, ?, ?)""",
-            (session['user'], provider_key, display_name, expected_start_day, expected_end_day, lead_days)
-        )
-        conn.commit()
-        return jsonify({'success': True, 'provider_key': provider_key}), 201
-    except sqlite3.IntegrityError:
-        return jsonify({'error': 'Bu kurum için hatırlatıcı zaten mevcut'}), 409
+        if before is None:
+            rows = conn.execute("SELECT * FROM notifications ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        else:
+            rows = conn.execute("SELECT * FROM notifications WHERE id < ? ORDER BY id DESC LIMIT ?",
+                                (before, limit)).fetchall()
+        marker = conn.execute("SELECT last_read_id FROM notification_reads WHERE user = ?",
+                              (session['user'],)).fetchone()
+        last_read_id = marker['last_read_id'] if marker else 0
+        unread = conn.execute("SELECT COUNT(*) FROM notifications WHERE id > ?", (last_read_id,)).fetchone()[0]
     finally:
         conn.close()
+    items = [dict(r, read=r['id'] <= last_read_id) for r in rows]
+    return jsonify({
+        'items': items,
+        'next_cursor': items[-1]['id'] if len(items) == limit else None,
+        'unread': unread,
+        'last_read_id': last_read_id,
+    })
 
 
-@app.route('/api/masrafci/reminder-rules/<int:rule_id>', methods=['PATCH'])
+@app.route('/api/notifications/read', methods=['POST'])
 @login_required
-def masrafci_reminder_rules_update(rule_id):
+def notifications_mark_read():
+    """Move the caller's read marker forward to ``up_to`` (default: newest notification)."""
     data = request.get_json(silent=True) or {}
-    conn = _get_masrafci_db()
+    conn = _get_notifications_db()
     try:
-        rule = conn.execute(
-            "SELECT * FROM bill_reminder_rules WHERE id = ? AND user = ?",
-            (rule_id, session['user'])
-        ).fetchone()
-        if not rule:
-            return jsonify({'error': 'Kural bulunamadı'}), 404
-
-        allowed = {'display_name', 'enabled', 'expected_start_day', 'expected_end_day', 'lead_days', 'snooze_until'}
-        sets = []
-        params = []
-        for key in allowed:
-            if key in data:
-                val = data[key]
-                if key == 'enabled':
-                    val = 1 if val else 0
-                if key == 'display_name':
-                    pkey = _normalize_provider_key(val)
-                    sets.append('provider_key = ?')
-                    params.append(pkey)
-                sets.append(f'{key} = ?')
-                params.append(val)
-        if not sets:
-            return jsonify({'error': 'Güncellenecek alan yok'}), 400
-
-        sets.append("updated_at = datetime('now','localtime')")
-        params.extend([rule_id, session['user']])
-        conn.execute(
-            f"UPDATE bill_reminder_rules SET {', '.join(sets)} WHERE id = ? AND user = ?",
-            params
-        )
+        up_to = data.get('up_to')
+        if up_to is None:
+            up_to = conn.execute("SELECT COALESCE(MAX(id), 0) FROM notifications").fetchone()[0]
+        try:
+            up_to = int(up_to)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Geçersiz up_to'}), 400
+        conn.execute("""
+            INSERT INTO notification_reads (user, last_read_id, updated_at) VALUES (?, ?, ?)
+            ON CONFLICT(user) DO UPDATE SET
+                last_read_id = MAX(last_read_id, excluded.last_read_id),
+                updated_at = excluded.updated_at
+        """, (session['user'], up_to, _notifications_now()))
         conn.commit()
-        return jsonify({'success': True})
+        last_read_id = conn.execute("SELECT last_read_id FROM notification_reads WHERE user = ?",
+                                    (session['user'],)).fetchone()[0]
     finally:
         conn.close()
+    return jsonify({'success': True, 'last_read_id': last_read_id})
+
+
+def _notification_events(last_id, heartbeat=15.0):
+    """SSE long-poll generator.
+
+    Ends after the first batch of notifications or after NOTIFICATIONS_STREAM_MAX_SEC,
+    whichever comes first, so a listener holds a worker thread only briefly; the
+    browser reconnects with Last-Event-ID.
+    """
+    yield 'retry: 1000\n\n'
+    started = last_beat = time.monotonic()
+    while time.monotonic() - started < NOTIFICATIONS_STREAM_MAX_SEC:
+        rows = _notifications_after(last_id)
+        for row in rows:
+            last_id = row['id']
+            yield f"id: {row['id']}\nevent: notification\ndata: {json.dumps(row, ensure_ascii=False)}\n\n"
+        if len(rows) == NOTIFICATIONS_PAGE_SIZE_MAX:
+            continue
+        if rows:
+            return
+        with _notifications_cond:
+            if _notifications_latest_id <= last_id:
+                _notifications_cond.wait(NOTIFICATIONS_POLL_SEC)
+        if time.monotonic() - last_beat >= heartbeat:
+            last_beat = time.monotonic()
+            yield ': keep-alive\n\n'
 
 
-@app.route('/api/masrafci/reminders', methods=['GET'])
+@app.route('/api/notifications/stream', methods=['GET'])
 @login_required
-def masrafci_reminders_list():
-    month = request.args.get('month', getCurrentMonth())
-    conn = _get_masrafci_db()
+def notifications_stream():
+    """Server-Sent Events stream of new notifications (resumes from Last-Event-ID)."""
+    since = request.headers.get('Last-Event-ID') or request.args.get('since')
     try:
-        rows = conn.execute("""
-            SELECT e.*, r.display_name, r.provider_key, r.expected_start_day, r.expected_end_day
-            FROM bill_reminder_events e
-            JOIN bill_reminder_rules r ON e.rule_id = r.id
-            WHERE r.user = ? AND e.month = ?
-            ORDER BY r.expected_start_day ASC
-        """, (session['user'], month)).fetchall()
-        return jsonify([dict(r) for r in rows])
-    finally:
-        conn.close()
+        last_id = int(since) if since else _latest_notification_id()
+    except ValueError:
+        return jsonify({'error': 'Geçersiz since'}), 400
+    resp = Response(_notification_events(last_id), mimetype='text/event-stream')
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['X-Accel-Buffering'] = 'no'
+    return resp
+
+@app.route('/api/gateway/stats', methods=['GET'])
+@login_required
+def gateway_stats():
+    return jsonify({
+        'upstream_pool': _upstream_pool.stats(),
+        'tokidb_cache': {'enabled': TOKIDB_CACHE_ENABLED, **_tokidb_cache.stats()},
+        'tokidb_coalescing': _tokidb_flight.stats(),
+        'tokidb_breaker': _tokidb_breaker.stats(),
+        'compression': _compression_stats.stats(),
+        'health': _health_monitor.snapshot(),
+        **{name: provider() for name, provider in _stats_providers.items()},
+        'settings_version': settings_version(),
+        'page_cache': {'enabled': MAZZEL_PAGE_CACHE_ENABLED, **_page_cache.stats()},
+    })
 
 
-@app.route('/api/masrafci/reminders/<int:event_id>/action', methods=['POST'])
-@login_required
-def masrafci_reminder_action(event_id):
-    data = request.get_json(silent=True) or {}
-    action = data.get('action', '')
-    if action not in ('add_now', 'snooze_3d', 'skip_month', 'disable_rule'):
-        return jsonify({'error': 'Geçersiz aksiyon'}), 400
+_PROCESS_STARTED_AT = time.time()
+
+
+def _cache_lookup_samples():
+    tokidb = _tokidb_cache.stats()
+    page = _page_cache.stats()
+    return [
+        (('tokidb', 'hit'), tokidb['hits']),
+        (('tokidb', 'stale'), tokidb['stale_hits']),
+        (('tokidb', 'miss'), tokidb['misses']),
+        (('tokidb', 'bypass'), tokidb['bypass']),
+        (('page', 'hit'), page['hits']),
+        (('page', 'miss'), page['misses']),
+    ]
+
+
+def _compression_byte_samples():
+    samples = []
+    for encoding, bucket in _compression_stats.stats()['encodings'].items():
+        samples.append(((encoding, 'in'), bucket['bytes_in']))
+        samples.append(((encoding, 'out'), bucket['bytes_out']))
+    return samples
+
+
+_metrics.register(CallbackMetric(
+    'gateway_process_start_time_seconds', 'Start time of this worker process (unix epoch).', ('pid',),
+    lambda: [((os.getpid(),), _PROCESS_STARTED_AT)]))
+_metrics.register(CallbackMetric(
+    'gateway_cache_lookups_total', 'Cache lookups by result.', ('cache', 'result'),
+    _cache_lookup_samples, kind='counter'))
+_metrics.register(CallbackMetric(
+    'gateway_cache_hit_ratio', 'Hits (fresh + stale) / lookups since start.', ('cache',),
+    lambda: [(('tokidb',), _tokidb_cache.stats()['hit_ratio']), (('page',), _page_cache.stats()['hit_ratio'])]))
+_metrics.register(CallbackMetric(
+    'gateway_cache_entries', 'Entries currently held in the cache.', ('cache',),
+    lambda: [(('tokidb',), _tokidb_cache.stats()['entries']), (('page',), _page_cache.stats()['entries'])]))
+_metrics.register(CallbackMetric(
+    'gateway_cache_bytes', 'Body bytes currently held in the TOKIDB cache.', ('cache',),
+    lambda: [(('tokidb',), _tokidb_cache.stats()['bytes'])]))
+_metrics.register(CallbackMetric(
+    'gateway_coalesced_requests_total', 'Single-flight calls by role.', ('role',),
+    lambda: [((role,), value) for role, value in _tokidb_flight.stats().items() if role != 'in_flight'],
+    kind='counter'))
+_metrics.register(CallbackMetric(
+    'gateway_upstream_connections_total', 'Upstream pool connections by outcome.', ('outcome',),
+    lambda: [(('created',), _upstream_pool.stats()['created']), (('reused',), _upstream_pool.stats()['reused'])],
+    kind='counter'))
+_metrics.register(CallbackMetric(
+    'gateway_circuit_breaker_open', '1 while the upstream circuit breaker rejects requests.', ('upstream',),
+    lambda: [(('tokidb',), int(_tokidb_breaker.stats()['state'] != 'closed'))]))
+_metrics.register(CallbackMetric(
+    'gateway_upstream_up', 'Last health probe result (1 ok, 0 failing).', ('upstream',),
+    lambda: [((name,), None if st['ok'] is None else int(st['ok']))
+             for name, st in _health_monitor.snapshot().items()]))
+_metrics.register(CallbackMetric(
+    'gateway_compression_bytes_total', 'Bytes before/after gateway compression.', ('encoding', 'direction'),
+    _compression_byte_samples, kind='counter'))
+_metrics.register(CallbackMetric(
+    'gateway_settings_version', 'Settings cache version seen by this worker.', (),
+    lambda: [((), settings_version())]))
 
-    conn = _get_masrafci_db()
-    try:
-        event = conn.execute("""
-            SELECT e.*, r.display_name, r.provider_key, r.user
-            FROM bill_reminder_events e
-            JOIN bill_reminder_rules r ON e.rule_id = r.id
-            WHERE e.id = ?
-        """, (event_id,)).fetchone()
-        if not event or event['user'] != session['user']:
-            return jsonify({'error': 'Event bulunamadı'}), 404
-
-        now_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-        if action == 'add_now':
-            conn.execute(
-                "UPDATE bill_reminder_events SET status = 'prompted', prompted_at = ? WHERE id = ?",
-                (now_str, event_id)
-            )
-            conn.commit()
-            return jsonify({
-                'success': True,
-                'redirect': 'add-record',
-                'display_name': event['display_name'],
-            })
-
-        elif action == 'snooze_3d':
-            snooze_date = (date.today() + timedelta(days=3)).isoformat()
-            conn.execute(
-                "UPDATE bill_reminder_rules SET snooze_until = ? WHERE id = ?",
-                (snooze_date, event['rule_id'])
-            )
-            conn.execute("DELETE FROM bill_reminder_events WHERE id = ?", (event_id,))
-            conn.commit()
-            return jsonify({'success': True})
-
-        elif action == 'skip_month':
-            conn.execute(
-                "UPDATE bill_reminder_events SET status = 'skipped_month', answered_at = ? WHERE id = ?",
-                (now_str, event_id)
-            )
-            conn.commit()
-            return jsonify({'success': True})
-
-        elif action == 'disable_rule':
-            conn.execute(
-                "UPDATE bill_reminder_rules SET enabled = 0 WHERE id = ?",
-                (event['rule_id'],)
-            )
-            conn.execute(
-                "UPDATE bill_reminder_events SET status = 'dismissed', answered_at = ? WHERE id = ?",
-                (now_str, event_id)
-            )
-            conn.commit()
-            return jsonify({'success': True})
-
-        return jsonify({'error': 'Bilinmeyen aksiyon'}), 400
-    finally:
-        conn.close()
+@app.route('/logout')
+def logout():
+    session.pop('user', None)
+    return redirect(url_for('login'))
 
+# Moduller icin placeholder
+@app.route('/teklif/')
+def teklif():
+    if 'user' not in session:
+        return redirect(url_for('login'))
+    return render_template('module_placeholder.html', user=session['user'], module_name="Teklif Hazırlama", module_icon="fa-file-invoice-dollar", active_page='teklif')
 
-@app.route('/api/masrafci/reminder-check/run', methods=['POST'])
+@app.route('/mail/')
 @login_required
-def masrafci_reminder_check_run():
-    data = request.get_json(silent=True) or {}
-    month = data.get('month', getCurrentMonth())
-    conn = _get_masrafci_db()
-    try:
-        pending = _run_reminder_check(conn, session['user'], month)
-        return jsonify(pending)
-    finally:
-        conn.close()
+def mail():
+    return render_template('module_placeholder.html', user=session['user'], module_name="Mazzel Mail", module_icon="fa-envelope", active_page='mail')
+
+@app.route('/maliyet/')
+@login_required
+def maliyet():
+    return render_template('module_placeholder.html',
+                         module_name="Maliyet Hesaplama",
+                         module_icon="fa-calculator",
+                         active_page='maliyet',
+                         user=session.get('user'))
+
+@app.route('/raporlar/')
+@login_required
+def raporlar():
+    if 'user' not in session:
+        return redirect(url_for('login'))
+    return render_template('module_placeholder.html', user=session['user'], module_name="Raporlar", module_icon="fa-chart-bar")
+
+@app.route('/hizmetler')
+def hizmetler():
+    return _render_cached_page('page_hizmetler.html')
+
+@app.route('/referanslar')
+def referanslar():
+    return _render_cached_page('page_referanslar.html')
+
+@app.route('/iletisim')
+def iletisim():
+    return _render_cached_page('page_iletisim.html')
+
+# ── Subsystem blueprints ───────────────────────────────────
+# Her alt sistem blueprints/ altinda kendi modulunde durur ve yalnizca
+# MAZZEL_SUBSYSTEMS ile etkinse import edilip kaydedilir (varsayilan: all,
+# 'none' yalnizca core).
+# Kapali bir alt sistemin modulu hic yuklenmez; route'lari 404 doner.
+
+SUBSYSTEMS = ('tokidb', 'tetra', 'nesting', 'masrafci')
+
+def _parse_subsystems(raw):
+    raw = raw.strip().lower()
+    if raw in ('all', '*'):
+        return set(SUBSYSTEMS)
+    if raw in ('', 'none'):
+        return set()
+    names = {part.strip() for part in raw.split(',') if part.strip()}
+    unknown = names - set(SUBSYSTEMS)
+    if unknown:
+        print(f"MAZZEL_SUBSYSTEMS: bilinmeyen alt sistem(ler) yok sayildi: {', '.join(sorted(unknown))}")
+    return names & set(SUBSYSTEMS)
+
+ENABLED_SUBSYSTEMS = _parse_subsystems(os.environ.get('MAZZEL_SUBSYSTEMS', 'all'))
+
+# Blueprint'lerin core'a kaydettigi kancalar: ilk istekte baslatilacak arka
+# plan isleri ve /api/gateway/stats'a eklenecek durum saglayicilari.
+_background_starters = []
+_stats_providers = {}
+
+def subsystem_enabled(name):
+    return name in ENABLED_SUBSYSTEMS
+
+app.jinja_env.globals['subsystem_enabled'] = subsystem_enabled
+
+@app.before_request
+def _ensure_background_workers():
+    if not _health_monitor.started:
+        _health_monitor.start()
+    for starter in _background_starters:
+        starter()
+
+def _register_subsystems():
+    for name in SUBSYSTEMS:
+        if name in ENABLED_SUBSYSTEMS:
+            module = importlib.import_module(f'blueprints.{name}')
+            app.register_blueprint(module.bp)
+
+if __name__ == '__main__':
+    # python app.py: blueprint'ler 'from app import ...' ile ayni modulu gorsun.
+    sys.modules.setdefault('app', sys.modules[__name__])
 
+_register_subsystems()
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=False)
@@ -0,0 +1,534 @@
+"""Async (ASGI) gateway mode.
+
+The TOKIDB proxy routes (``/api/tokidb/health`` and ``/api/tokidb/<path>``) are
+served natively on an asyncio event loop with a keep-alive upstream pool, so
+thousands of slow upstream calls can be in flight without a thread each. Every
+other route is the unchanged Flask app, run on a worker thread pool.
+
+Session auth, the response cache, the circuit breaker and the request/response
+shaping helpers (``app._tokidb_*``) are shared with the threaded mode in ``app.py``.
+
+    pip install uvicorn
+    python asgi.py                      # or: uvicorn asgi:application
+"""
+
+import asyncio
+import io
+import json
+import os
+import ssl
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from werkzeug.datastructures import Headers
+
+import app as gateway
+
+try:
+    # Host basina es zamanli upstream baglanti siniri (threaded modda TOKIDB_POOL_MAXSIZE).
+    ASGI_UPSTREAM_MAX_CONNECTIONS = int(os.environ.get('ASGI_UPSTREAM_MAX_CONNECTIONS', '4096'))
+except Exception:
+    ASGI_UPSTREAM_MAX_CONNECTIONS = 4096
+try:
+    # Flask rotalari icin is parcacigi havuzu (proxy disindaki tum istekler).
+    ASGI_WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS', '32'))
+except Exception:
+    ASGI_WSGI_THREADS = 32
+
+
+# ── Session auth ─────────────────────────────────────────────────────────────
+
+def _session_user(headers):
+    """Return session['user'] from the signed Flask session cookie, or None."""
+    flask_app = gateway.app
+    interface = flask_app.session_interface
+    serializer = interface.get_signing_serializer(flask_app)
+    if serializer is None:
+        return None
+    cookie_name = interface.get_cookie_name(flask_app)
+    value = None
+    for part in headers.get('Cookie', '').split(';'):
+        name, _, raw = part.strip().partition('=')
+        if name == cookie_name:
+            value = raw.strip('"')
+    if not value:
+        return None
+    max_age = int(flask_app.permanent_session_lifetime.total_seconds())
+    try:
+        data = serializer.loads(value, max_age=max_age)
+    except Exception:
+        return None
+    return data.get('user')
+
+
+# ── ASGI helpers ─────────────────────────────────────────────────────────────
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+
+async def _send_json(send, payload, status, extra_headers=()):
+    body = json.dumps(payload).encode('utf-8')
+    headers = [(b'content-type', b'application/json'),
+               (b'content-length', str(len(body)).encode('latin-1'))]
+    headers.extend((k.encode('latin-1'), v.encode('latin-1')) for k, v in extra_headers)
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def _encode_headers(header_items):
+    return [(key.encode('latin-1'), value.encode('latin-1')) for key, value in header_items]
+
+
+# ── Async upstream connection pool ───────────────────────────────────────────
+
+class AsyncUpstreamPool:
+    """asyncio counterpart of app.UpstreamPool: keep-alive HTTP/1.1 connections per host."""
+
+    _IDEMPOTENT = gateway.UpstreamPool._IDEMPOTENT
+
+    def __init__(self, maxsize_per_host, idle_timeout=gateway.UPSTREAM_IDLE_TIMEOUT_SEC):
+        self.maxsize_per_host = max(1, maxsize_per_host)
+        self.idle_timeout = idle_timeout
+        self._idle = {}    # key -> [(reader, writer, last_used), ...]
+        self._slots = {}   # key -> asyncio.Semaphore
+        self.created = 0
+        self.reused = 0
+
+    def _take_idle(self, key):
+        now = time.monotonic()
+        idle = self._idle.get(key, [])
+        while idle:
+            reader, writer, last_used = idle.pop()
+            if now - last_used < self.idle_timeout and not reader.at_eof():
+                self.reused += 1
+                return reader, writer
+            writer.close()
+        return None
+
+    async def _new_conn(self, key, timeout):
+        scheme, host, port = key
+        self.created += 1
+        context = ssl.create_default_context() if scheme == 'https' else None
+        return await asyncio.wait_for(asyncio.open_connection(host, port, ssl=context), timeout)
+
+    def _put_idle(self, key, reader, writer):
+        self._idle.setdefault(key, []).append((reader, writer, time.monotonic()))
+
+    async def urlopen(self, method, url, body=None, headers=None, timeout=10.0):
+        """Send a request and return an AsyncUpstreamResponse; the caller must close() it."""
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+        target = parts.path or '/'
+        if parts.query:
+            target = f"{target}?{parts.query}"
+        lines = [f"{method} {target} HTTP/1.1", f"Host: {parts.netloc}"]
+        lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        if body is not None:
+            lines.append(f"Content-Length: {len(body)}")
+        request = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + (body or b'')
+
+        slot = self._slots.setdefault(key, asyncio.Semaphore(self.maxsize_per_host))
+        try:
+            await asyncio.wait_for(slot.acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise gateway.UpstreamBusy(f'No free connection to {key[1]}:{key[2]}') from None
+        try:
+            conn = self._take_idle(key)
+            reused = conn is not None
+            if conn is None:
+                conn = await self._new_conn(key, timeout)
+            try:
+                head = await self._exchange(conn, request, timeout)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                conn[1].close()
+                # Idle keep-alive baglantisi sunucu tarafinda kapanmis olabilir: bir kez tekrar dene.
+                if not reused or method not in self._IDEMPOTENT:
+                    raise ConnectionResetError('Upstream closed the connection') from None
+                conn = await self._new_conn(key, timeout)
+                head = await self._exchange(conn, request, timeout)
+            return AsyncUpstreamResponse(self, key, conn, head, method, slot, timeout)
+        except BaseException:
+            slot.release()
+            raise
+
+    @staticmethod
+    async def _exchange(conn, request, timeout):
+        reader, writer = conn
+        writer.write(request)
+        await writer.drain()
+        try:
+            return await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), timeout)
+        except asyncio.LimitOverrunError:
+            writer.close()
+            raise ConnectionError('Upstream response headers too large') from None
+
+    def stats(self):
+        idle = sum(len(v) for v in self._idle.values())
+        return {'created': self.created, 'reused': self.reused, 'idle': idle}
+
+    def close(self):
+        for idle in self._idle.values():
+            for _reader, writer, _last_used in idle:
+                writer.close()
+        self._idle.clear()
+
+
+class AsyncUpstreamResponse:
+    def __init__(self, pool, key, conn, head, method, slot, timeout):
+        self._pool = pool
+        self._key = key
+        self._conn = conn
+        self._slot = slot
+        self._timeout = timeout
+        status_line, *header_lines = head.decode('latin-1').split('\r\n')
+        try:
+            self.status = int(status_line.split(' ', 2)[1])
+        except (IndexError, ValueError):
+            self.close()
+            raise ConnectionError(f'Bad upstream status line: {status_line!r}') from None
+        self.headers = Headers()
+        for line in header_lines:
+            if line:
+                name, _, value = line.partition(':')
+                self.headers.add(name.strip(), value.strip())
+
+        self.will_close = 'close' in self.headers.get('Connection', '').lower()
+        self._chunked = 'chunked' in self.headers.get('Transfer-Encoding', '').lower()
+        self._remaining = None   # None -> EOF'a kadar oku
+        if method == 'HEAD' or self.status in (204, 304) or 100 <= self.status < 200:
+            self._remaining = 0
+            self._chunked = False
+        elif not self._chunked:
+            length = self.headers.get('Content-Length', '')
+            if length.isdigit():
+                self._remaining = int(length)
+            else:
+                self.will_close = True
+        self._done = self._remaining == 0
+
+    async def _read(self, coro):
+        return await asyncio.wait_for(coro, self._timeout)
+
+    async def iter_content(self, chunk_size=gateway.UPSTREAM_STREAM_CHUNK):
+        reader = self._conn[0]
+        try:
+            while not self._done:
+                if self._chunked:
+                    size_line = await self._read(reader.readuntil(b'\r\n'))
+                    size = int(size_line.split(b';', 1)[0].strip() or b'0', 16)
+                    if size == 0:
+                        # Trailer bolumu bos satirla biter.
+                        while (await self._read(reader.readuntil(b'\r\n'))) != b'\r\n':
+                            pass
+                        self._done = True
+                        break
+                    while size:
+                        chunk = await self._read(reader.readexactly(min(size, chunk_size)))
+                        size -= len(chunk)
+                        yield chunk
+                    await self._read(reader.readexactly(2))
+                elif self._remaining is None:
+                    chunk = await self._read(reader.read(chunk_size))
+                    if not chunk:
+                        self._done = True
+                        break
+                    yield chunk
+                else:
+                    chunk = await self._read(reader.readexactly(min(self._remaining, chunk_size)))
+                    self._remaining -= len(chunk)
+                    self._done = self._remaining == 0
+                    yield chunk
+        finally:
+            self.close()
+
+    async def read(self):
+        return b''.join([chunk async for chunk in self.iter_content()])
+
+    def close(self):
+        if self._conn is None:
+            return
+        (reader, writer), self._conn = self._conn, None
+        # Govde sonuna kadar okunduysa baglanti havuza geri doner.
+        if self._done and not self.will_close:
+            self._pool._put_idle(self._key, reader, writer)
+        else:
+            writer.close()
+        self._slot.release()
+
+
+# ── Async TOKIDB proxy ───────────────────────────────────────────────────────
+
+class AsyncTokidbProxy:
+    """Event-loop counterpart of app._proxy_url (cache -> breaker -> coalesce -> stream)."""
+
+    def __init__(self):
+        self.pool = AsyncUpstreamPool(ASGI_UPSTREAM_MAX_CONNECTIONS)
+        self._inflight = {}
+
+    async def _fetch(self, method, url, headers, body):
+        """Send the request; small bodies are read fully so they can be shared/cached."""
+        started = time.perf_counter()
+        upstream = await self.pool.urlopen(method, url, body=body, headers=headers,
+                                           timeout=gateway.TOKIDB_TIMEOUT_SEC)
+        fetched = {'status': upstream.status, 'headers': list(upstream.headers.items()),
+                   'body': None, 'stream': None}
+        length = upstream.headers.get('Content-Length', '')
+        if method == 'HEAD' or (method == 'GET' and length.isdigit()
+                                and int(length) <= gateway.TOKIDB_COALESCE_MAX_BYTES):
+            fetched['body'] = await upstream.read()
+        else:
+            fetched['stream'] = upstream
+        gateway._upstream_duration.observe(time.perf_counter() - started, 'tokidb', method, str(upstream.status))
+        return fetched
+
+    async def _fetch_shared(self, key, url, headers):
+        future = self._inflight.get(key)
+        if future is not None:
+            gateway._tokidb_flight.count('coalesced')
+            try:
+                fetched = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # Lider istemci baglantiyi kapatti; takipci istegi kendisi yapar.
+                return await self._fetch('GET', url, headers, None), True
+            if fetched['body'] is None:
+                # Lider govdeyi akitti, paylasilamaz: bu istek kendi baglantisini acar.
+                gateway._tokidb_flight.count('unshareable')
+                return await self._fetch('GET', url, headers, None), True
+            return fetched, True
+
+        gateway._tokidb_flight.count('leaders')
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            fetched = await self._fetch('GET', url, headers, None)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Takipci yoksa "exception never retrieved" uyarisini bastir.
+            future.exception()
+            raise
+        else:
+            future.set_result(fetched)
+            return fetched, False
+        finally:
+            self._inflight.pop(key, None)
+
+    async def __call__(self, scope, receive, send, url, incoming):
+        method = scope['method'].upper()
+        body = None
+        if method not in ('GET', 'HEAD'):
+            body = await _read_body(receive)
+        timeout = gateway.TOKIDB_TIMEOUT_SEC
+        headers, upstream_path, rule, cache_key, flight_key = gateway._tokidb_request_plan(method, url, incoming)
+        entry, state = gateway._tokidb_cache_lookup(cache_key, url, headers, timeout, rule)
+        if entry is not None:
+            payload, reply_headers = gateway._cached_entry_parts(entry, state, incoming.get('Accept-Encoding'))
+            reply_headers.append(('Content-Length', str(len(payload))))
+            await send({'type': 'http.response.start', 'status': entry['status'],
+                        'headers': _encode_headers(reply_headers)})
+            await send({'type': 'http.response.body', 'body': payload})
+            return
+
+        circuit = gateway._tokidb_circuit_reply()
+        if circuit is not None:
+            await _send_json(send, *circuit)
+            return
+
+        try:
+            if method == 'GET':
+                fetched, shared = await self._fetch_shared(flight_key, url, headers)
+                if not shared:
+                    gateway._store_in_cache(cache_key, fetched, rule)
+            else:
+                fetched = await self._fetch(method, url, headers, body)
+        except (gateway.UpstreamBusy, OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+            timed_out = isinstance(e, (asyncio.TimeoutError, TimeoutError))
+            await _send_json(send, *gateway._tokidb_failure_reply(e, timed_out))
+            return
+
+        reply_headers = gateway._tokidb_response_headers(method, upstream_path, fetched, rule)
+        await send({'type': 'http.response.start', 'status': fetched['status'],
+                    'headers': _encode_headers(reply_headers)})
+        if fetched['body'] is not None:
+            await send({'type': 'http.response.body', 'body': fetched['body']})
+            return
+        upstream = fetched['stream']
+        try:
+            async for chunk in upstream.iter_content():
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            upstream.close()
+
+
+# ── WSGI bridge (all other Flask routes) ────────────────────────────────────
+
+class WSGIBridge:
+    """Run a WSGI app on a thread pool and stream its iterable back over ASGI."""
+
+    def __init__(self, wsgi_app, max_workers):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='asgi-wsgi')
+
+    @staticmethod
+    def _environ(scope, body):
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', ''),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope['query_string'].decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for raw_key, raw_value in scope['headers']:
+            key = raw_key.decode('latin-1').upper().replace('-', '_')
+            value = raw_value.decode('latin-1')
+            if key == 'CONTENT_TYPE':
+                environ['CONTENT_TYPE'] = value
+            elif key != 'CONTENT_LENGTH':
+                key = f'HTTP_{key}'
+                environ[key] = f'{environ[key]},{value}' if key in environ else value
+        return environ
+
+    async def __call__(self, scope, receive, send):
+        body = await _read_body(receive)
+        environ = self._environ(scope, body)
+        loop = asyncio.get_running_loop()
+        started = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [(k.encode('latin-1'), v.encode('latin-1')) for k, v in response_headers]
+            return lambda data: None
+
+        iterable = await loop.run_in_executor(self.executor, self.wsgi_app, environ, start_response)
+        iterator = iter(iterable)
+        sentinel = object()
+        try:
+            first = await loop.run_in_executor(self.executor, next, iterator, sentinel)
+            await send({'type': 'http.response.start', 'status': started['status'],
+                        'headers': started['headers']})
+            chunk = first
+            while chunk is not sentinel:
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk = await loop.run_in_executor(self.executor, next, iterator, sentinel)
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            close = getattr(iterable, 'close', None)
+            if close is not None:
+                await loop.run_in_executor(self.executor, close)
+
+
+# ── Application ──────────────────────────────────────────────────────────────
+
+class GatewayASGI:
+    def __init__(self):
+        self.proxy = AsyncTokidbProxy()
+        self.wsgi = WSGIBridge(gateway.app.wsgi_app, ASGI_WSGI_THREADS)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                gateway._ensure_background_workers()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.proxy.pool.close()
+                self.wsgi.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _proxy_target(self, scope):
+        # Flask rotalariyla ayni eslesme: health yalnizca GET/HEAD, diger metodlar
+        # <path:subpath> kuralina duser. Izin verilmeyen metodlar (OPTIONS dahil)
+        # Flask'a birakilir; 405/Allow yaniti threaded modla birebir ayni olur.
+        if not gateway.subsystem_enabled('tokidb'):
+            return None
+        path = scope['path']
+        method = scope['method'].upper()
+        if path == '/api/tokidb/health' and method in ('GET', 'HEAD'):
+            return f"{gateway.TOKIDB_BASE_URL}/health"
+        prefix = '/api/tokidb/'
+        if path.startswith(prefix) and len(path) > len(prefix):
+            if method != 'HEAD' and method not in gateway.TOKIDB_PROXY_METHODS:
+                return None
+            return gateway._tokidb_target_url(path[len(prefix):], scope['query_string'])
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+        url = self._proxy_target(scope)
+        if url is None:
+            await self.wsgi(scope, receive, send)
+            return
+        if not gateway.MAZZEL_METRICS_ENABLED:
+            await self._proxy(scope, receive, send, url)
+            return
+        # Flask hook'lari bu yolu gormez; ayni metrikler burada Flask endpoint adiyla tutulur.
+        started = time.perf_counter()
+        status = {'code': 500}
+
+        async def send_observed(message):
+            if message['type'] == 'http.response.start':
+                status['code'] = message['status']
+            await send(message)
+
+        try:
+            await self._proxy(scope, receive, send_observed, url)
+        finally:
+            endpoint = 'tokidb.tokidb_health' if scope['path'] == '/api/tokidb/health' else 'tokidb.tokidb_api_proxy'
+            labels = (endpoint, scope['method'], str(status['code']))
+            gateway._http_requests.inc(*labels)
+            gateway._http_request_duration.observe(time.perf_counter() - started, *labels)
+
+    async def _proxy(self, scope, receive, send, url):
+        incoming = Headers([(k.decode('latin-1'), v.decode('latin-1')) for k, v in scope['headers']])
+        if _session_user(incoming) is None:
+            await _send_json(send, {'error': 'Unauthorized'}, 401)
+            return
+        await self.proxy(scope, receive, send, url, incoming)
+
+
+application = GatewayASGI()
+
+
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("ASGI modu icin uvicorn gerekli: pip install uvicorn")
+    uvicorn.run(application, host=os.environ.get('ASGI_HOST', '0.0.0.0'),
+                port=int(os.environ.get('ASGI_PORT', '5000')), log_level='warning')
@@ -0,0 +1,188 @@
+"""Threaded (werkzeug) vs ASGI (uvicorn) gateway under many slow upstream calls.
+
+Starts a local asyncio stub that answers every request after --delay seconds,
+boots the gateway in both modes against it, logs in, and fires --requests
+proxied GETs with --concurrency clients. Query strings are unique so neither
+the cache nor request coalescing hides the upstream latency.
+
+    python bench/asgi_vs_threaded.py --concurrency 1000 --requests 4000
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+async def _run_stub(port, delay):
+    async def handle(reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                length = 0
+                for line in head.split(b'\r\n'):
+                    if line.lower().startswith(b'content-length:'):
+                        length = int(line.split(b':', 1)[1])
+                if length:
+                    await reader.readexactly(length)
+                await asyncio.sleep(delay)
+                body = b'{"ok": true}'
+                writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                             b'Content-Length: %d\r\n\r\n%s' % (len(body), body))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.CancelledError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, '127.0.0.1', port, backlog=4096)
+    async with server:
+        await server.serve_forever()
+
+
+def _start_gateway(mode, port, env):
+    if mode == 'threaded':
+        code = ("import app; app.app.run(host='127.0.0.1', port=%d, threaded=True)" % port)
+        cmd = [sys.executable, '-c', code]
+    else:
+        cmd = [sys.executable, '-m', 'uvicorn', 'asgi:application', '--host', '127.0.0.1',
+               '--port', str(port), '--log-level', 'warning', '--backlog', '4096']
+    return subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def _request(reader, writer, method, target, headers=(), body=b''):
+    """Minimal keep-alive HTTP/1.1 client; the load generator must not be the bottleneck."""
+    lines = [f'{method} {target} HTTP/1.1', 'Host: bench']
+    lines.extend(f'{k}: {v}' for k, v in headers)
+    lines.append(f'Content-Length: {len(body)}')
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+    await writer.drain()
+    head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+    version, status = head[0].split(' ')[:2]
+    resp_headers = [line.split(':', 1) for line in head[1:] if ':' in line]
+    fields = {k.strip().lower(): v.strip() for k, v in resp_headers}
+    keep_alive = version == 'HTTP/1.1' and fields.get('connection', '').lower() != 'close'
+    if fields.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif 'content-length' in fields:
+        await reader.readexactly(int(fields['content-length']))
+    else:
+        await reader.read()
+        keep_alive = False
+    return int(status), resp_headers, keep_alive
+
+
+async def _wait_ready(port):
+    for _ in range(100):
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            await _request(reader, writer, 'GET', '/login')
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f'gateway did not start on port {port}')
+
+
+async def _login(port, user, password):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    form = urlencode({'username': user, 'password': password}).encode()
+    _status, headers, _keep_alive = await _request(reader, writer, 'POST', '/login',
+                                      [('Content-Type', 'application/x-www-form-urlencoded')], form)
+    writer.close()
+    for name, value in headers:
+        if name.lower() == 'set-cookie' and value.strip().startswith('session='):
+            return value.strip().split(';', 1)[0]
+    raise RuntimeError('login failed')
+
+
+async def _drive(port, cookie, total, concurrency):
+    latencies, errors = [], 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                status, _headers, keep_alive = await asyncio.wait_for(
+                    _request(reader, writer, 'GET', f'/api/tokidb/items?n={i}', [('Cookie', cookie)]), 60)
+                if status != 200:
+                    errors += 1
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                errors += 1
+                keep_alive = False
+            latencies.append(time.perf_counter() - start)
+            if not keep_alive:
+                # werkzeug gelistirme sunucusu HTTP/1.0 konusur: her istekte yeni baglanti.
+                writer.close()
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'rps': total / elapsed,
+        'p50': statistics.median(latencies) * 1000,
+        'p95': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        'errors': errors,
+        'elapsed': elapsed,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=500)
+    parser.add_argument('--delay', type=float, default=0.2, help='stub upstream latency (s)')
+    parser.add_argument('--modes', default='threaded,asgi')
+    args = parser.parse_args()
+
+    stub_port = _free_port()
+    stub = asyncio.create_task(_run_stub(stub_port, args.delay))
+    user, password = 'bench', 'bench-pass'
+    data_dir = tempfile.mkdtemp(prefix='mazzel-bench-')
+    env = dict(os.environ, TOKIDB_BASE_URL=f'http://127.0.0.1:{stub_port}',
+               MAZZEL_ADMIN_USER=user, MAZZEL_ADMIN_PASSWORD=password,
+               MAZZEL_DATA_DIR=data_dir, MASRAFCI_REMINDER_SCHEDULER='0',
+               TOKIDB_POOL_MAXSIZE=str(args.concurrency), TOKIDB_BREAKER_FAILURES='1000000')
+
+    print(f'{args.requests} requests, {args.concurrency} concurrent, upstream delay {args.delay * 1000:.0f}ms')
+    print(f"{'mode':<10}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+    for mode in args.modes.split(','):
+        port = _free_port()
+        proc = _start_gateway(mode, port, env)
+        try:
+            await _wait_ready(port)
+            cookie = await _login(port, user, password)
+            r = await _drive(port, cookie, args.requests, args.concurrency)
+            print(f"{mode:<10}{r['rps']:>10.1f}{r['p50']:>10.1f}{r['p95']:>10.1f}{r['errors']:>8}")
+        finally:
+            proc.terminate()
+            proc.wait()
+    stub.cancel()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,283 @@
+"""Gateway benchmark: core routes against seeded fixtures, compared with a saved baseline.
+
+Seeds a temporary MAZZEL_DATA_DIR (nesting catalog with --scale customers/materials,
+masrafci.db with --records rows), boots the gateway (serve.py, dev server or ASGI)
+against a local TOKIDB stub and drives login, dashboard, the catalog APIs, the
+masrafci summary and proxied /api/tokidb/* calls with --concurrency keep-alive
+clients for --duration seconds.
+
+    python bench/gateway_bench.py --scale 2000 --records 50000 --save-baseline bench/baseline.json
+    python bench/gateway_bench.py --scale 2000 --records 50000 --baseline bench/baseline.json
+
+With --baseline each route's RPS and p50/p95/p99 are compared to the saved run;
+--fail-on-regression exits 1 when any route is slower than --tolerance allows.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+from asgi_vs_threaded import ROOT, _free_port, _login, _request, _run_stub, _wait_ready
+
+USER, PASSWORD = 'bench', 'bench-pass'
+
+# (isim, method, path, giris gerekli mi, basarili sayilan status kodlari)
+SCENARIOS = [
+    ('login', 'POST', '/login', False, (302,)),
+    ('dashboard', 'GET', '/dashboard', True, (200,)),
+    ('materials', 'GET', '/api/materials', True, (200,)),
+    ('customers', 'GET', '/api/customers', True, (200,)),
+    ('masrafci_summary', 'GET', '/api/masrafci/summary', True, (200,)),
+    ('tokidb_list', 'GET', '/api/tokidb/projects?page={n}', True, (200,)),
+    ('tokidb_detail', 'GET', '/api/tokidb/projects/{n}', True, (200,)),
+]
+
+_SEED_MASRAFCI = r'''
+import random, sys
+import app
+from blueprints import masrafci
+user, count = sys.argv[1], int(sys.argv[2])
+rng = random.Random(42)
+types = ['harcama', 'fatura', 'kredikarti', 'alacakli']
+categories = ['market', 'kira', 'elektrik', 'dogalgaz', 'internet', 'ulasim', 'saglik', 'egitim']
+providers = ['Enerjisa', 'IGDAS', 'Turk Telekom', 'Superonline', 'ISKI', None]
+months = [f'{y}-{m:02d}' for y in (2024, 2025) for m in range(1, 13)]
+conn = masrafci._get_masrafci_db()
+rows = []
+for i in range(count):
+    kurum = rng.choice(providers)
+    rows.append((user, rng.choice(types), f'Kayit {i}', round(rng.uniform(10, 5000), 2),
+                 rng.choice(months), rng.choice(categories), kurum,
+                 masrafci._normalize_provider_key(kurum) if kurum else None,
+                 rng.choice(['odendi', 'odenmedi'])))
+conn.executemany(
+    "INSERT INTO records (user, type, ad, tutar, ay, kategori, kurum, provider_key, durum) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+masrafci._rebuild_masrafci_rollups(conn)
+conn.commit()
+conn.close()
+'''
+
+
+def seed_fixtures(data_dir, scale, records, env):
+    """Write nesting_data.json and masrafci.db under data_dir."""
+    rng = random.Random(42)
+    categories = ['MDF', 'Sunta', 'Kontrplak', 'Masif', 'Lake']
+    nesting = {
+        'customers': [
+            {'id': f'cust_{i}', 'name': f'Musteri {i}', 'phone': f'0555{i:07d}',
+             'email': f'musteri{i}@example.com', 'address': f'Adres {i}', 'status': 'active',
+             'created_at': '2025-01-01'}
+            for i in range(scale)
+        ],
+        'materials': [
+            {'id': f'mat_{i}', 'name': f'Malzeme {i}', 'category': rng.choice(categories),
+             'thickness': rng.choice([8, 12, 18, 25]), 'width': 2800, 'height': 2100,
+             'price': round(rng.uniform(200, 3000), 2), 'status': 'active'}
+            for i in range(scale)
+        ],
+        'nesting_projects': [],
+    }
+    with open(os.path.join(data_dir, 'nesting_data.json'), 'w', encoding='utf-8') as f:
+        json.dump(nesting, f, ensure_ascii=False)
+    if records:
+        subprocess.run([sys.executable, '-c', _SEED_MASRAFCI, USER, str(records)],
+                       cwd=ROOT, env=env, check=True)
+
+
+def _start(server, port, env, workers, threads):
+    if server == 'dev':
+        code = "import app; app.app.run(host='127.0.0.1', port=%d, threaded=True)" % port
+        cmd = [sys.executable, '-c', code]
+    elif server == 'asgi':
+        cmd = [sys.executable, '-m', 'uvicorn', 'asgi:application', '--host', '127.0.0.1',
+               '--port', str(port), '--log-level', 'warning']
+    else:
+        env = dict(env, MAZZEL_BIND=f'127.0.0.1:{port}', MAZZEL_WORKERS=str(workers),
+                   MAZZEL_THREADS=str(threads))
+        cmd = [sys.executable, 'serve.py']
+    return subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def _drive(port, cookie, scenarios, concurrency, duration, warmup):
+    samples = {name: [] for name, *_rest in scenarios}
+    errors = {name: 0 for name, *_rest in scenarios}
+    login_form = urlencode({'username': USER, 'password': PASSWORD}).encode()
+    counter = itertools.count()
+    measure_from = time.perf_counter() + warmup
+    deadline = measure_from + duration
+
+    async def worker(offset):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        for name, method, path, auth, ok in itertools.islice(itertools.cycle(scenarios), offset, None):
+            if time.perf_counter() >= deadline:
+                break
+            headers = [('Accept-Encoding', 'gzip')]
+            body = b''
+            if auth:
+                headers.append(('Cookie', cookie))
+            if method == 'POST':
+                headers.append(('Content-Type', 'application/x-www-form-urlencoded'))
+                body = login_form
+            # Az sayida tekrar eden upstream path'i: cache ve coalescing gercekci sekilde devrede.
+            target = path.format(n=next(counter) % 50)
+            start = time.perf_counter()
+            try:
+                status, _headers, keep_alive = await asyncio.wait_for(
+                    _request(reader, writer, method, target, headers, body), 30)
+                failed = status not in ok
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                failed, keep_alive = True, False
+            if start >= measure_from:
+                samples[name].append(time.perf_counter() - start)
+                errors[name] += failed
+            if not keep_alive:
+                writer.close()
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.close()
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return samples, errors
+
+
+def _percentile(sorted_samples, q):
+    if not sorted_samples:
+        return 0.0
+    return sorted_samples[max(0, math.ceil(q * len(sorted_samples)) - 1)]
+
+
+def summarize(samples, errors, duration):
+    routes = {}
+    for name, values in samples.items():
+        values.sort()
+        routes[name] = {
+            'requests': len(values),
+            'errors': errors[name],
+            'rps': round(len(values) / duration, 1),
+            'p50_ms': round(_percentile(values, 0.50) * 1000, 2),
+            'p95_ms': round(_percentile(values, 0.95) * 1000, 2),
+            'p99_ms': round(_percentile(values, 0.99) * 1000, 2),
+        }
+    total = sum(r['requests'] for r in routes.values())
+    return {'rps': round(total / duration, 1), 'errors': sum(errors.values()), 'routes': routes}
+
+
+def _delta(current, base, lower_is_better):
+    if not base:
+        return '', False
+    change = (current - base) / base
+    worse = change > 0 if lower_is_better else change < 0
+    return f'{change * 100:+.0f}%', worse
+
+
+def report(result, baseline, tolerance):
+    """Print the result table; returns the names of routes that regressed beyond tolerance."""
+    regressions = []
+    base_routes = (baseline or {}).get('routes', {})
+    print(f"\n{result['rps']:.1f} req/s total, {result['errors']} errors")
+    print(f"  {'route':<18}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for name, r in result['routes'].items():
+        print(f"  {name:<18}{r['rps']:>9.1f}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['errors']:>8}")
+        base = base_routes.get(name)
+        if base is None:
+            continue
+        cells, regressed = [], False
+        for key, lower_is_better in (('rps', False), ('p50_ms', True), ('p95_ms', True), ('p99_ms', True)):
+            text, worse = _delta(r[key], base[key], lower_is_better)
+            cells.append(text)
+            if worse and abs((r[key] - base[key]) / base[key]) > tolerance:
+                regressed = True
+        print(f"  {'  vs baseline':<18}" + ''.join(f'{c:>9}' for c in cells) + ('  REGRESSION' if regressed else ''))
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--server', choices=('serve', 'dev', 'asgi'), default='serve')
+    parser.add_argument('--scale', type=int, default=500, help='customers and materials in the nesting catalog')
+    parser.add_argument('--records', type=int, default=10000, help='masrafci records')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--warmup', type=float, default=2.0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--stub-delay', type=float, default=0.02, help='TOKIDB stub latency (s)')
+    parser.add_argument('--routes', help='comma separated subset of: ' + ','.join(s[0] for s in SCENARIOS))
+    parser.add_argument('--baseline', help='compare against this saved result')
+    parser.add_argument('--save-baseline', help='write this run to the given JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.10)
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    scenarios = SCENARIOS
+    if args.routes:
+        wanted = set(args.routes.split(','))
+        scenarios = [s for s in SCENARIOS if s[0] in wanted]
+        if not scenarios:
+            parser.error('no known routes selected')
+
+    data_dir = tempfile.mkdtemp(prefix='mazzel-bench-')
+    stub_port = _free_port()
+    env = dict(os.environ, MAZZEL_DATA_DIR=data_dir, MAZZEL_ADMIN_USER=USER, MAZZEL_ADMIN_PASSWORD=PASSWORD,
+               MAZZEL_SECRET_KEY='bench-secret', MASRAFCI_REMINDER_SCHEDULER='0',
+               TOKIDB_BASE_URL=f'http://127.0.0.1:{stub_port}', TOKIDB_BREAKER_FAILURES='1000000')
+    started = time.perf_counter()
+    seed_fixtures(data_dir, args.scale, args.records, env)
+    print(f'fixtures: {args.scale} customers/materials, {args.records} masrafci records '
+          f'({time.perf_counter() - started:.1f}s) in {data_dir}')
+    print(f'{args.server}: {args.concurrency} clients, {args.duration:g}s (+{args.warmup:g}s warmup), '
+          f'stub delay {args.stub_delay * 1000:.0f}ms')
+
+    stub = asyncio.create_task(_run_stub(stub_port, args.stub_delay))
+    port = _free_port()
+    proc = _start(args.server, port, env, args.workers, args.threads)
+    try:
+        await _wait_ready(port)
+        cookie = await _login(port, USER, PASSWORD)
+        samples, errors = await _drive(port, cookie, scenarios, args.concurrency, args.duration, args.warmup)
+    finally:
+        proc.terminate()
+        proc.wait()
+        stub.cancel()
+
+    result = summarize(samples, errors, args.duration)
+    result['config'] = {key: getattr(args, key) for key in
+                        ('server', 'scale', 'records', 'concurrency', 'duration', 'workers', 'threads', 'stub_delay')}
+    result['machine'] = {'python': platform.python_version(), 'cpus': os.cpu_count(), 'platform': platform.platform()}
+    result['recorded_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        changed = {k: (v, baseline.get('config', {}).get(k)) for k, v in result['config'].items()
+                   if baseline.get('config', {}).get(k) != v}
+        if changed:
+            print('warning: baseline was recorded with different settings: '
+                  + ', '.join(f'{k}={old} (now {new})' for k, (new, old) in changed.items()))
+    regressions = report(result, baseline, args.tolerance)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f'\nbaseline saved to {args.save_baseline}')
+    if regressions:
+        print(f"\nregressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+"""Load test: Flask dev server (python app.py) vs production mode (python serve.py).
+
+Boots each mode against a temporary MAZZEL_DATA_DIR, logs in, and hammers the
+main routes with --concurrency keep-alive clients for --duration seconds.
+
+    python bench/serve_load.py --concurrency 64 --duration 10 --workers 4
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from asgi_vs_threaded import ROOT, _free_port, _login, _request, _wait_ready
+
+ROUTES = [
+    ('/', False),
+    ('/login', False),
+    ('/hizmetler', False),
+    ('/dashboard', True),
+    ('/api/masrafci/summary', True),
+    ('/api/notifications', True),
+]
+
+
+def _start(mode, port, env, workers, threads):
+    if mode == 'dev':
+        code = "import app; app.app.run(host='127.0.0.1', port=%d, threaded=True)" % port
+        cmd = [sys.executable, '-c', code]
+    else:
+        env = dict(env, MAZZEL_BIND=f'127.0.0.1:{port}', MAZZEL_WORKERS=str(workers),
+                   MAZZEL_THREADS=str(threads))
+        cmd = [sys.executable, 'serve.py']
+    return subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def _drive(port, cookie, concurrency, duration):
+    per_route = {path: [] for path, _auth in ROUTES}
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(offset):
+        nonlocal errors
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        for path, auth in itertools.islice(itertools.cycle(ROUTES), offset, None):
+            if time.perf_counter() >= deadline:
+                break
+            headers = [('Cookie', cookie), ('Accept-Encoding', 'gzip')] if auth else [('Accept-Encoding', 'gzip')]
+            start = time.perf_counter()
+            try:
+                status, _headers, keep_alive = await _request(reader, writer, 'GET', path, headers)
+                if status != 200:
+                    errors += 1
+            except (OSError, asyncio.IncompleteReadError):
+                errors += 1
+                keep_alive = False
+            per_route[path].append(time.perf_counter() - start)
+            if not keep_alive:
+                writer.close()
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return per_route, errors, elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=8.0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--modes', default='dev,serve')
+    args = parser.parse_args()
+
+    user, password = 'bench', 'bench-pass'
+    env = dict(os.environ, MAZZEL_ADMIN_USER=user, MAZZEL_ADMIN_PASSWORD=password,
+               MASRAFCI_REMINDER_SCHEDULER='0', MAZZEL_SECRET_KEY='bench-secret')
+
+    print(f'{args.concurrency} clients, {args.duration:g}s per mode, '
+          f'serve = {args.workers} workers x {args.threads} threads')
+    for mode in args.modes.split(','):
+        port = _free_port()
+        proc = _start(mode, port, dict(env, MAZZEL_DATA_DIR=tempfile.mkdtemp(prefix='mazzel-load-')),
+                      args.workers, args.threads)
+        try:
+            await _wait_ready(port)
+            cookie = await _login(port, user, password)
+            per_route, errors, elapsed = await _drive(port, cookie, args.concurrency, args.duration)
+        finally:
+            proc.terminate()
+            proc.wait()
+        total = sum(len(v) for v in per_route.values())
+        print(f'\n[{mode}] {total / elapsed:.1f} req/s total, {errors} errors')
+        print(f"  {'route':<26}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}")
+        for path, samples in per_route.items():
+            samples.sort()
+            p95 = samples[int(len(samples) * 0.95) - 1] if samples else 0
+            print(f'  {path:<26}{len(samples) / elapsed:>9.1f}'
+                  f'{statistics.median(samples) * 1000 if samples else 0:>9.1f}{p95 * 1000:>9.1f}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+"""Cold start: import time and first-request latency per MAZZEL_SUBSYSTEMS set.
+
+Each sample is a fresh interpreter against a temporary MAZZEL_DATA_DIR; the
+median of --runs samples is reported. "first request" is import + login + the
+first /dashboard render through the Flask test client, i.e. what the first user
+after a (re)start waits for. The masrafci row also times _get_masrafci_db(),
+whose schema setup now runs once per process instead of on every connection.
+
+    python bench/startup.py --runs 9
+    python bench/startup.py --sets all,core,masrafci
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from asgi_vs_threaded import ROOT
+
+_PROBE = r'''
+import sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+client.post('/login', data={'username': 'bench', 'password': 'bench-pass'})
+client.get('/dashboard')
+first = time.perf_counter()
+db_us = 0.0
+if app.subsystem_enabled('masrafci'):
+    import timeit
+    from blueprints import masrafci
+    masrafci._get_masrafci_db().close()
+    db_us = timeit.timeit(lambda: masrafci._get_masrafci_db().close(), number=200) / 200 * 1e6
+print((imported - started) * 1000, (first - started) * 1000, len(app.app.url_map._rules), db_us)
+'''
+
+
+def _sample(subsystems, env):
+    env = dict(env, MAZZEL_SUBSYSTEMS=subsystems, MAZZEL_DATA_DIR=tempfile.mkdtemp(prefix='mazzel-start-'))
+    out = subprocess.run([sys.executable, '-c', _PROBE], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    import_ms, first_ms, routes, db_us = out.strip().splitlines()[-1].split()
+    return float(import_ms), float(first_ms), int(routes), float(db_us)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--sets', default='all,core,masrafci,nesting,tokidb,tetra',
+                        help="comma separated MAZZEL_SUBSYSTEMS values; 'core' = none")
+    args = parser.parse_args()
+
+    env = dict(os.environ, MAZZEL_ADMIN_USER='bench', MAZZEL_ADMIN_PASSWORD='bench-pass',
+               MASRAFCI_REMINDER_SCHEDULER='0', MAZZEL_SECRET_KEY='bench-secret')
+    print(f"{'subsystems':<12}{'routes':>8}{'import ms':>12}{'first req ms':>14}{'get_db us':>12}")
+    for name in args.sets.split(','):
+        subsystems = 'none' if name == 'core' else name
+        samples = [_sample(subsystems, env) for _ in range(args.runs)]
+        import_ms = statistics.median(s[0] for s in samples)
+        first_ms = statistics.median(s[1] for s in samples)
+        db_us = statistics.median(s[3] for s in samples)
+        print(f'{name:<12}{samples[0][2]:>8}{import_ms:>12.1f}{first_ms:>14.1f}'
+              f"{(f'{db_us:.0f}' if db_us else '-'):>12}")
+
+
+if __name__ == '__main__':
+    main()
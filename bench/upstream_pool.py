@@ -0,0 +1,160 @@
+"""TOKIDB proxy: pooled + streamed upstream vs one urllib connection per call.
+
+Starts a local keep-alive HTTP/1.1 stub and drives /api/tokidb/* through the
+Flask test client in this process, once with the gateway's UpstreamPool and
+streaming _proxy_url and once with the pre-pool behaviour (urllib.urlopen per
+call, body read fully before responding) swapped into the tokidb blueprint.
+
+Reported per mode:
+  * latency of --requests small proxied GETs (p50/p95, ms) and the number of TCP
+    connections the stub accepted for them,
+  * time and Python heap peak (tracemalloc) to relay one --big-mb MB body; the
+    body is consumed chunk by chunk and discarded, so the peak is what the
+    gateway itself holds.
+
+    python bench/upstream_pool.py --requests 500 --big-mb 20
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from asgi_vs_threaded import ROOT
+
+_CHUNK = b'x' * 65536
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Baslik ve govde ayri yazilir; Nagle acikken keep-alive'da 40ms delayed-ACK beklenir.
+    disable_nagle_algorithm = True
+    big_bytes = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.startswith('/api/big'):
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(self.big_bytes))
+            self.end_headers()
+            for _ in range(self.big_bytes // len(_CHUNK)):
+                self.wfile.write(_CHUNK)
+            return
+        body = b'{"ok": true, "path": "%s"}' % self.path.encode('latin-1')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _CountingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.connections = 0
+        self._count_lock = threading.Lock()
+
+    def get_request(self):
+        sock, addr = super().get_request()
+        with self._count_lock:
+            self.connections += 1
+        return sock, addr
+
+
+def _legacy_proxy_url(url, timeout=10.0):
+    """The proxy before the upstream pool: new connection per call, body buffered."""
+    import app
+    from flask import Response, request
+
+    upstream_req = urllib.request.Request(url, headers=app._upstream_request_headers(request.headers),
+                                          method=request.method.upper())
+    with urllib.request.urlopen(upstream_req, timeout=timeout) as upstream:
+        body = upstream.read()
+        resp = Response(body, status=upstream.status)
+        for key, value in upstream.headers.items():
+            if key.lower() not in app._HOP_BY_HOP_HEADERS:
+                resp.headers[key] = value
+    return resp
+
+
+def _run_mode(client, stub, requests_count, big_path):
+    stub.connections = 0
+    latencies = []
+    for i in range(requests_count):
+        started = time.perf_counter()
+        resp = client.get(f'/api/tokidb/small?i={i}')
+        latencies.append((time.perf_counter() - started) * 1000)
+        if resp.status_code != 200:
+            raise RuntimeError(f'proxy returned {resp.status_code}')
+    connections = stub.connections
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    resp = client.get(big_path, buffered=False)
+    relayed = 0
+    for chunk in resp.response:
+        relayed += len(chunk)
+    resp.close()
+    big_sec = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'p50': statistics.median(latencies),
+        'p95': statistics.quantiles(latencies, n=20)[18],
+        'connections': connections,
+        'big_sec': big_sec,
+        'big_mb': relayed / 1e6,
+        'peak_mb': peak / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--big-mb', type=int, default=20, help='size of the streamed response')
+    args = parser.parse_args()
+
+    _StubHandler.big_bytes = args.big_mb * 1024 * 1024 // len(_CHUNK) * len(_CHUNK)
+    stub = _CountingServer(('127.0.0.1', 0), _StubHandler)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+
+    os.environ.update(MAZZEL_DATA_DIR=tempfile.mkdtemp(prefix='mazzel-pool-'), MAZZEL_SUBSYSTEMS='tokidb',
+                      MAZZEL_SECRET_KEY='bench-secret', MASRAFCI_REMINDER_SCHEDULER='0',
+                      MAZZEL_METRICS='off', MAZZEL_PROFILING='off', TOKIDB_CACHE='off',
+                      TOKIDB_BASE_URL=f'http://127.0.0.1:{stub.server_address[1]}')
+    sys.path.insert(0, ROOT)
+    import app
+    from blueprints import tokidb
+
+    client = app.app.test_client()
+    with client.session_transaction() as sess:
+        sess['user'] = 'bench'
+
+    pooled_proxy = tokidb._proxy_url
+    results = {}
+    for mode, proxy in (('urllib', _legacy_proxy_url), ('pooled', pooled_proxy)):
+        tokidb._proxy_url = proxy
+        results[mode] = _run_mode(client, stub, args.requests, '/api/tokidb/big')
+    tokidb._proxy_url = pooled_proxy
+    stub.shutdown()
+
+    print(f'{args.requests} small GETs, one {args.big_mb} MB body, stub on 127.0.0.1')
+    print(f"{'mode':<8}{'p50 ms':>9}{'p95 ms':>9}{'tcp conns':>11}{'big s':>8}{'big MB':>8}{'peak MB':>9}")
+    for mode, r in results.items():
+        print(f"{mode:<8}{r['p50']:>9.2f}{r['p95']:>9.2f}{r['connections']:>11}"
+              f"{r['big_sec']:>8.2f}{r['big_mb']:>8.1f}{r['peak_mb']:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,5 @@
+"""Optional gateway subsystems, one Flask blueprint per module.
+
+app.py imports and registers only the ones listed in MAZZEL_SUBSYSTEMS
+(default: all); see _register_subsystems().
+"""
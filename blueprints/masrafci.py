@@ -0,0 +1,1513 @@
+"""Masrafci: SQLite-backed expense records, reports, import/export and bill reminders."""
+
+import base64
+import csv
+import hashlib
+import io
+import itertools
+import json
+import os
+import re
+import sqlite3
+import threading
+import zipfile
+from datetime import date, datetime, timedelta, timezone
+from xml.sax.saxutils import escape as xml_escape
+
+from flask import Blueprint, Response, jsonify, render_template, request, session, url_for
+
+from app import BASE_DIR, DATA_DIR, _background_starters, _connect_timed, app, login_required
+
+bp = Blueprint('masrafci', __name__)
+
+# ── Vite manifest loader for masrafci ──────────────────────────
+_masrafci_manifest_cache = None
+_masrafci_manifest_cache_mtime = None
+
+def _load_masrafci_manifest():
+    """Load Vite manifest for the masrafci app. Returns dict with 'js' and 'css' keys, or None."""
+    global _masrafci_manifest_cache, _masrafci_manifest_cache_mtime
+
+    manifest_path = os.path.join(BASE_DIR, 'static', 'apps', 'masrafci', '.vite', 'manifest.json')
+    if not os.path.exists(manifest_path):
+        _masrafci_manifest_cache = None
+        _masrafci_manifest_cache_mtime = None
+        return None
+
+    # In production mode, cache until manifest mtime changes.
+    manifest_mtime = os.path.getmtime(manifest_path)
+    if (
+        not app.debug
+        and _masrafci_manifest_cache is not None
+        and _masrafci_manifest_cache_mtime == manifest_mtime
+    ):
+        return _masrafci_manifest_cache
+
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (json.JSONDecodeError, OSError):
+        _masrafci_manifest_cache = None
+        _masrafci_manifest_cache_mtime = None
+        return None
+
+    entry = None
+    for value in manifest.values():
+        if isinstance(value, dict) and value.get('isEntry'):
+            entry = value
+            break
+    if entry is None:
+        return None
+
+    prefix = 'apps/masrafci/'
+    result = {
+        'js': url_for('static', filename=prefix + entry['file']),
+        'css': [url_for('static', filename=prefix + c) for c in entry.get('css', [])],
+    }
+    _masrafci_manifest_cache = result
+    _masrafci_manifest_cache_mtime = manifest_mtime
+    return result
+
+
+# ── Masrafci SQLite Backend ──────────────────────────────────
+MASRAFCI_DB_PATH = os.path.join(DATA_DIR, 'masrafci.db')
+
+_MASRAFCI_ALLOWED_FIELDS = {
+    'type', 'ad', 'tutar', 'ay', 'tarih', 'kategori', 'kurum',
+    'odeme_yontemi', 'son_odeme', 'durum', 'taksit_sayisi',
+    'taksit_odenen', 'aylik_tutar', 'kart', 'otomatik_odeme',
+    'telefon', 'iban', 'notlar', 'abone_no',
+}
+
+_masrafci_schema_lock = threading.Lock()
+_masrafci_schema_ready = False
+
+def _open_masrafci_db():
+    conn = _connect_timed(MASRAFCI_DB_PATH, 'masrafci')
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+def _get_masrafci_db():
+    global _masrafci_schema_ready
+    if not _masrafci_schema_ready:
+        # Sema/migration surec basina bir kez, ilk kullanimda kurulur; sonraki
+        # baglantilar yalnizca acilir.
+        with _masrafci_schema_lock:
+            if not _masrafci_schema_ready:
+                os.makedirs(os.path.dirname(MASRAFCI_DB_PATH), exist_ok=True)
+                conn = _open_masrafci_db()
+                try:
+                    _init_masrafci_schema(conn)
+                finally:
+                    conn.close()
+                _masrafci_schema_ready = True
+    return _open_masrafci_db()
+
+def _init_masrafci_schema(conn):
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS records (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user TEXT NOT NULL,
+            type TEXT NOT NULL CHECK(type IN ('harcama','fatura','kredikarti','alacakli')),
+            ad TEXT NOT NULL,
+            tutar REAL DEFAULT 0,
+            ay TEXT,
+            tarih TEXT,
+            kategori TEXT,
+            kurum TEXT,
+            odeme_yontemi TEXT,
+            son_odeme TEXT,
+            durum TEXT DEFAULT 'odenmedi',
+            taksit_sayisi INTEGER,
+            taksit_odenen INTEGER DEFAULT 0,
+            aylik_tutar REAL,
+            kart TEXT,
+            otomatik_odeme INTEGER DEFAULT 0,
+            telefon TEXT,
+            iban TEXT,
+            notlar TEXT,
+            abone_no TEXT,
+            created_at TEXT DEFAULT (datetime('now','localtime')),
+            updated_at TEXT,
+            deleted_at TEXT,
+            provider_key TEXT,
+            change_seq INTEGER
+        )
+    """)
+    for column in ('abone_no TEXT', 'updated_at TEXT', 'deleted_at TEXT', 'provider_key TEXT', 'change_seq INTEGER'):
+        try:
+            conn.execute(f"ALTER TABLE records ADD COLUMN {column}")
+        except sqlite3.OperationalError:
+            pass  # kolon zaten var
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS bill_reminder_rules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user TEXT NOT NULL,
+            provider_key TEXT NOT NULL,
+            display_name TEXT NOT NULL,
+            enabled INTEGER DEFAULT 1,
+            expected_start_day INTEGER NOT NULL DEFAULT 1 CHECK(expected_start_day BETWEEN 1 AND 28),
+            expected_end_day INTEGER NOT NULL DEFAULT 28 CHECK(expected_end_day BETWEEN 1 AND 28),
+            lead_days INTEGER NOT NULL DEFAULT 3 CHECK(lead_days BETWEEN 0 AND 14),
+            last_prompted_month TEXT,
+            snooze_until TEXT,
+            created_at TEXT DEFAULT (datetime('now','localtime')),
+            updated_at TEXT DEFAULT (datetime('now','localtime')),
+            UNIQUE(user, provider_key)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS bill_reminder_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            rule_id INTEGER NOT NULL REFERENCES bill_reminder_rules(id) ON DELETE CASCADE,
+            month TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending'
+                CHECK(status IN ('pending','prompted','entered','skipped_month','dismissed')),
+            prompted_at TEXT,
+            answered_at TEXT,
+            linked_record_id INTEGER REFERENCES records(id) ON DELETE SET NULL,
+            created_at TEXT DEFAULT (datetime('now','localtime')),
+            UNIQUE(rule_id, month)
+        )
+    """)
+    # Aylik ozet tablosu: summary endpoint'i kayit sayisindan bagimsiz okusun diye
+    # (user, ay, kategori, type) bazinda toplam/adet tutulur. NULL ay/kategori '' olarak saklanir.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS record_rollups (
+            user TEXT NOT NULL,
+            ay TEXT NOT NULL DEFAULT '',
+            kategori TEXT NOT NULL DEFAULT '',
+            type TEXT NOT NULL,
+            toplam REAL NOT NULL DEFAULT 0,
+            adet INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user, ay, kategori, type)
+        )
+    """)
+    # Kurum bazli aylik ozet (provider_key ile gruplanir, kurum ilk gorulen yazilis).
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS provider_rollups (
+            user TEXT NOT NULL,
+            ay TEXT NOT NULL DEFAULT '',
+            type TEXT NOT NULL,
+            provider_key TEXT NOT NULL,
+            kurum TEXT,
+            toplam REAL NOT NULL DEFAULT 0,
+            adet INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user, ay, type, provider_key)
+        )
+    """)
+    # Kullanici basina artan degisiklik sayaci; delta sync cursor'i (records.change_seq).
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS record_change_seqs (
+            user TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    # Gunluk arka plan isleri icin kilit satiri: her is icin son calistigi gun.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS scheduler_runs (
+            name TEXT PRIMARY KEY,
+            run_date TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_records_user_ay ON records(user, ay, created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_records_user_created ON records(user, created_at, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_records_user_change_seq ON records(user, change_seq)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_records_user_type_ay_provider ON records(user, type, ay, provider_key)")
+    # Summary'nin LIMIT'li listeleri icin kismi indeksler: siralama indeksten okunur,
+    # ilk N satirda durulur; kullanicinin kayit sayisindan bagimsiz.
+    conn.execute("""CREATE INDEX IF NOT EXISTS idx_records_open_bills ON records(user, type, son_odeme)
+                    WHERE durum != 'odendi' AND deleted_at IS NULL""")
+    conn.execute("""CREATE INDEX IF NOT EXISTS idx_records_installments ON records(user, type, created_at)
+                    WHERE taksit_sayisi > 0 AND deleted_at IS NULL""")
+    conn.execute("""CREATE INDEX IF NOT EXISTS idx_records_live_created ON records(user, created_at)
+                    WHERE deleted_at IS NULL""")
+    _migrate_masrafci_db(conn)
+    conn.commit()
+
+_MASRAFCI_SCHEMA_VERSION = 6
+
+def _migrate_masrafci_db(conn):
+    """Apply one-off data migrations tracked with PRAGMA user_version."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= _MASRAFCI_SCHEMA_VERSION:
+        return
+    if version < 1:
+        _rebuild_masrafci_rollups(conn)
+    if version < 2:
+        # created_at yerel saat; updated_at UTC tutulur ki delta sync saat degisiminden etkilenmesin.
+        conn.execute("UPDATE records SET updated_at = datetime(created_at, 'utc') WHERE updated_at IS NULL")
+    if version < 3:
+        conn.create_function('normalize_provider_key', 1, _normalize_provider_key, deterministic=True)
+        conn.execute("UPDATE records SET provider_key = normalize_provider_key(kurum) WHERE kurum IS NOT NULL")
+    if version < 4:
+        _rebuild_masrafci_rollups(conn)
+    if version < 5:
+        # v3 anahtarlari lower() -> translate sirasiyla uretildi ('İ' -> 'i' + U+0307);
+        # kayitlar, kurallar ve kurum ozetleri duzeltilmis normalizer ile yeniden hesaplanir.
+        # Cakisan kural (ayni kullanicida 'ISKI' ve 'İSKİ') eski anahtariyla kalir.
+        conn.create_function('normalize_provider_key', 1, _normalize_provider_key, deterministic=True)
+        conn.execute("UPDATE records SET provider_key = normalize_provider_key(kurum) WHERE kurum IS NOT NULL")
+        conn.execute("UPDATE OR IGNORE bill_reminder_rules SET provider_key = normalize_provider_key(display_name)")
+        _rebuild_masrafci_rollups(conn)
+    if version < 6:
+        # Delta cursor'i duvar saati (updated_at) yerine change_seq: mevcut kayitlar
+        # kullanici basina updated_at, id sirasiyla numaralanir.
+        seqs = {}
+        updates = []
+        for r in conn.execute("SELECT id, user FROM records ORDER BY user, updated_at, id"):
+            seqs[r[1]] = seqs.get(r[1], 0) + 1
+            updates.append((seqs[r[1]], r[0]))
+        conn.executemany("UPDATE records SET change_seq = ? WHERE id = ?", updates)
+        conn.executemany(
+            "INSERT INTO record_change_seqs (user, seq) VALUES (?, ?) ON CONFLICT(user) DO UPDATE SET seq = excluded.seq",
+            list(seqs.items())
+        )
+        conn.execute("DROP INDEX IF EXISTS idx_records_user_updated")
+    conn.execute(f"PRAGMA user_version = {_MASRAFCI_SCHEMA_VERSION}")
+    conn.commit()
+
+def _apply_masrafci_rollups(conn, where_sql, params, sign=1):
+    """Add (sign=1) or subtract (sign=-1) the records matching where_sql from the rollup tables.
+
+    Must run inside the same transaction as the write it mirrors; for deletes call it
+    before the DELETE so the rows are still visible.
+    """
+    conn.execute(f"""
+        INSERT INTO record_rollups (user, ay, kategori, type, toplam, adet)
+        SELECT user, COALESCE(ay, ''), COALESCE(kategori, ''), type,
+               ? * COALESCE(SUM(tutar), 0), ? * COUNT(*)
+        FROM records WHERE deleted_at IS NULL AND ({where_sql})
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT(user, ay, kategori, type) DO UPDATE SET
+            toplam = toplam + excluded.toplam,
+            adet = adet + excluded.adet
+    """, [sign, sign, *params])
+    conn.execute(f"""
+        INSERT INTO provider_rollups (user, ay, type, provider_key, kurum, toplam, adet)
+        SELECT user, COALESCE(ay, ''), type, provider_key, MIN(kurum),
+               ? * COALESCE(SUM(tutar), 0), ? * COUNT(*)
+        FROM records WHERE deleted_at IS NULL AND provider_key IS NOT NULL AND ({where_sql})
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT(user, ay, type, provider_key) DO UPDATE SET
+            toplam = toplam + excluded.toplam,
+            adet = adet + excluded.adet
+    """, [sign, sign, *params])
+    if sign < 0:
+        # Yalnizca az once dusurulen anahtarlar temizlenir (PK ile arama); tum
+        # kullanicilarin ozet satirlari taranmaz.
+        conn.execute(f"""
+            DELETE FROM record_rollups WHERE adet <= 0 AND (user, ay, kategori, type) IN (
+                SELECT user, COALESCE(ay, ''), COALESCE(kategori, ''), type
+                FROM records WHERE deleted_at IS NULL AND ({where_sql}))
+        """, params)
+        conn.execute(f"""
+            DELETE FROM provider_rollups WHERE adet <= 0 AND (user, ay, type, provider_key) IN (
+                SELECT user, COALESCE(ay, ''), type, provider_key
+                FROM records WHERE deleted_at IS NULL AND provider_key IS NOT NULL AND ({where_sql}))
+        """, params)
+
+def _rebuild_masrafci_rollups(conn, user=None):
+    if user is None:
+        conn.execute("DELETE FROM record_rollups")
+        conn.execute("DELETE FROM provider_rollups")
+        _apply_masrafci_rollups(conn, '1 = 1', [])
+    else:
+        conn.execute("DELETE FROM record_rollups WHERE user = ?", (user,))
+        conn.execute("DELETE FROM provider_rollups WHERE user = ?", (user,))
+        _apply_masrafci_rollups(conn, 'user = ?', [user])
+
+def _row_to_dict(row):
+    d = dict(row)
+    d['otomatik_odeme'] = bool(d.get('otomatik_odeme'))
+    return d
+
+def _next_change_seqs(conn, user, count=1):
+    """Reserve ``count`` consecutive change_seq values for ``user``; returns the first.
+
+    Must run inside the write transaction it numbers: SQLite serialises writers, so a
+    transaction that commits later always gets higher numbers than one committed
+    before it, which is what makes ``change_seq > since`` a gap-free delta cursor.
+    """
+    conn.execute(
+        "INSERT INTO record_change_seqs (user, seq) VALUES (?, ?) ON CONFLICT(user) DO UPDATE SET seq = seq + excluded.seq",
+        (user, count)
+    )
+    last = conn.execute("SELECT seq FROM record_change_seqs WHERE user = ?", (user,)).fetchone()[0]
+    return last - count + 1
+
+def _masrafci_now():
+    """UTC timestamp with millisecond precision, used for updated_at/deleted_at."""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+
+def _encode_records_cursor(row):
+    raw = f"{row['created_at']}|{row['id']}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def _decode_records_cursor(cursor):
+    try:
+        created_at, record_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').rsplit('|', 1)
+        return created_at, int(record_id)
+    except (ValueError, UnicodeError):
+        return None
+
+def _masrafci_filter_clauses(user, record_type, month):
+    clauses = ['user = ?']
+    params = [user]
+    if record_type:
+        clauses.append('type = ?')
+        params.append(record_type)
+    if month:
+        clauses.append('ay = ?')
+        params.append(month)
+    return clauses, params
+
+
+_TR_MAP = str.maketrans({
+    '\u00e7': 'c', '\u00c7': 'c',  # ç, Ç
+    '\u015f': 's', '\u015e': 's',  # ş, Ş
+    '\u011f': 'g', '\u011e': 'g',  # ğ, Ğ
+    '\u00fc': 'u', '\u00dc': 'u',  # ü, Ü
+    '\u00f6': 'o', '\u00d6': 'o',  # ö, Ö
+    '\u0131': 'i', '\u0130': 'i',  # ı, İ
+})
+
+def _normalize_provider_key(raw: str) -> str:
+    # translate lower()'dan once: 'İ'.lower() 'i' + birlesik nokta (U+0307) uretir.
+    text = (raw or '').strip().translate(_TR_MAP).lower()
+    return ' '.join(text.split())
+
+
+def _insert_due_reminder_events(conn, month, user=None):
+    """Create pending events for every due rule in one statement.
+
+    A rule is due when it is enabled, today falls in its (lead_days-adjusted) day
+    window, it is not snoozed and no fatura for the provider exists in ``month``.
+    Existing (rule_id, month) events are left alone via INSERT OR IGNORE.
+    With ``user=None`` all users' rules are evaluated in one batch.
+    """
+    today = date.today()
+    user_clause = ''
+    params = [month, today.day, today.day, today.isoformat(), month]
+    if user is not None:
+        user_clause = ' AND r.user = ?'
+        params.append(user)
+    cur = conn.execute(f"""
+        INSERT OR IGNORE INTO bill_reminder_events (rule_id, month, status)
+        SELECT r.id, ?, 'pending'
+        FROM bill_reminder_rules r
+        WHERE r.enabled = 1
+          AND MAX(1, r.expected_start_day - r.lead_days) <= ?
+          AND ? <= r.expected_end_day
+          AND (r.snooze_until IS NULL OR r.snooze_until <= ?)
+          AND NOT EXISTS (
+              SELECT 1 FROM records rec
+              WHERE rec.user = r.user AND rec.type = 'fatura' AND rec.ay = ?
+                AND rec.deleted_at IS NULL
+                AND rec.provider_key = r.provider_key
+          ){user_clause}
+    """, params)
+    conn.commit()
+    return cur.rowcount
+
+
+def _pending_reminder_events(conn, user, month):
+    rows = conn.execute("""
+        SELECT e.*, r.display_name, r.provider_key, r.expected_start_day, r.expected_end_day
+        FROM bill_reminder_events e
+        JOIN bill_reminder_rules r ON e.rule_id = r.id
+        WHERE r.user = ? AND e.month = ? AND e.status = 'pending'
+        ORDER BY r.expected_start_day ASC
+    """, (user, month)).fetchall()
+    return [dict(r) for r in rows]
+
+
+def _run_reminder_check(conn, user, month):
+    _insert_due_reminder_events(conn, month, user=user)
+    return _pending_reminder_events(conn, user, month)
+
+
+# ── Daily reminder scheduler ─────────────────────────────────
+# Evaluates every user's rules once per day in a background thread. Each
+# gunicorn worker runs the loop, but only the one that claims the day in
+# scheduler_runs executes the batch. The reminder-check endpoint still
+# re-evaluates the calling user, so records added during the day count.
+_reminder_scheduler_raw = (os.environ.get('MASRAFCI_REMINDER_SCHEDULER') or 'on').lower().strip()
+MASRAFCI_REMINDER_SCHEDULER = _reminder_scheduler_raw in ('1', 'true', 'yes', 'on')
+
+_reminder_scheduler_lock = threading.Lock()
+_reminder_scheduler_thread = None
+_reminder_scheduler_stop = threading.Event()
+
+def _claim_daily_run(conn, name):
+    """Mark ``name`` as run today; False if another process already claimed it.
+
+    The claim is not committed here, so the caller's work and the claim land in
+    the same transaction (a failed batch leaves the day unclaimed).
+    """
+    today = date.today().isoformat()
+    cur = conn.execute("""
+        INSERT INTO scheduler_runs (name, run_date) VALUES (?, ?)
+        ON CONFLICT(name) DO UPDATE SET run_date = excluded.run_date
+        WHERE scheduler_runs.run_date < excluded.run_date
+    """, (name, today))
+    return cur.rowcount == 1
+
+def _run_reminder_check_all():
+    conn = _get_masrafci_db()
+    try:
+        if not _claim_daily_run(conn, 'reminders'):
+            conn.rollback()
+            return
+        _insert_due_reminder_events(conn, getCurrentMonth())
+    finally:
+        conn.close()
+
+def _reminder_scheduler_loop():
+    while not _reminder_scheduler_stop.is_set():
+        try:
+            _run_reminder_check_all()
+        except Exception as e:
+            app.logger.warning('Reminder scheduler run failed: %s', e)
+        # Gun degistikten hemen sonra tekrar calis.
+        now = datetime.now()
+        next_run = datetime.combine(now.date() + timedelta(days=1), datetime.min.time()) + timedelta(minutes=1)
+        _reminder_scheduler_stop.wait((next_run - now).total_seconds())
+
+def _start_reminder_scheduler():
+    global _reminder_scheduler_thread
+    if not MASRAFCI_REMINDER_SCHEDULER:
+        return
+    with _reminder_scheduler_lock:
+        if _reminder_scheduler_thread is not None and _reminder_scheduler_thread.is_alive():
+            return
+        _reminder_scheduler_stop.clear()
+        _reminder_scheduler_thread = threading.Thread(
+            target=_reminder_scheduler_loop, name='masrafci-reminders', daemon=True)
+        _reminder_scheduler_thread.start()
+
+def _ensure_reminder_scheduler():
+    if MASRAFCI_REMINDER_SCHEDULER and _reminder_scheduler_thread is None:
+        _start_reminder_scheduler()
+
+_background_starters.append(_ensure_reminder_scheduler)
+
+MASRAFCI_PAGE_SIZE_MAX = 500
+
+@bp.route('/api/masrafci/records', methods=['GET'])
+@login_required
+def masrafci_records_list():
+    """List records newest first.
+
+    Without ``limit``/``cursor`` the full list is returned as a JSON array (legacy
+    shape). With them, a keyset page on (created_at, id) is returned together with
+    the ``since`` token the client passes to /records/changes afterwards.
+    """
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+    conn = _get_masrafci_db()
+    try:
+        clauses, params = _masrafci_filter_clauses(
+            session['user'], request.args.get('type'), request.args.get('month'))
+        clauses.append('deleted_at IS NULL')
+        if limit is None and cursor is None:
+            sql = f"SELECT * FROM records WHERE {' AND '.join(clauses)} ORDER BY created_at DESC, id DESC"
+            rows = conn.execute(sql, params).fetchall()
+            return jsonify([_row_to_dict(r) for r in rows])
+
+        limit = max(1, min(limit or 100, MASRAFCI_PAGE_SIZE_MAX))
+        since = None
+        if cursor:
+            position = _decode_records_cursor(cursor)
+            if position is None:
+                return jsonify({'error': 'Geçersiz cursor'}), 400
+        else:
+            # Ilk sayfada senkron noktasini, satirlari okumadan once al: arada gelen
+            # degisiklikler bir sonraki delta isteginde yakalanir.
+            since = str(conn.execute(
+                "SELECT COALESCE(MAX(change_seq), 0) FROM records WHERE user = ?",
+                (session['user'],)
+            ).fetchone()[0])
+        page_clauses, page_params = list(clauses), list(params)
+        if cursor:
+            page_clauses.append('(created_at, id) < (?, ?)')
+            page_params.extend(position)
+        sql = f"SELECT * FROM records WHERE {' AND '.join(page_clauses)} ORDER BY created_at DESC, id DESC LIMIT ?"
+        rows = conn.execute(sql, page_params + [limit + 1]).fetchall()
+        next_cursor = _encode_records_cursor(rows[limit - 1]) if len(rows) > limit else None
+        return jsonify({
+            'items': [_row_to_dict(r) for r in rows[:limit]],
+            'next_cursor': next_cursor,
+            'since': since,
+        })
+    finally:
+        conn.close()
+
+@bp.route('/api/masrafci/records/changes', methods=['GET'])
+@login_required
+def masrafci_records_changes():
+    """Return records created or deleted after the ``since`` change sequence.
+
+    ``since`` is the opaque token from /records or a previous call; it is a per-user
+    counter assigned inside each write transaction, so commit order and cursor
+    order agree (a wall-clock updated_at could commit after a client synced past it).
+    """
+    since = request.args.get('since')
+    if since is None:
+        return jsonify({'error': 'since parametresi zorunludur'}), 400
+    try:
+        since_seq = int(since)
+    except ValueError:
+        return jsonify({'error': 'Geçersiz since'}), 400
+    conn = _get_masrafci_db()
+    try:
+        clauses, params = _masrafci_filter_clauses(
+            session['user'], request.args.get('type'), request.args.get('month'))
+        clauses.append('change_seq > ?')
+        params.append(since_seq)
+        where_sql = ' AND '.join(clauses)
+
+        marker = conn.execute(
+            f"SELECT MAX(change_seq) AS latest, COUNT(*) AS cnt FROM records WHERE {where_sql}",
+            params
+        ).fetchone()
+        etag = hashlib.sha1(
+            f"{session['user']}|{request.query_string!r}|{marker['latest']}|{marker['cnt']}".encode('utf-8')
+        ).hexdigest()
+        if request.if_none_match.contains_weak(etag):
+            resp = Response(status=304)
+            resp.set_etag(etag)
+            return resp
+
+        rows = conn.execute(
+            f"SELECT * FROM records WHERE {where_sql} ORDER BY change_seq ASC",
+            params
+        ).fetchall()
+        resp = jsonify({
+            'items': [_row_to_dict(r) for r in rows if r['deleted_at'] is None],
+            'deleted': [r['id'] for r in rows if r['deleted_at'] is not None],
+            'since': str(marker['latest'] or since_seq),
+        })
+        resp.set_etag(etag)
+        return resp
+    finally:
+        conn.close()
+
+@bp.route('/api/masrafci/records', methods=['POST'])
+@login_required
+def masrafci_records_create():
+    data = request.get_json(silent=True) or {}
+    ad = (data.get('ad') or '').strip()
+    record_type = data.get('type', '')
+    if not ad:
+        return jsonify({'error': 'ad alanı zorunludur'}), 400
+    if record_type not in ('harcama', 'fatura', 'kredikarti', 'alacakli'):
+        return jsonify({'error': 'Geçersiz kayıt tipi'}), 400
+
+    filtered = {k: data[k] for k in _MASRAFCI_ALLOWED_FIELDS if k in data}
+    filtered['user'] = session['user']
+    filtered['updated_at'] = _masrafci_now()
+    if filtered.get('kurum'):
+        filtered['provider_key'] = _normalize_provider_key(filtered['kurum'])
+    if 'otomatik_odeme' in filtered:
+        filtered['otomatik_odeme'] = 1 if filtered['otomatik_odeme'] else 0
+
+    cols = list(filtered.keys())
+    placeholders = ', '.join(['?'] * len(cols))
+    col_names = ', '.join(cols)
+    values = [filtered[c] for c in cols]
+
+    conn = _get_masrafci_db()
+    try:
+        cur = conn.execute(f"INSERT INTO records ({col_names}, change_seq) VALUES ({placeholders}, ?)",
+                           values + [_next_change_seqs(conn, session['user'])])
+        _apply_masrafci_rollups(conn, 'id = ?', [cur.lastrowid])
+        conn.commit()
+        return jsonify({'success': True, 'id': cur.lastrowid}), 201
+    finally:
+        conn.close()
+
+# ── Ekstre (CSV) import ─────────────────────────────────────
+# Header'lar _normalize_provider_key ile normalize edilip bu tabloyla alanlara eslenir;
+# alan adiyla birebir ayni header'lar (ör. "aylik_tutar") dogrudan kabul edilir.
+_MASRAFCI_IMPORT_ALIASES = {
+    'aciklama': 'ad', 'islem aciklamasi': 'ad', 'islem': 'ad', 'description': 'ad',
+    'islem tutari': 'tutar', 'amount': 'tutar',
+    'islem tarihi': 'tarih', 'date': 'tarih',
+    'category': 'kategori',
+    'isyeri': 'kurum', 'merchant': 'kurum',
+    'taksit': 'taksit_sayisi', 'taksit sayisi': 'taksit_sayisi',
+    'kart no': 'kart',
+    'not': 'notlar',
+}
+MASRAFCI_IMPORT_MAX_ERRORS = 50
+# executemany tum satirlara ayni kolonlari yazdigi icin tablo default'lari elle verilir.
+_MASRAFCI_IMPORT_DEFAULTS = {'tutar': 0, 'durum': 'odenmedi', 'taksit_odenen': 0, 'otomatik_odeme': 0}
+
+def _parse_statement_amount(raw):
+    """Parse '1.234,56', '1,234.56', '-250' style amounts, keeping the sign."""
+    text = (raw or '').strip().replace('TL', '').replace('\u20ba', '').replace(' ', '')
+    if not text:
+        return None
+    if ',' in text and '.' in text:
+        if text.rfind(',') > text.rfind('.'):
+            text = text.replace('.', '').replace(',', '.')
+        else:
+            text = text.replace(',', '')
+    elif ',' in text:
+        text = text.replace(',', '.')
+    return float(text)
+
+def _parse_statement_date(raw):
+    text = (raw or '').strip()
+    for fmt in ('%Y-%m-%d', '%d.%m.%Y', '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%y'):
+        try:
+            return datetime.strptime(text[:10], fmt).date().isoformat()
+        except ValueError:
+            continue
+    raise ValueError(f'Geçersiz tarih: {raw}')
+
+def _build_import_columns(header, mapping):
+    columns = []
+    for name in header:
+        field = mapping.get(name)
+        if field is None:
+            key = _normalize_provider_key(name)
+            field = _MASRAFCI_IMPORT_ALIASES.get(key) or key.replace(' ', '_')
+        columns.append(field if field in _MASRAFCI_ALLOWED_FIELDS else None)
+    return columns
+
+def _iter_statement_rows(stream, mapping):
+    """Yield (line_no, record_dict or None, error) from a CSV stream without loading it whole."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    header_line = text.readline()
+    try:
+        dialect = csv.Sniffer().sniff(header_line, delimiters=';,\t|')
+    except csv.Error:
+        dialect = csv.excel
+    header = next(csv.reader([header_line], dialect), [])
+    columns = _build_import_columns([h.strip() for h in header], mapping)
+    for line_no, values in enumerate(csv.reader(text, dialect), start=2):
+        if not any(v.strip() for v in values):
+            continue
+        record = {}
+        try:
+            for field, value in zip(columns, values):
+                value = value.strip()
+                if field is None or value == '':
+                    continue
+                if field in ('tutar', 'aylik_tutar'):
+                    record[field] = _parse_statement_amount(value)
+                elif field in ('taksit_sayisi', 'taksit_odenen'):
+                    record[field] = int(value)
+                elif field == 'tarih':
+                    record[field] = _parse_statement_date(value)
+                elif field == 'otomatik_odeme':
+                    record[field] = 1 if value.lower() in ('1', 'true', 'evet', 'yes') else 0
+                else:
+                    record[field] = value
+        except ValueError as e:
+            yield line_no, None, str(e)
+            continue
+        yield line_no, record, None
+
+@bp.route('/api/masrafci/records/import', methods=['POST'])
+@login_required
+def masrafci_records_import():
+    """Import a bank / credit-card statement CSV.
+
+    Multipart form: ``file`` (CSV), optional ``type`` (default harcama) and
+    ``mapping`` (JSON object of CSV header -> record field). Rows already present
+    (same type, tarih, ad and tutar) are skipped, counting duplicates so that
+    repeated identical transactions in one statement are still imported.
+    Negative amounts (refunds, card payments) are credits, not expenses: they
+    are not imported and are reported as ``skipped_credit``.
+    """
+    upload = request.files.get('file')
+    if upload is None:
+        return jsonify({'error': 'file alanı zorunludur'}), 400
+    default_type = request.form.get('type', 'harcama')
+    if default_type not in ('harcama', 'fatura', 'kredikarti', 'alacakli'):
+        return jsonify({'error': 'Geçersiz kayıt tipi'}), 400
+    try:
+        mapping = json.loads(request.form.get('mapping') or '{}')
+    except json.JSONDecodeError:
+        return jsonify({'error': 'Geçersiz mapping'}), 400
+    if not isinstance(mapping, dict):
+        return jsonify({'error': 'Geçersiz mapping'}), 400
+
+    user = session['user']
+    now = _masrafci_now()
+    rows = []
+    errors = []
+    skipped_credit = 0
+    for line_no, record, error in _iter_statement_rows(upload.stream, mapping):
+        if record is not None:
+            record.setdefault('type', default_type)
+            if not record.get('ad'):
+                error = 'ad alanı boş'
+            elif record['type'] not in ('harcama', 'fatura', 'kredikarti', 'alacakli'):
+                error = 'Geçersiz kayıt tipi'
+        if error:
+            if len(errors) < MASRAFCI_IMPORT_MAX_ERRORS:
+                errors.append({'line': line_no, 'error': error})
+            continue
+        # Iade / kart odemesi gibi alacak satirlari gider olarak yazilmaz.
+        if (record.get('tutar') or 0) < 0 or (record.get('aylik_tutar') or 0) < 0:
+            skipped_credit += 1
+            continue
+        for field, value in _MASRAFCI_IMPORT_DEFAULTS.items():
+            record.setdefault(field, value)
+        if record.get('tarih') and not record.get('ay'):
+            record['ay'] = record['tarih'][:7]
+        if record.get('kurum'):
+            record['provider_key'] = _normalize_provider_key(record['kurum'])
+        record['user'] = user
+        record['updated_at'] = now
+        rows.append(record)
+
+    conn = _get_masrafci_db()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        # Mevcut kayitlarla (type, tarih, ad, tutar) bazinda cokluk karsilastirmasi.
+        dates = [r['tarih'] for r in rows if r.get('tarih')]
+        existing = {}
+        if dates:
+            for r in conn.execute(
+                """SELECT type, tarih, ad, tutar FROM records
+                   WHERE user = ? AND deleted_at IS NULL AND tarih BETWEEN ? AND ?""",
+                (user, min(dates), max(dates))
+            ):
+                key = (r['type'], r['tarih'], r['ad'], r['tutar'])
+                existing[key] = existing.get(key, 0) + 1
+        to_insert = []
+        duplicates = 0
+        for record in rows:
+            key = (record['type'], record.get('tarih'), record['ad'], record.get('tutar'))
+            if existing.get(key, 0) > 0:
+                existing[key] -= 1
+                duplicates += 1
+                continue
+            to_insert.append(record)
+
+        if to_insert:
+            first_seq = _next_change_seqs(conn, user, len(to_insert))
+            for offset, record in enumerate(to_insert):
+                record['change_seq'] = first_seq + offset
+            cols = sorted({c for r in to_insert for c in r})
+            last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM records").fetchone()[0]
+            conn.executemany(
+                f"INSERT INTO records ({', '.join(cols)}) VALUES ({', '.join(['?'] * len(cols))})",
+                ([r.get(c) for c in cols] for r in to_insert)
+            )
+            _apply_masrafci_rollups(conn, 'user = ? AND id > ?', [user, last_id])
+        conn.commit()
+        return jsonify({
+            'success': True,
+            'imported': len(to_insert),
+            'duplicates': duplicates,
+            'skipped_credit': skipped_credit,
+            'errors': errors,
+        }), 201
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+@bp.route('/api/masrafci/records/<int:record_id>', methods=['DELETE'])
+@login_required
+def masrafci_records_delete(record_id):
+    conn = _get_masrafci_db()
+    try:
+        row = conn.execute(
+            "SELECT user FROM records WHERE id = ? AND deleted_at IS NULL", (record_id,)
+        ).fetchone()
+        if row is None:
+            return jsonify({'error': 'Kayıt bulunamadı'}), 404
+        if row['user'] != session['user']:
+            return jsonify({'error': 'Yetkiniz yok'}), 403
+        _apply_masrafci_rollups(conn, 'id = ?', [record_id], sign=-1)
+        # Silinen kayit tombstone olarak kalir ki delta sync istemcileri silmeyi gorsun.
+        now = _masrafci_now()
+        conn.execute(
+            "UPDATE records SET deleted_at = ?, updated_at = ?, change_seq = ? WHERE id = ?",
+            (now, now, _next_change_seqs(conn, row['user']), record_id)
+        )
+        conn.commit()
+        return jsonify({'success': True})
+    finally:
+        conn.close()
+
+@bp.route('/api/masrafci/summary', methods=['GET'])
+@login_required
+def masrafci_summary():
+    month = request.args.get('month')
+    user = session['user']
+    conn = _get_masrafci_db()
+    try:
+        params_base = [user]
+        month_clause = ''
+        if month:
+            month_clause = ' AND ay = ?'
+            params_base.append(month)
+        live_clause = f"{month_clause} AND deleted_at IS NULL"
+
+        # Toplam gider + kategori dagilimi: record_rollups'tan tek sorguda
+        rows = conn.execute(
+            f"SELECT kategori, SUM(toplam) AS total, SUM(adet) AS cnt FROM record_rollups WHERE user = ?{month_clause} GROUP BY kategori ORDER BY total DESC",
+            params_base
+        ).fetchall()
+        toplam_gider = sum(r['total'] for r in rows)
+        kategori_dagilimi = [{'kategori': r['kategori'] or 'Belirtilmemiş', 'toplam': r['total'], 'adet': r['cnt']} for r in rows]
+
+        # Yaklaşan faturalar (ödenmemiş)
+        faturalar = conn.execute(
+            f"SELECT * FROM records WHERE user = ? AND type = 'fatura' AND durum != 'odendi'{live_clause} ORDER BY son_odeme ASC LIMIT 5",
+            params_base
+        ).fetchall()
+
+        # Aktif taksitler
+        taksitler = conn.execute(
+            f"SELECT * FROM records WHERE user = ? AND type = 'kredikarti' AND taksit_sayisi > 0{live_clause} ORDER BY created_at DESC LIMIT 5",
+            params_base
+        ).fetchall()
+
+        # Son işlemler
+        son_islemler = conn.execute(
+            f"SELECT * FROM records WHERE user = ?{live_clause} ORDER BY created_at DESC LIMIT 10",
+            params_base
+        ).fetchall()
+
+        # Pending reminder sayisi
+        pending_count = conn.execute(
+            """SELECT COUNT(*) AS cnt FROM bill_reminder_events e
+               JOIN bill_reminder_rules r ON e.rule_id = r.id
+               WHERE r.user = ? AND e.month = ? AND e.status = 'pending'""",
+            (user, month or getCurrentMonth())
+        ).fetchone()['cnt']
+
+        return jsonify({
+            'toplam_gider': toplam_gider,
+            'kategori_dagilimi': kategori_dagilimi,
+            'yaklasan_faturalar': [_row_to_dict(r) for r in faturalar],
+            'aktif_taksitler': [_row_to_dict(r) for r in taksitler],
+            'son_islemler': [_row_to_dict(r) for r in son_islemler],
+            'pending_reminders': pending_count,
+        })
+    finally:
+        conn.close()
+
+
+def getCurrentMonth():
+    now = date.today()
+    return f"{now.year}-{now.month:02d}"
+
+
+_MONTH_PATTERN = re.compile(r'[0-9]{4}-[0-9]{2}')
+
+def _valid_month(text):
+    """True for a strict YYYY-MM string (strptime alone also accepts '2024-1')."""
+    if not isinstance(text, str) or not _MONTH_PATTERN.fullmatch(text):
+        return False
+    return 1 <= int(text[5:]) <= 12
+
+
+def _shift_month(month, delta):
+    year, mon = (int(p) for p in month.split('-'))
+    index = year * 12 + (mon - 1) + delta
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def _month_span(start, end):
+    months = []
+    current = start
+    while current <= end:
+        months.append(current)
+        current = _shift_month(current, 1)
+    return months
+
+
+MASRAFCI_REPORT_MAX_MONTHS = 120
+
+@bp.route('/api/masrafci/reports', methods=['GET'])
+@login_required
+def masrafci_reports():
+    """Monthly series for an arbitrary range, read from the rollup tables.
+
+    Query: ``from``/``to`` (YYYY-MM, default last 12 months), optional ``type``.
+    Every series is a list aligned with ``months``; ``yoy`` compares each month
+    with the same month one year earlier. ``by_kurum`` is keyed by provider_key,
+    with display names in ``kurum_names``.
+    """
+    end = request.args.get('to') or getCurrentMonth()
+    start = request.args.get('from') or _shift_month(end, -11)
+    record_type = request.args.get('type')
+    if not _valid_month(start) or not _valid_month(end):
+        return jsonify({'error': 'Geçersiz ay formatı (YYYY-MM)'}), 400
+    months = _month_span(start, end)
+    if not months or len(months) > MASRAFCI_REPORT_MAX_MONTHS:
+        return jsonify({'error': f'Aralık 1-{MASRAFCI_REPORT_MAX_MONTHS} ay olmalıdır'}), 400
+
+    user = session['user']
+    query_start = _shift_month(start, -12)
+    type_clause = ''
+    params = [user, query_start, end]
+    if record_type:
+        type_clause = ' AND type = ?'
+        params.append(record_type)
+
+    conn = _get_masrafci_db()
+    try:
+        rollups = conn.execute(
+            f"SELECT ay, kategori, type, toplam FROM record_rollups WHERE user = ? AND ay BETWEEN ? AND ?{type_clause}",
+            params
+        ).fetchall()
+        providers = conn.execute(
+            f"""SELECT ay, provider_key, MIN(TRIM(kurum)) AS kurum, SUM(toplam) AS toplam FROM provider_rollups
+                WHERE user = ? AND ay BETWEEN ? AND ?{type_clause} GROUP BY ay, provider_key
+                ORDER BY ay, provider_key""",
+            params
+        ).fetchall()
+    finally:
+        conn.close()
+
+    position = {m: i for i, m in enumerate(months)}
+    size = len(months)
+    toplam = [0.0] * size
+    previous = [0.0] * size
+    by_type = {}
+    by_kategori = {}
+    for r in rollups:
+        i = position.get(r['ay'])
+        if i is None:
+            j = position.get(_shift_month(r['ay'], 12))
+            if j is not None:
+                previous[j] += r['toplam']
+            continue
+        toplam[i] += r['toplam']
+        by_type.setdefault(r['type'], [0.0] * size)[i] += r['toplam']
+        by_kategori.setdefault(r['kategori'] or 'Belirtilmemiş', [0.0] * size)[i] += r['toplam']
+
+    # Seriler provider_key ile gruplanir; her anahtar icin aralikta ilk gorulen
+    # (kirpilmis) kurum yazilisi kurum_names'te tek gorunen ad olarak doner.
+    by_kurum = {}
+    kurum_names = {}
+    for r in providers:
+        i = position.get(r['ay'])
+        if i is None:
+            continue
+        kurum_names.setdefault(r['provider_key'], r['kurum'] or r['provider_key'])
+        by_kurum.setdefault(r['provider_key'], [0.0] * size)[i] += r['toplam']
+
+    delta = [cur - prev for cur, prev in zip(toplam, previous)]
+    delta_pct = [round(d / prev * 100, 2) if prev else None for d, prev in zip(delta, previous)]
+    return jsonify({
+        'months': months,
+        'toplam': toplam,
+        'by_type': by_type,
+        'by_kategori': by_kategori,
+        'by_kurum': by_kurum,
+        'kurum_names': kurum_names,
+        'yoy': {'previous': previous, 'delta': delta, 'delta_pct': delta_pct},
+    })
+
+
+# ── Nakit akisi projeksiyonu ─────────────────────────────────
+# Taksitler ve duzenli faturalar generator'larla sadece istenen pencere icin acilir;
+# maliyet pencere uzunluguyla orantilidir, gecmisin tamamiyla degil.
+MASRAFCI_FORECAST_MAX_MONTHS = 60
+MASRAFCI_MAX_TAKSIT = 36
+MASRAFCI_RECURRING_LOOKBACK = 3
+
+def _months_between(start, end):
+    sy, sm = (int(p) for p in start.split('-'))
+    ey, em = (int(p) for p in end.split('-'))
+    return (ey - sy) * 12 + (em - sm)
+
+def _iter_installment_obligations(rows, first_month, last_month):
+    """Yield the unpaid installments of each kredikarti row that fall in the window.
+
+    Installment ``i`` (0-based) of a row is due ``i`` months after its ``ay``; the
+    first ``taksit_odenen`` are already paid.
+    """
+    for row in rows:
+        base = row['ay']
+        count = row['taksit_sayisi'] or 0
+        amount = row['aylik_tutar'] or ((row['tutar'] or 0) / count if count else 0)
+        first = max(row['taksit_odenen'] or 0, _months_between(base, first_month))
+        last = min(count, _months_between(base, last_month) + 1)
+        for i in range(first, last):
+            yield {
+                'ay': _shift_month(base, i),
+                'kaynak': 'taksit',
+                'ad': row['ad'],
+                'tutar': amount,
+                'record_id': row['id'],
+                'taksit_no': i + 1,
+                'taksit_sayisi': count,
+            }
+
+def _iter_recurring_bill_obligations(rollups, first_month, last_month):
+    """Project each recently billed provider forward at its average monthly amount."""
+    history = {}
+    for r in rollups:
+        entry = history.setdefault(r['provider_key'], {'kurum': r['kurum'], 'months': {}})
+        entry['months'][r['ay']] = entry['months'].get(r['ay'], 0) + r['toplam']
+    for provider_key, entry in history.items():
+        amounts = entry['months']
+        average = sum(amounts.values()) / len(amounts)
+        start = max(first_month, _shift_month(max(amounts), 1))
+        for offset in range(max(0, _months_between(start, last_month) + 1)):
+            yield {
+                'ay': _shift_month(start, offset),
+                'kaynak': 'fatura',
+                'ad': entry['kurum'] or provider_key,
+                'tutar': average,
+                'provider_key': provider_key,
+            }
+
+@bp.route('/api/masrafci/forecast', methods=['GET'])
+@login_required
+def masrafci_forecast():
+    """Projected monthly obligations (installments + recurring bills).
+
+    Query: ``from`` (YYYY-MM, default current month) and ``months`` (default 6).
+    Installment rows and bill rollups whose ``ay`` is not YYYY-MM are left out
+    and counted in ``skipped``.
+    """
+    first_month = request.args.get('from') or getCurrentMonth()
+    months_count = request.args.get('months', 6, type=int)
+    if not _valid_month(first_month):
+        return jsonify({'error': 'Geçersiz ay formatı (YYYY-MM)'}), 400
+    if not months_count or not 1 <= months_count <= MASRAFCI_FORECAST_MAX_MONTHS:
+        return jsonify({'error': f'months 1-{MASRAFCI_FORECAST_MAX_MONTHS} arasında olmalıdır'}), 400
+    last_month = _shift_month(first_month, months_count - 1)
+
+    user = session['user']
+    # Duzenli faturalar bugune kadar girilmis son aylardan tahmin edilir.
+    lookback_end = min(last_month, getCurrentMonth())
+    lookback_start = _shift_month(lookback_end, -(MASRAFCI_RECURRING_LOOKBACK - 1))
+    conn = _get_masrafci_db()
+    try:
+        installments = conn.execute(
+            """SELECT id, ad, ay, tutar, taksit_sayisi, taksit_odenen, aylik_tutar
+               FROM records
+               WHERE user = ? AND type = 'kredikarti' AND ay BETWEEN ? AND ?
+                 AND taksit_sayisi > COALESCE(taksit_odenen, 0) AND deleted_at IS NULL""",
+            (user, _shift_month(first_month, -MASRAFCI_MAX_TAKSIT), last_month)
+        ).fetchall()
+        bills = conn.execute(
+            """SELECT ay, provider_key, kurum, toplam FROM provider_rollups
+               WHERE user = ? AND type = 'fatura' AND ay BETWEEN ? AND ?""",
+            (user, lookback_start, lookback_end)
+        ).fetchall()
+    finally:
+        conn.close()
+
+    # Elle/ice aktarimla bozuk girilmis ay (orn. '2024-1') 500 yerine atlanir.
+    # BETWEEN metin karsilastirmasi oldugu icin '2026-1' gibi degerler araliga girebilir.
+    valid_installments = [row for row in installments if _valid_month(row['ay'])]
+    valid_bills = [row for row in bills if _valid_month(row['ay'])]
+    skipped = len(installments) - len(valid_installments) + len(bills) - len(valid_bills)
+
+    months = [_shift_month(first_month, i) for i in range(months_count)]
+    position = {m: i for i, m in enumerate(months)}
+    totals = {'taksit': [0.0] * months_count, 'fatura': [0.0] * months_count}
+    obligations = []
+    for item in itertools.chain(
+        _iter_installment_obligations(valid_installments, first_month, last_month),
+        _iter_recurring_bill_obligations(valid_bills, first_month, last_month),
+    ):
+        totals[item['kaynak']][position[item['ay']]] += item['tutar']
+        obligations.append(item)
+    obligations.sort(key=lambda o: (o['ay'], o['kaynak'], o['ad'] or ''))
+
+    return jsonify({
+        'months': months,
+        'toplam': [a + b for a, b in zip(totals['taksit'], totals['fatura'])],
+        'taksit': totals['taksit'],
+        'fatura': totals['fatura'],
+        'obligations': obligations,
+        'skipped': skipped,
+    })
+
+
+# ── Disa aktarim (CSV / XLSX) ────────────────────────────────
+# Satirlar sunucu tarafi cursor'dan okunup generator ile akitilir; bellek kullanimi
+# kayit sayisindan bagimsizdir ve ilk byte hemen gonderilir.
+_MASRAFCI_EXPORT_COLUMNS = [
+    'id', 'type', 'ad', 'tutar', 'ay', 'tarih', 'kategori', 'kurum',
+    'odeme_yontemi', 'son_odeme', 'durum', 'taksit_sayisi', 'taksit_odenen',
+    'aylik_tutar', 'kart', 'otomatik_odeme', 'telefon', 'iban', 'abone_no',
+    'notlar', 'created_at',
+]
+MASRAFCI_EXPORT_CHUNK_ROWS = 500
+
+def _export_cell(value):
+    # Excel formul enjeksiyonuna karsi metin hucrelerini koru (OWASP CSV injection
+    # listesi). Sayilar str olmadigi icin negatif tutarlar sayi olarak kalir.
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@', '\t', '\r'):
+        return "'" + value
+    return value
+
+def _iter_export_rows(clauses, params):
+    conn = _get_masrafci_db()
+    try:
+        cur = conn.execute(
+            f"SELECT {', '.join(_MASRAFCI_EXPORT_COLUMNS)} FROM records WHERE {' AND '.join(clauses)} ORDER BY ay ASC, created_at ASC, id ASC",
+            params
+        )
+        while True:
+            rows = cur.fetchmany(MASRAFCI_EXPORT_CHUNK_ROWS)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
+def _generate_export_csv(row_chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';')
+    buffer.write('\ufeff')  # Excel'in UTF-8 algilamasi icin BOM
+    writer.writerow(_MASRAFCI_EXPORT_COLUMNS)
+    yield buffer.getvalue().encode('utf-8')
+    buffer.seek(0)
+    buffer.truncate()
+    for rows in row_chunks:
+        for row in rows:
+            writer.writerow([_export_cell(v) for v in row])
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+
+
+class _StreamSink(io.RawIOBase):
+    """Unseekable write target whose bytes are drained by a generator."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+_XLSX_STATIC_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Masrafci" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+def _xlsx_row(values):
+    cells = []
+    for value in values:
+        if value is None:
+            cells.append('<c/>')
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            cells.append(f'<c><v>{value}</v></c>')
+        else:
+            cells.append(f'<c t="inlineStr"><is><t>{xml_escape(str(_export_cell(value)))}</t></is></c>')
+    return f"<row>{''.join(cells)}</row>"
+
+def _generate_export_xlsx(row_chunks):
+    sink = _StreamSink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for name, content in _XLSX_STATIC_PARTS.items():
+            zf.writestr(name, content)
+        yield sink.drain()
+        with zf.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(_xlsx_row(_MASRAFCI_EXPORT_COLUMNS).encode('utf-8'))
+            for rows in row_chunks:
+                sheet.write(''.join(_xlsx_row(row) for row in rows).encode('utf-8'))
+                yield sink.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.drain()
+
+@bp.route('/api/masrafci/export', methods=['GET'])
+@login_required
+def masrafci_export():
+    """Stream records as CSV (default) or XLSX.
+
+    Query: ``format`` (csv|xlsx), optional ``type``, ``kategori`` and an
+    inclusive ``from``/``to`` month range (YYYY-MM).
+    """
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in ('csv', 'xlsx'):
+        return jsonify({'error': 'Geçersiz format'}), 400
+    clauses, params = _masrafci_filter_clauses(session['user'], request.args.get('type'), None)
+    clauses.append('deleted_at IS NULL')
+    if request.args.get('kategori'):
+        clauses.append('kategori = ?')
+        params.append(request.args['kategori'])
+    if request.args.get('from'):
+        clauses.append('ay >= ?')
+        params.append(request.args['from'])
+    if request.args.get('to'):
+        clauses.append('ay <= ?')
+        params.append(request.args['to'])
+
+    row_chunks = _iter_export_rows(clauses, params)
+    filename = f"masrafci_{date.today().isoformat()}.{export_format}"
+    if export_format == 'csv':
+        body, mimetype = _generate_export_csv(row_chunks), 'text/csv'
+    else:
+        body = _generate_export_xlsx(row_chunks)
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    resp = Response(body, mimetype=mimetype)
+    resp.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    resp.headers['Cache-Control'] = 'no-store'
+    return resp
+
+
+# ── Reminder API Endpoints ──────────────────────────────────
+
+@bp.route('/api/masrafci/reminder-rules', methods=['GET'])
+@login_required
+def masrafci_reminder_rules_list():
+    conn = _get_masrafci_db()
+    try:
+        rows = conn.execute(
+            "SELECT * FROM bill_reminder_rules WHERE user = ? ORDER BY display_name ASC",
+            (session['user'],)
+        ).fetchall()
+        result = []
+        for r in rows:
+            d = dict(r)
+            d['enabled'] = bool(d.get('enabled'))
+            result.append(d)
+        return jsonify(result)
+    finally:
+        conn.close()
+
+
+@bp.route('/api/masrafci/reminder-rules', methods=['POST'])
+@login_required
+def masrafci_reminder_rules_create():
+    data = request.get_json(silent=True) or {}
+    display_name = (data.get('display_name') or '').strip()
+    if not display_name:
+        return jsonify({'error': 'display_name zorunludur'}), 400
+
+    provider_key = _normalize_provider_key(display_name)
+    if not provider_key:
+        return jsonify({'error': 'Geçersiz kurum adı'}), 400
+
+    expected_start_day = data.get('expected_start_day', 1)
+    expected_end_day = data.get('expected_end_day', 28)
+    lead_days = data.get('lead_days', 3)
+
+    conn = _get_masrafci_db()
+    try:
+        conn.execute(
+            """INSERT INTO bill_reminder_rules
+               (user, provider_key, display_name, expected_start_day, expected_end_day, lead_days)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            (session['user'], provider_key, display_name, expected_start_day, expected_end_day, lead_days)
+        )
+        conn.commit()
+        _insert_due_reminder_events(conn, getCurrentMonth(), user=session['user'])
+        return jsonify({'success': True, 'provider_key': provider_key}), 201
+    except sqlite3.IntegrityError:
+        return jsonify({'error': 'Bu kurum için hatırlatıcı zaten mevcut'}), 409
+    finally:
+        conn.close()
+
+
+@bp.route('/api/masrafci/reminder-rules/<int:rule_id>', methods=['PATCH'])
+@login_required
+def masrafci_reminder_rules_update(rule_id):
+    data = request.get_json(silent=True) or {}
+    conn = _get_masrafci_db()
+    try:
+        rule = conn.execute(
+            "SELECT * FROM bill_reminder_rules WHERE id = ? AND user = ?",
+            (rule_id, session['user'])
+        ).fetchone()
+        if not rule:
+            return jsonify({'error': 'Kural bulunamadı'}), 404
+
+        allowed = {'display_name', 'enabled', 'expected_start_day', 'expected_end_day', 'lead_days', 'snooze_until'}
+        sets = []
+        params = []
+        for key in allowed:
+            if key in data:
+                val = data[key]
+                if key == 'enabled':
+                    val = 1 if val else 0
+                if key == 'display_name':
+                    pkey = _normalize_provider_key(val)
+                    sets.append('provider_key = ?')
+                    params.append(pkey)
+                sets.append(f'{key} = ?')
+                params.append(val)
+        if not sets:
+            return jsonify({'error': 'Güncellenecek alan yok'}), 400
+
+        sets.append("updated_at = datetime('now','localtime')")
+        params.extend([rule_id, session['user']])
+        conn.execute(
+            f"UPDATE bill_reminder_rules SET {', '.join(sets)} WHERE id = ? AND user = ?",
+            params
+        )
+        conn.commit()
+        _insert_due_reminder_events(conn, getCurrentMonth(), user=session['user'])
+        return jsonify({'success': True})
+    finally:
+        conn.close()
+
+
+@bp.route('/api/masrafci/reminders', methods=['GET'])
+@login_required
+def masrafci_reminders_list():
+    month = request.args.get('month', getCurrentMonth())
+    conn = _get_masrafci_db()
+    try:
+        rows = conn.execute("""
+            SELECT e.*, r.display_name, r.provider_key, r.expected_start_day, r.expected_end_day
+            FROM bill_reminder_events e
+            JOIN bill_reminder_rules r ON e.rule_id = r.id
+            WHERE r.user = ? AND e.month = ?
+            ORDER BY r.expected_start_day ASC
+        """, (session['user'], month)).fetchall()
+        return jsonify([dict(r) for r in rows])
+    finally:
+        conn.close()
+
+
+@bp.route('/api/masrafci/reminders/<int:event_id>/action', methods=['POST'])
+@login_required
+def masrafci_reminder_action(event_id):
+    data = request.get_json(silent=True) or {}
+    action = data.get('action', '')
+    if action not in ('add_now', 'snooze_3d', 'skip_month', 'disable_rule'):
+        return jsonify({'error': 'Geçersiz aksiyon'}), 400
+
+    conn = _get_masrafci_db()
+    try:
+        event = conn.execute("""
+            SELECT e.*, r.display_name, r.provider_key, r.user
+            FROM bill_reminder_events e
+            JOIN bill_reminder_rules r ON e.rule_id = r.id
+            WHERE e.id = ?
+        """, (event_id,)).fetchone()
+        if not event or event['user'] != session['user']:
+            return jsonify({'error': 'Event bulunamadı'}), 404
+
+        now_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+        if action == 'add_now':
+            conn.execute(
+                "UPDATE bill_reminder_events SET status = 'prompted', prompted_at = ? WHERE id = ?",
+                (now_str, event_id)
+            )
+            conn.commit()
+            return jsonify({
+                'success': True,
+                'redirect': 'add-record',
+                'display_name': event['display_name'],
+            })
+
+        elif action == 'snooze_3d':
+            snooze_date = (date.today() + timedelta(days=3)).isoformat()
+            conn.execute(
+                "UPDATE bill_reminder_rules SET snooze_until = ? WHERE id = ?",
+                (snooze_date, event['rule_id'])
+            )
+            conn.execute("DELETE FROM bill_reminder_events WHERE id = ?", (event_id,))
+            conn.commit()
+            return jsonify({'success': True})
+
+        elif action == 'skip_month':
+            conn.execute(
+                "UPDATE bill_reminder_events SET status = 'skipped_month', answered_at = ? WHERE id = ?",
+                (now_str, event_id)
+            )
+            conn.commit()
+            return jsonify({'success': True})
+
+        elif action == 'disable_rule':
+            conn.execute(
+                "UPDATE bill_reminder_rules SET enabled = 0 WHERE id = ?",
+                (event['rule_id'],)
+            )
+            conn.execute(
+                "UPDATE bill_reminder_events SET status = 'dismissed', answered_at = ? WHERE id = ?",
+                (now_str, event_id)
+            )
+            conn.commit()
+            return jsonify({'success': True})
+
+        return jsonify({'error': 'Bilinmeyen aksiyon'}), 400
+    finally:
+        conn.close()
+
+
+@bp.route('/api/masrafci/reminder-check/run', methods=['POST'])
+@login_required
+def masrafci_reminder_check_run():
+    data = request.get_json(silent=True) or {}
+    month = data.get('month', getCurrentMonth())
+    conn = _get_masrafci_db()
+    try:
+        pending = _run_reminder_check(conn, session['user'], month)
+        return jsonify(pending)
+    finally:
+        conn.close()
+
+
+
+@bp.route('/masrafci/')
+@login_required
+def masrafci():
+    manifest = _load_masrafci_manifest()
+    if manifest is None:
+        return render_template('module_placeholder.html',
+                             module_name="Masrafçı",
+                             module_icon="fa-wallet",
+                             active_page='masrafci',
+                             user=session.get('user'))
+    return render_template('page_masrafci.html',
+                         active_page='masrafci',
+                         user=session.get('user'),
+                         masrafci_js=manifest['js'],
+                         masrafci_css=manifest['css'])
@@ -0,0 +1,255 @@
+"""Nesting catalog: customers, materials, projects (JSON store) and their pages."""
+
+import json
+import os
+import time
+
+from flask import Blueprint, jsonify, render_template, request, session
+
+from app import NESTING_DATA_FILE, _observe_store, login_required
+
+bp = Blueprint('nesting', __name__)
+
+
+def load_nesting_data():
+    default_data = {"customers": [], "materials": [], "nesting_projects": []}
+    started = time.perf_counter()
+    try:
+        if os.path.exists(NESTING_DATA_FILE):
+            with open(NESTING_DATA_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+    except:
+        pass
+    finally:
+        _observe_store('nesting', 'load', started)
+    return default_data
+
+@bp.route('/nesting/')
+@login_required
+def nesting():
+    data = load_nesting_data()
+    return render_template('page_nesting.html', 
+                         active_page='nesting',
+                         user=session.get('user'),
+                         customers=data.get('customers', []),
+                         materials=data.get('materials', []),
+                         edge_bands=data.get('edge_bands', []),
+                         material_categories=data.get('material_categories', []))
+
+@bp.route('/nesting/projects')
+@login_required
+def nesting_projects():
+    data = load_nesting_data()
+    return render_template('page_nesting_projects.html', 
+                         active_page='nesting_list',
+                         user=session.get('user'),
+                         projects=data.get('nesting_projects', []),
+                         customers=data.get('customers', []))
+
+def save_nesting_data(data):
+    started = time.perf_counter()
+    try:
+        os.makedirs(os.path.dirname(NESTING_DATA_FILE), exist_ok=True)
+        with open(NESTING_DATA_FILE, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        return True
+    except:
+        return False
+    finally:
+        _observe_store('nesting', 'save', started)
+
+@bp.route('/api/nesting/project', methods=['POST'])
+@login_required
+def save_nesting_project():
+    try:
+        project_data = request.json
+        data = load_nesting_data()
+        
+        # Check if updating existing or creating new
+        project_id = project_data.get('id')
+        if project_id:
+            # Update existing
+            for i, p in enumerate(data['nesting_projects']):
+                if p['id'] == project_id:
+                    data['nesting_projects'][i] = project_data
+                    break
+        else:
+            # Create new with unique ID
+            import time
+            project_data['id'] = f"nest_{int(time.time())}"
+            project_data['created_at'] = time.strftime('%Y-%m-%d')
+            data['nesting_projects'].append(project_data)
+        
+        save_nesting_data(data)
+        return jsonify({'success': True, 'id': project_data['id']})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@bp.route('/api/nesting/project/<project_id>', methods=['GET'])
+@login_required
+def get_nesting_project(project_id):
+    data = load_nesting_data()
+    for p in data['nesting_projects']:
+        if p['id'] == project_id:
+            return jsonify(p)
+    return jsonify({'error': 'Project not found'}), 404
+
+@bp.route('/api/nesting/project/<project_id>', methods=['DELETE'])
+@login_required
+def delete_nesting_project(project_id):
+    data = load_nesting_data()
+    data['nesting_projects'] = [p for p in data['nesting_projects'] if p['id'] != project_id]
+    save_nesting_data(data)
+    return jsonify({'success': True})
+
+@bp.route('/api/nesting/materials', methods=['GET'])
+@login_required
+def get_materials():
+    data = load_nesting_data()
+    category = request.args.get('category')
+    materials = data.get('materials', [])
+    if category:
+        materials = [m for m in materials if m.get('category') == category]
+    return jsonify(materials)
+
+@bp.route('/api/nesting/customers', methods=['GET'])
+@login_required
+def get_customers():
+    data = load_nesting_data()
+    return jsonify(data.get('customers', []))
+
+# === CUSTOMER CRUD ===
+@bp.route('/api/customers', methods=['GET'])
+@login_required
+def api_get_customers():
+    data = load_nesting_data()
+    return jsonify(data.get('customers', []))
+
+@bp.route('/api/customers', methods=['POST'])
+@login_required
+def api_create_customer():
+    try:
+        customer = request.json
+        data = load_nesting_data()
+        import time
+        customer['id'] = f"cust_{int(time.time())}"
+        customer['created_at'] = time.strftime('%Y-%m-%d')
+        customer['status'] = 'active'
+        if 'customers' not in data:
+            data['customers'] = []
+        data['customers'].append(customer)
+        save_nesting_data(data)
+        return jsonify({'success': True, 'id': customer['id']})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@bp.route('/api/customers/<customer_id>', methods=['GET'])
+@login_required
+def api_get_customer(customer_id):
+    data = load_nesting_data()
+    for c in data.get('customers', []):
+        if c['id'] == customer_id:
+            return jsonify(c)
+    return jsonify({'error': 'Customer not found'}), 404
+
+@bp.route('/api/customers/<customer_id>', methods=['PUT'])
+@login_required
+def api_update_customer(customer_id):
+    try:
+        updated = request.json
+        data = load_nesting_data()
+        for i, c in enumerate(data.get('customers', [])):
+            if c['id'] == customer_id:
+                updated['id'] = customer_id
+                data['customers'][i] = updated
+                save_nesting_data(data)
+                return jsonify({'success': True})
+        return jsonify({'error': 'Customer not found'}), 404
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@bp.route('/api/customers/<customer_id>', methods=['DELETE'])
+@login_required
+def api_delete_customer(customer_id):
+    data = load_nesting_data()
+    data['customers'] = [c for c in data.get('customers', []) if c['id'] != customer_id]
+    save_nesting_data(data)
+    return jsonify({'success': True})
+
+# === MATERIAL CRUD ===
+@bp.route('/api/materials', methods=['GET'])
+@login_required
+def api_get_materials():
+    data = load_nesting_data()
+    category = request.args.get('category')
+    materials = data.get('materials', [])
+    if category:
+        materials = [m for m in materials if m.get('category') == category]
+    return jsonify(materials)
+
+@bp.route('/api/materials', methods=['POST'])
+@login_required
+def api_create_material():
+    try:
+        material = request.json
+        data = load_nesting_data()
+        import time
+        material['id'] = f"mat_{int(time.time())}"
+        material['status'] = 'active'
+        if 'materials' not in data:
+            data['materials'] = []
+        data['materials'].append(material)
+        save_nesting_data(data)
+        return jsonify({'success': True, 'id': material['id']})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@bp.route('/api/materials/<material_id>', methods=['PUT'])
+@login_required
+def api_update_material(material_id):
+    try:
+        updated = request.json
+        data = load_nesting_data()
+        for i, m in enumerate(data.get('materials', [])):
+            if m['id'] == material_id:
+                updated['id'] = material_id
+                data['materials'][i] = updated
+                save_nesting_data(data)
+                return jsonify({'success': True})
+        return jsonify({'error': 'Material not found'}), 404
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@bp.route('/api/materials/<material_id>', methods=['DELETE'])
+@login_required
+def api_delete_material(material_id):
+    data = load_nesting_data()
+    data['materials'] = [m for m in data.get('materials', []) if m['id'] != material_id]
+    save_nesting_data(data)
+    return jsonify({'success': True})
+
+@bp.route('/api/categories', methods=['GET'])
+@login_required
+def api_get_categories():
+    data = load_nesting_data()
+    return jsonify(data.get('material_categories', []))
+
+# === PAGE ROUTES ===
+@bp.route('/musteriler/')
+@login_required
+def musteriler():
+    data = load_nesting_data()
+    return render_template('page_musteriler.html', 
+                         user=session['user'], 
+                         active_page='musteriler',
+                         customers=data.get('customers', []))
+
+@bp.route('/malzemeler/')
+@login_required
+def malzemeler():
+    data = load_nesting_data()
+    return render_template('page_malzemeler.html', 
+                         user=session['user'], 
+                         active_page='malzemeler',
+                         materials=data.get('materials', []),
+                         categories=data.get('material_categories', []))
@@ -0,0 +1,321 @@
+"""TETRA: local process supervisor and the /tetra/ entry page."""
+
+import atexit
+import os
+import shlex
+import signal
+import subprocess
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+from xml.sax.saxutils import escape as xml_escape
+
+from flask import Blueprint, redirect
+
+from app import BASE_DIR, DATA_DIR, _health_monitor, _is_http_url, _stats_providers, app, login_required
+
+bp = Blueprint('tetra', __name__)
+
+# ── TETRA local supervisor ──────────────────────────────────
+# TETRA kapaliysa backend ve frontend surecleri arka planda baslatilir; hazir olma
+# durumu ustel geri cekilmeyle yoklanir ve /tetra/ yalnizca cache'lenmis durumu okur.
+TETRA_URL_DEFAULT = 'http://localhost:5173/'
+TETRA_HEALTH_URL_DEFAULT = 'http://localhost:3001/api/health'
+# Local: http://localhost:5173/  Production: /tetra-app/
+TETRA_URL = os.environ.get('TETRA_URL', TETRA_URL_DEFAULT)
+TETRA_HEALTH_URL = os.environ.get('TETRA_HEALTH_URL', TETRA_HEALTH_URL_DEFAULT)
+TETRA_AUTOSTART = os.environ.get('TETRA_AUTOSTART', 'auto').lower()
+TETRA_START_SCRIPT = os.environ.get(
+    'TETRA_START_SCRIPT',
+    os.path.join(BASE_DIR, 'start-tetra-local.bat')
+)
+TETRA_DIR = os.environ.get('TETRA_DIR', os.path.join(BASE_DIR, 'tetra'))
+# POSIX launcher komutlari; testte sahte surecler icin override edilebilir.
+TETRA_BACKEND_CMD = os.environ.get('TETRA_BACKEND_CMD', 'npm start')
+TETRA_FRONTEND_CMD = os.environ.get('TETRA_FRONTEND_CMD', 'npm run dev')
+try:
+    TETRA_READY_TIMEOUT_SEC = float(os.environ.get('TETRA_READY_TIMEOUT_SEC', '120'))
+    TETRA_MAX_RESTARTS = int(os.environ.get('TETRA_MAX_RESTARTS', '3'))
+except Exception:
+    TETRA_READY_TIMEOUT_SEC = 120.0
+    TETRA_MAX_RESTARTS = 3
+
+
+def _tetra_autostart_enabled():
+    if TETRA_AUTOSTART in ('1', 'true', 'yes', 'on'):
+        return True
+    if TETRA_AUTOSTART != 'auto':
+        return False
+    # auto: yalnizca yerel gelistirme kurulumunda (production'da TETRA_URL=/tetra-app/).
+    if not _is_http_url(TETRA_URL) or urlsplit(TETRA_URL).hostname not in ('localhost', '127.0.0.1'):
+        return False
+    if os.name == 'nt':
+        return os.path.exists(TETRA_START_SCRIPT)
+    return os.path.isdir(TETRA_DIR)
+
+
+class TetraSupervisor:
+    """Start TETRA's processes in a background thread and publish a cached readiness state.
+
+    States: idle -> starting -> ready. A managed process that exits is restarted with
+    exponential backoff up to ``max_restarts`` times, after which the state is failed.
+    """
+
+    BACKOFF_INITIAL = 0.25
+    BACKOFF_MAX = 8.0
+    WATCH_INTERVAL = 2.0
+    FAILED_COOLDOWN = 30.0
+
+    def __init__(self, components, probe, ready_timeout=120.0, max_restarts=3,
+                 log_dir=None, start_script=None):
+        # components: [{'name', 'cmd', 'cwd', 'health'}]; health is a HealthMonitor target name.
+        self.components = components
+        self.probe = probe
+        self.ready_timeout = ready_timeout
+        self.max_restarts = max_restarts
+        self.log_dir = log_dir
+        self.start_script = start_script
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._procs = {}
+        self._status = {'state': 'idle', 'message': None, 'attempts': 0, 'restarts': 0,
+                        'waiting_for': [], 'retry_after': None,
+                        'started_at': None, 'ready_at': None, 'failed_at': None}
+        self._failed_mono = None
+
+    def _set(self, **fields):
+        with self._lock:
+            self._status.update(fields)
+
+    def status(self):
+        with self._lock:
+            st = dict(self._status)
+            procs = dict(self._procs)
+        st['processes'] = {
+            name: {'pid': proc.pid, 'running': proc.poll() is None, 'returncode': proc.returncode}
+            for name, proc in procs.items()
+        }
+        return st
+
+    def ensure_started(self):
+        """Start the supervisor thread unless it is running or cooling down after a failure."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            if (self._status['state'] == 'failed' and self._failed_mono is not None
+                    and time.monotonic() - self._failed_mono < self.FAILED_COOLDOWN):
+                return False
+            self._stop.clear()
+            self._status.update(state='starting', message=None, restarts=0,
+                                started_at=datetime.now().isoformat(timespec='seconds'))
+            self._thread = threading.Thread(target=self._run, name='tetra-supervisor', daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        with self._lock:
+            procs = list(self._procs.values())
+            self._procs.clear()
+        for proc in procs:
+            self._terminate(proc, timeout)
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._set(state='idle', waiting_for=[], retry_after=None)
+
+    @staticmethod
+    def _terminate(proc, timeout):
+        if proc.poll() is not None:
+            return
+        try:
+            if os.name == 'nt':
+                proc.terminate()
+            else:
+                # npm alt sureclerini de kapatmak icin tum surec grubuna sinyal gonderilir.
+                os.killpg(proc.pid, signal.SIGTERM)
+            proc.wait(timeout)
+        except subprocess.TimeoutExpired:
+            if os.name == 'nt':
+                proc.kill()
+            else:
+                os.killpg(proc.pid, signal.SIGKILL)
+            proc.wait()
+        except OSError:
+            pass
+
+    def _launch(self, comp):
+        args = shlex.split(comp['cmd'])
+        log = subprocess.DEVNULL
+        if self.log_dir:
+            os.makedirs(self.log_dir, exist_ok=True)
+            log = open(os.path.join(self.log_dir, f"tetra-{comp['name']}.log"), 'ab')
+        try:
+            if args[:1] == ['npm'] and not os.path.isdir(os.path.join(comp['cwd'], 'node_modules')):
+                subprocess.run(['npm', 'install'], cwd=comp['cwd'], stdout=log,
+                               stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, check=False)
+            return subprocess.Popen(args, cwd=comp['cwd'], stdout=log, stderr=subprocess.STDOUT,
+                                    stdin=subprocess.DEVNULL, start_new_session=True)
+        finally:
+            if log is not subprocess.DEVNULL:
+                log.close()
+
+    def _launch_missing(self):
+        if self.start_script:
+            # Windows: .bat her servisi kendi konsolunda baslatir; surec takibi yapilmaz.
+            subprocess.Popen(f'start "" "{self.start_script}"', shell=True)
+            return
+        for comp in self.components:
+            proc = self._procs.get(comp['name'])
+            if proc is not None and proc.poll() is None:
+                continue
+            if self.probe(comp['health']):
+                continue
+            proc = self._launch(comp)
+            with self._lock:
+                self._procs[comp['name']] = proc
+
+    def _exited(self):
+        with self._lock:
+            procs = list(self._procs.items())
+        for name, proc in procs:
+            if proc.poll() is not None:
+                return f'{name} exited with code {proc.returncode}'
+        return None
+
+    def _wait_ready(self):
+        """Probe readiness with exponential backoff; return None when ready or an error."""
+        deadline = time.monotonic() + self.ready_timeout
+        delay = self.BACKOFF_INITIAL
+        attempts = 0
+        while not self._stop.is_set():
+            attempts += 1
+            pending = [c['name'] for c in self.components if not self.probe(c['health'])]
+            if not pending:
+                return None
+            exited = self._exited()
+            if exited:
+                return exited
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return f"not ready after {self.ready_timeout:g}s: {', '.join(pending)}"
+            wait = min(delay, remaining)
+            self._set(attempts=attempts, waiting_for=pending, retry_after=round(wait, 2))
+            self._stop.wait(wait)
+            delay = min(delay * 2, self.BACKOFF_MAX)
+        return 'stopped'
+
+    def _watch(self):
+        """Block while TETRA stays up; return the reason it went down (None if stopped)."""
+        while not self._stop.wait(self.WATCH_INTERVAL):
+            exited = self._exited()
+            if exited:
+                return exited
+            if not self._procs and not all(self.probe(c['health']) for c in self.components):
+                return 'health check failed'
+        return None
+
+    def _run(self):
+        restarts = 0
+        while not self._stop.is_set():
+            try:
+                self._launch_missing()
+                error = self._wait_ready()
+            except Exception as e:
+                error = f'launch failed: {e}'
+            if self._stop.is_set():
+                return
+            if error is None:
+                self._set(state='ready', message=None, waiting_for=[], retry_after=None,
+                          ready_at=datetime.now().isoformat(timespec='seconds'))
+                error = self._watch()
+                if error is None:
+                    return
+            if restarts >= self.max_restarts or self.start_script:
+                with self._lock:
+                    procs = list(self._procs.values())
+                    self._procs.clear()
+                for proc in procs:
+                    self._terminate(proc, 5.0)
+                self._failed_mono = time.monotonic()
+                self._set(state='failed', message=error, waiting_for=[], retry_after=None,
+                          failed_at=datetime.now().isoformat(timespec='seconds'))
+                app.logger.warning('TETRA supervisor gave up: %s', error)
+                return
+            restarts += 1
+            backoff = min(self.BACKOFF_INITIAL * (2 ** (restarts + 2)), self.BACKOFF_MAX)
+            self._set(state='starting', message=error, restarts=restarts, retry_after=backoff)
+            app.logger.warning('TETRA restarting (%s/%s): %s', restarts, self.max_restarts, error)
+            self._stop.wait(backoff)
+
+
+_tetra_supervisor = TetraSupervisor(
+    components=[
+        {'name': 'backend', 'cmd': TETRA_BACKEND_CMD, 'cwd': os.path.join(TETRA_DIR, 'backend'),
+         'health': 'tetra_api'},
+        {'name': 'frontend', 'cmd': TETRA_FRONTEND_CMD, 'cwd': os.path.join(TETRA_DIR, 'app'),
+         'health': 'tetra'},
+    ],
+    probe=lambda name: _health_monitor.probe(name),
+    ready_timeout=TETRA_READY_TIMEOUT_SEC,
+    max_restarts=TETRA_MAX_RESTARTS,
+    log_dir=os.path.join(DATA_DIR, 'logs'),
+    start_script=TETRA_START_SCRIPT if os.name == 'nt' else None,
+)
+atexit.register(_tetra_supervisor.stop)
+_stats_providers['tetra'] = _tetra_supervisor.status
+
+_health_monitor.watch('tetra', TETRA_URL)
+_health_monitor.watch('tetra_api', TETRA_HEALTH_URL)
+
+
+@bp.route('/tetra/')
+@login_required
+def tetra():
+    """TETRA AI Münazara sistemi - standalone sayfaya yönlendir"""
+    # Durum supervisor/health monitor cache'inden okunur; baslatma arka planda yapilir.
+    status = _tetra_supervisor.status()
+    if status['state'] != 'ready' and not _health_monitor.status('tetra')['ok']:
+        if _tetra_autostart_enabled():
+            _tetra_supervisor.ensure_started()
+            status = _tetra_supervisor.status()
+        else:
+            _health_monitor.request_probe()
+        failed = status['state'] == 'failed'
+        refresh = '' if failed else (
+            f"<meta http-equiv='refresh' content='{max(1, min(5, int((status['retry_after'] or 3) + 0.999)))}'/>"
+        )
+        if failed:
+            detail = (f"<p>Startup failed: {xml_escape(status['message'] or '')}</p>"
+                      "<p>See data/logs/tetra-*.log, then reload this page to try again.</p>")
+        else:
+            waiting = ', '.join(status['waiting_for']) or 'services'
+            detail = (f"<p>Waiting for {xml_escape(waiting)}. This page will refresh in a few seconds.</p>"
+                      "<p>If it keeps loading, check that Node.js is installed.</p>")
+        return (
+            "<!DOCTYPE html>"
+            "<html lang='en'>"
+            "<head>"
+            "<meta charset='utf-8'/>"
+            "<meta name='viewport' content='width=device-width, initial-scale=1'/>"
+            f"{refresh}"
+            "<title>Starting TETRA...</title>"
+            "<style>"
+            "body{font-family:Arial,Helvetica,sans-serif;margin:0;display:flex;min-height:100vh;"
+            "align-items:center;justify-content:center;background:#0b1220;color:#e2e8f0}"
+            ".box{max-width:520px;padding:24px 28px;border:1px solid #1e293b;border-radius:12px;"
+            "background:#0f172a;box-shadow:0 10px 30px rgba(0,0,0,0.3)}"
+            "h1{margin:0 0 8px;font-size:20px}"
+            "p{margin:6px 0;color:#94a3b8;font-size:14px;line-height:1.5}"
+            "</style>"
+            "</head>"
+            "<body>"
+            "<div class='box'>"
+            f"<h1>{'TETRA could not start' if failed else 'Starting TETRA...'}</h1>"
+            f"{detail}"
+            "</div>"
+            "</body>"
+            "</html>"
+        ), 503 if failed else 200
+    return redirect(TETRA_URL)
@@ -0,0 +1,65 @@
+"""TOKIDB pages and the authenticated /api/tokidb/* proxy (see app._proxy_url)."""
+
+from flask import Blueprint, render_template, request, session
+
+from app import (
+    TOKIDB_BASE_URL, TOKIDB_PROXY_METHODS, _health_monitor, _proxy_url, _tokidb_breaker,
+    _tokidb_target_url, login_required
+)
+
+bp = Blueprint('tokidb', __name__)
+
+_health_monitor.watch(
+    'tokidb', f"{TOKIDB_BASE_URL}/health",
+    lambda ok: _tokidb_breaker.record_success() if ok else _tokidb_breaker.record_failure())
+
+
+@bp.route('/api/tokidb/health', methods=['GET'])
+@login_required
+def tokidb_health():
+    return _proxy_url(f"{TOKIDB_BASE_URL}/health")
+
+@bp.route('/api/tokidb/<path:subpath>', methods=TOKIDB_PROXY_METHODS)
+@login_required
+def tokidb_api_proxy(subpath):
+    return _proxy_url(_tokidb_target_url(subpath, request.query_string))
+
+@bp.route('/tokidb/')
+@login_required
+def tokidb_dashboard():
+    return render_template('tokidb/dashboard.html', user=session['user'], active_page='tokidb')
+
+@bp.route('/tokidb/projects')
+@login_required
+def tokidb_projects():
+    return render_template('tokidb/projects.html', user=session['user'], active_page='tokidb_projects')
+
+@bp.route('/tokidb/projects/<toki_id>')
+@login_required
+def tokidb_project_detail(toki_id):
+    return render_template('tokidb/project_detail.html', user=session['user'], active_page='tokidb_projects', toki_id=toki_id)
+
+@bp.route('/tokidb/cities')
+@login_required
+def tokidb_cities():
+    return render_template('tokidb/cities.html', user=session['user'], active_page='tokidb_cities')
+
+@bp.route('/tokidb/companies')
+@login_required
+def tokidb_companies():
+    return render_template('tokidb/companies.html', user=session['user'], active_page='tokidb_companies')
+
+@bp.route('/tokidb/companies/<name>')
+@login_required
+def tokidb_company_detail(name):
+    return render_template('tokidb/company_detail.html', user=session['user'], active_page='tokidb_companies', company_name=name)
+
+@bp.route('/tokidb/watchlist')
+@login_required
+def tokidb_watchlist():
+    return render_template('tokidb/watchlist.html', user=session['user'], active_page='tokidb_watchlist')
+
+@bp.route('/tokidb/admin')
+@login_required
+def tokidb_admin():
+    return render_template('tokidb/admin.html', user=session['user'], active_page='tokidb_admin')
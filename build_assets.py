@@ -0,0 +1,126 @@
+"""Fingerprint shared static assets and precompress them for immutable caching.
+
+    python build_assets.py
+
+Each asset in ASSETS is copied to static/dist/ under a content-hashed name
+(css/main.css -> css/main.3f9c2a71d0be.css) together with .gz and, when brotli is
+installed, .br variants. static/dist/manifest.json maps the source name to the
+hashed file (same "file" key as the Vite manifest used for masrafci); app.py
+resolves it through asset_url() in templates. Files of the previous build are
+kept so pages rendered just before a deploy can still load their assets; older
+ones are pruned.
+"""
+
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+
+try:
+    import brotli
+except ImportError:  # brotli opsiyonel; yoksa yalnizca .gz uretilir
+    brotli = None
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(SOURCE_DIR, 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+
+ASSETS = [
+    'css/main.css',
+    'js/nesting.js',
+    'js/ui.js',
+    'js/theme.js',
+]
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _read_manifest(path=MANIFEST_PATH):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _variant_files(hashed):
+    return [hashed, hashed + '.gz', hashed + '.br']
+
+
+def build_asset(name):
+    """Write the hashed copy and its compressed variants; returns the manifest entry."""
+    with open(os.path.join(STATIC_DIR, name), 'rb') as f:
+        data = f.read()
+    root, ext = os.path.splitext(name)
+    hashed = f'{root}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+    target = os.path.join(DIST_DIR, hashed)
+    entry = {
+        'file': hashed,
+        'size': len(data),
+        'integrity': 'sha384-' + base64.b64encode(hashlib.sha384(data).digest()).decode('ascii'),
+        'encodings': {},
+    }
+    # Ayni icerik ayni isme gider: degismeyen dosyalar yeniden yazilmaz.
+    if not os.path.exists(target):
+        _write_atomic(target, data)
+    variants = {'gzip': ('.gz', lambda: gzip.compress(data, compresslevel=9, mtime=0))}
+    if brotli is not None:
+        variants['br'] = ('.br', lambda: brotli.compress(data, quality=11))
+    for encoding, (suffix, compress) in variants.items():
+        path = target + suffix
+        if not os.path.exists(path):
+            compressed = compress()
+            if len(compressed) >= len(data):
+                continue
+            _write_atomic(path, compressed)
+        entry['encodings'][encoding] = os.path.getsize(path)
+    return entry
+
+
+def prune(keep):
+    removed = 0
+    for dirpath, _dirnames, filenames in os.walk(DIST_DIR):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            rel = os.path.relpath(path, DIST_DIR).replace(os.sep, '/')
+            if rel != 'manifest.json' and rel not in keep:
+                os.remove(path)
+                removed += 1
+    return removed
+
+
+def build_assets():
+    logging.info("🔨 Building static assets...")
+    previous = _read_manifest()
+    manifest = {}
+    for name in ASSETS:
+        entry = build_asset(name)
+        manifest[name] = entry
+        encodings = ', '.join(f'{enc} {size}' for enc, size in entry['encodings'].items())
+        changed = '' if previous.get(name, {}).get('file') == entry['file'] else ' (new)'
+        logging.info(f"   ↳ {name} -> {entry['file']} [{entry['size']} B; {encodings}]{changed}")
+    _write_atomic(MANIFEST_PATH, json.dumps(manifest, indent=2).encode('utf-8'))
+
+    keep = set()
+    for entries in (manifest, previous):
+        for entry in entries.values():
+            keep.update(_variant_files(entry['file']))
+    removed = prune(keep)
+    logging.info(f"✨ Manifest written to {os.path.relpath(MANIFEST_PATH, SOURCE_DIR)}"
+                 + (f", {removed} old files pruned" if removed else ''))
+    return manifest
+
+
+if __name__ == "__main__":
+    build_assets()
@@ -1,5 +1,8 @@
 import os
 import subprocess
+import sys
+
+import deploy_delta
 
 # AYARLAR
 SERVER_IP = "45.76.89.61"
@@ -26,21 +29,27 @@ print("="*50)
 
 # 1. Uzak sunucuda klasorleri olustur
 print("\n📁 [1/4] Sunucuda klasorler olusturuluyor...")
-run_command(f'ssh {USER}@{SERVER_IP} "mkdir -p {REMOTE_PATH}/templates"')
+run_command(f'ssh {USER}@{SERVER_IP} "mkdir -p {os.path.dirname(REMOTE_PATH)}"')
 
-# 2. Dosyalari SCP ile gonder
+# 2. Dosyalari gonder (yalnizca degisenler, yeni release dizinine)
 print("\n📤 [2/4] Dosyalar yukleniyor...")
 script_dir = os.path.dirname(os.path.abspath(__file__))
-run_command(f'scp "{os.path.join(script_dir, "app.py")}" {USER}@{SERVER_IP}:{REMOTE_PATH}/')
-run_command(f'scp -r "{os.path.join(script_dir, "templates")}" {USER}@{SERVER_IP}:{REMOTE_PATH}/')
-run_command(f'scp -r "{os.path.join(script_dir, "static")}" {USER}@{SERVER_IP}:{REMOTE_PATH}/')
+# Hash'li css/js + .gz/.br varyantlari static/dist'e uretilir (static ile birlikte gider).
+run_command(f'python "{os.path.join(script_dir, "build_assets.py")}"')
+# REMOTE_PATH bir release symlink'idir (deploy_delta.py); servis asagida yeniden baslatilir.
+try:
+    deploy_delta.deploy(deploy_delta.SSHTarget(f'{USER}@{SERVER_IP}', REMOTE_PATH), reload_command=None)
+except deploy_delta.DeployError as e:
+    print(f"  ❌ HATA: {e}")
+    sys.exit(1)
 
 # 3. Gerekli paketleri kur ve Servisi olustur
 print("\n⚙️  [3/4] Sunucu ayarlari yapiliyor...")
 setup_script = f'''
-apt install -y python3-pip python3-flask > /dev/null 2>&1
+apt install -y python3-pip python3-flask gunicorn > /dev/null 2>&1
 
-cat > /etc/systemd/system/{SERVICE_NAME}.service << SVCEOF
+# serve.py: gunicorn (preload + thread'li worker'lar). reload = SIGHUP ile kesintisiz yenileme.
+cat > /etc/systemd/system/{SERVICE_NAME}.service << 'SVCEOF'
 [Unit]
 Description=Mazzel Gateway
 After=network.target
@@ -48,7 +57,12 @@ After=network.target
 [Service]
 User=root
 WorkingDirectory={REMOTE_PATH}
-ExecStart=/usr/bin/python3 {REMOTE_PATH}/app.py
+Environment=MAZZEL_BIND=127.0.0.1:5000
+Environment=MAZZEL_THREADS=8
+ExecStart=/usr/bin/python3 {REMOTE_PATH}/serve.py
+ExecReload=/bin/kill -s HUP \\$MAINPID
+KillSignal=SIGTERM
+TimeoutStopSec=40
 Restart=always
 RestartSec=5
 
@@ -0,0 +1,338 @@
+"""Delta deploy: upload only changed files into a new release and switch to it atomically.
+
+    python deploy_delta.py                          # production over SSH (SERVER_IP / REMOTE_PATH)
+    python deploy_delta.py --dry-run                # list what would be uploaded/removed
+    python deploy_delta.py --local /tmp/gw/gateway  # deploy into a local directory (testing)
+    python deploy_delta.py --rollback               # switch back to the previous release
+
+Layout on the target; REMOTE_PATH stays the path systemd and nginx use:
+
+    /opt/mazzel/gateway -> /opt/mazzel/gateway-releases/20261019142501
+    /opt/mazzel/gateway-releases/<id>/     one tree per deploy, newest KEEP_RELEASES kept
+    /opt/mazzel/gateway-shared/data/       linked into every release as ./data
+
+Every release carries .deploy-manifest.json (sha256 + size per file). A deploy
+hashes the local files, compares them with the manifest of the live release,
+seeds the new release from it with hard links (cp -al) and uploads only new or
+changed files as --jobs parallel tar streams. Uploads are verified with
+sha256sum, then REMOTE_PATH is switched with a single rename (ln -s + mv -T) and
+the service is reloaded gracefully (SIGHUP, see serve.py); if the reload fails
+the symlink is switched back. The live tree is never written to, so an aborted
+deploy only leaves an unused release directory behind. Because releases share
+inodes through hard links, files in a release must never be edited in place.
+
+The first deploy onto an old flat install moves REMOTE_PATH to
+<id>-legacy under the releases dir and its data/ to the shared dir. SSH runs
+with BatchMode (parallel streams can't prompt), so key-based auth is required.
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import shlex
+import subprocess
+import sys
+import tarfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# AYARLAR
+SERVER_IP = "45.76.89.61"
+USER = "root"
+REMOTE_PATH = "/opt/mazzel/gateway"
+SERVICE_NAME = "mazzel-gateway"
+
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEPLOY_PATHS = ['app.py', 'serve.py', 'blueprints', 'templates', 'static']
+SKIP_DIRS = {'__pycache__'}
+SHARED_PATHS = ['data']
+MANIFEST_NAME = '.deploy-manifest.json'
+KEEP_RELEASES = 5
+RELOAD_COMMAND = f"systemctl reload {SERVICE_NAME} || systemctl restart {SERVICE_NAME}"
+
+
+class DeployError(Exception):
+    pass
+
+
+class Target:
+    """A deploy destination; every step is a POSIX shell script run through run()."""
+
+    def __init__(self, path):
+        self.path = path.rstrip('/')
+        self.releases = f'{self.path}-releases'
+        self.shared = f'{self.path}-shared'
+
+    def _argv(self, script):
+        raise NotImplementedError
+
+    def run(self, script, data=None, check=True):
+        proc = subprocess.run(self._argv(script), input=data or b'', capture_output=True)
+        if check and proc.returncode != 0:
+            raise DeployError(proc.stderr.decode('utf-8', 'replace').strip()
+                              or f'{script.splitlines()[-1][:80]!r} exit {proc.returncode}')
+        return proc.stdout.decode('utf-8', 'replace')
+
+    def upload(self, release_dir, files):
+        """Stream the given files (relative to SOURCE_DIR) as one tar into release_dir."""
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode='w:gz', compresslevel=6) as tar:
+            for rel in files:
+                tar.add(os.path.join(SOURCE_DIR, rel), arcname=rel, recursive=False)
+        self.run(f'tar -xzf - --no-same-owner -C {shlex.quote(release_dir)}', buffer.getvalue())
+
+
+class SSHTarget(Target):
+    def __init__(self, host, path):
+        super().__init__(path)
+        self.host = host
+
+    def __str__(self):
+        return f'{self.host}:{self.path}'
+
+    def _argv(self, script):
+        return ['ssh', '-o', 'BatchMode=yes', self.host, script]
+
+
+class LocalTarget(Target):
+    """Same shell steps as SSHTarget, run on this machine against a local directory."""
+
+    def __init__(self, path):
+        super().__init__(os.path.abspath(path))
+
+    def __str__(self):
+        return self.path
+
+    def _argv(self, script):
+        return ['sh', '-c', script]
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def local_manifest():
+    """{relative path: {'sha256', 'size'}} for everything in DEPLOY_PATHS."""
+    files = {}
+    for item in DEPLOY_PATHS:
+        root = os.path.join(SOURCE_DIR, item)
+        if os.path.isfile(root):
+            paths = [root]
+        else:
+            paths = []
+            for dirpath, dirnames, filenames in os.walk(root):
+                dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS)
+                paths.extend(os.path.join(dirpath, name) for name in sorted(filenames)
+                             if not name.endswith('.pyc'))
+        for path in paths:
+            rel = os.path.relpath(path, SOURCE_DIR).replace(os.sep, '/')
+            files[rel] = {'sha256': _sha256(path), 'size': os.path.getsize(path)}
+    return files
+
+
+def remote_manifest(target):
+    raw = target.run(f'cat {shlex.quote(target.path)}/{MANIFEST_NAME} 2>/dev/null || true')
+    try:
+        return json.loads(raw).get('files', {}) if raw.strip() else {}
+    except (ValueError, AttributeError):
+        return {}
+
+
+def diff_manifests(local, remote):
+    new = sorted(rel for rel in local if rel not in remote)
+    changed = sorted(rel for rel in local if rel in remote and remote[rel].get('sha256') != local[rel]['sha256'])
+    removed = sorted(rel for rel in remote if rel not in local)
+    return new, changed, removed
+
+
+def _batches(files, sizes, jobs):
+    # Dosyalar boyutca dengeli gruplara bolunur; her grup ayri bir tar akisi olur.
+    bins = [[0, []] for _ in range(max(1, min(jobs, len(files))))]
+    for rel in sorted(files, key=lambda rel: -sizes[rel]):
+        smallest = min(bins, key=lambda b: b[0])
+        smallest[0] += sizes[rel]
+        smallest[1].append(rel)
+    return [batch for _total, batch in bins if batch]
+
+
+def _quoted(paths):
+    return ' '.join(shlex.quote(path) for path in paths)
+
+
+def _prepare_script(target, release_dir, replaced):
+    current, q_release = shlex.quote(target.path), shlex.quote(release_dir)
+    lines = [
+        'set -e',
+        f'mkdir -p {shlex.quote(target.releases)}',
+        f'if [ -e {q_release} ]; then echo "release exists: {release_dir}" >&2; exit 1; fi',
+        # Canli release'ten hard link ile baslanir; degisen dosyalar once silinir ki
+        # tar yeni inode yazsin, eski release'ler etkilenmesin.
+        f'if [ -f {current}/{MANIFEST_NAME} ]; then cp -al {current}/. {q_release}; else mkdir -p {q_release}; fi',
+        f'rm -f {q_release}/{MANIFEST_NAME}',
+    ]
+    if replaced:
+        lines.append(f'cd {q_release} && rm -f -- {_quoted(replaced)}')
+    for name in SHARED_PATHS:
+        lines += [f'rm -rf {q_release}/{name}',
+                  f'ln -s {shlex.quote(target.shared)}/{name} {q_release}/{name}']
+    lines.append(f'find {q_release} -mindepth 1 -type d -empty -delete')
+    return '\n'.join(lines)
+
+
+def _switch_script(target, release_dir, release_id):
+    current, shared = shlex.quote(target.path), shlex.quote(target.shared)
+    tmp_link = shlex.quote(f'{target.path}.next-{release_id}')
+    lines = ['set -e', f'mkdir -p {shlex.quote(target.releases)} {shared}']
+    # Eski duz kurulum: dizin release olarak saklanir, data/ paylasilan dizine tasinir.
+    # Paylasilan dizin bos degilse rmdir hata verir ve hicbir sey degistirilmez.
+    lines.append(f'if [ -d {current} ] && [ ! -L {current} ]; then')
+    for name in SHARED_PATHS:
+        lines += [f'  if [ -d {current}/{name} ] && [ ! -L {current}/{name} ]; then',
+                  f'    if [ -d {shared}/{name} ]; then rmdir {shared}/{name}; fi',
+                  f'    mv {current}/{name} {shared}/{name}',
+                  f'    ln -s {shared}/{name} {current}/{name}',
+                  '  fi']
+    lines += [f"  mv {current} {shlex.quote(f'{target.releases}/{release_id}-legacy')}", 'fi']
+    lines += [f'mkdir -p {shared}/{name}' for name in SHARED_PATHS]
+    lines += [
+        f'readlink {current} || true',
+        f'ln -sfn {shlex.quote(release_dir)} {tmp_link}',
+        f'mv -T {tmp_link} {current}',
+    ]
+    return '\n'.join(lines)
+
+
+def _verify(target, release_dir, files, local):
+    output = target.run(f'cd {shlex.quote(release_dir)} && sha256sum -- {_quoted(files)}')
+    remote = {}
+    for line in output.splitlines():
+        digest, _sep, rel = line.partition('  ')
+        remote[rel] = digest
+    bad = [rel for rel in files if remote.get(rel) != local[rel]['sha256']]
+    if bad:
+        raise DeployError(f"sha256 mismatch after upload: {', '.join(bad[:5])}")
+
+
+def switch_release(target, release_dir, release_id, reload_command):
+    """Point target.path at release_dir and reload; switch back if the reload fails."""
+    previous = target.run(_switch_script(target, release_dir, release_id)).strip()
+    if not reload_command:
+        return previous
+    try:
+        target.run(reload_command)
+    except DeployError:
+        if previous:
+            target.run(_switch_script(target, previous, f'{release_id}-back'))
+            print(f"  ↩️  Reload basarisiz, onceki release'e donuldu: {previous}")
+        raise
+    return previous
+
+
+def prune_releases(target, keep=KEEP_RELEASES):
+    releases = shlex.quote(target.releases)
+    target.run(
+        f'cd {releases} && current=$(readlink {shlex.quote(target.path)} || true) && '
+        f'ls -1 | sort -r | tail -n +{keep + 1} | while read -r name; do '
+        f'[ "{target.releases}/$name" = "$current" ] || rm -rf -- "$name"; done')
+
+
+def deploy(target, jobs=4, dry_run=False, reload_command=RELOAD_COMMAND):
+    """Upload the changed files into a new release and switch to it. Returns the release dir (None if nothing changed)."""
+    started = time.time()
+    print(f"🔎 Dosyalar karsilastiriliyor ({target})...")
+    local = local_manifest()
+    remote = remote_manifest(target)
+    new, changed, removed = diff_manifests(local, remote)
+    upload = new + changed
+    upload_bytes = sum(local[rel]['size'] for rel in upload)
+    total_bytes = sum(entry['size'] for entry in local.values())
+    print(f"  {len(local)} dosya, {len(new)} yeni, {len(changed)} degisen, {len(removed)} silinen "
+          f"({upload_bytes / 1024:.1f} / {total_bytes / 1024:.1f} KB gonderilecek)")
+    if dry_run:
+        for prefix, files in (('+', new), ('~', changed), ('-', removed)):
+            for rel in files:
+                print(f"  {prefix} {rel}")
+        return None
+    if remote and not upload and not removed:
+        print("✅ Degisiklik yok, canli release ayni.")
+        return None
+
+    release_id = time.strftime('%Y%m%d%H%M%S')
+    release_dir = f'{target.releases}/{release_id}'
+    print(f"📁 Yeni release hazirlaniyor: {release_dir}")
+    target.run(_prepare_script(target, release_dir, changed + removed))
+    try:
+        if upload:
+            batches = _batches(upload, {rel: local[rel]['size'] for rel in upload}, jobs)
+            print(f"📤 {len(upload)} dosya {len(batches)} paralel akista gonderiliyor...")
+            with ThreadPoolExecutor(max_workers=len(batches)) as pool:
+                list(pool.map(lambda batch: target.upload(release_dir, batch), batches))
+            _verify(target, release_dir, upload, local)
+        manifest = {'release': release_id, 'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'files': local}
+        target.run(f'cat > {shlex.quote(release_dir)}/{MANIFEST_NAME}',
+                   json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    except BaseException:
+        # Yarim kalan release canliya hic alinmadi; temizlenir.
+        target.run(f'rm -rf {shlex.quote(release_dir)}', check=False)
+        raise
+
+    print("🔀 Release degistiriliyor" + (" ve servis yenileniyor (graceful reload)..." if reload_command else "..."))
+    switch_release(target, release_dir, release_id, reload_command)
+    prune_releases(target)
+    print(f"✅ Deploy tamam: {release_id} ({time.time() - started:.1f} saniye)")
+    return release_dir
+
+
+def rollback(target, reload_command=RELOAD_COMMAND):
+    """Switch back to the newest release older than the live one."""
+    current = target.run(f'readlink {shlex.quote(target.path)} || true').strip()
+    names = sorted(target.run(f'ls -1 {shlex.quote(target.releases)} 2>/dev/null || true').split())
+    older = [name for name in names if f'{target.releases}/{name}' < current]
+    if not current or not older:
+        raise DeployError("Geri donulecek onceki release yok.")
+    release_dir = f'{target.releases}/{older[-1]}'
+    print(f"↩️  {current} -> {release_dir}")
+    switch_release(target, release_dir, time.strftime('%Y%m%d%H%M%S') + '-rollback', reload_command)
+    return release_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--local', metavar='PATH', help='deploy into a local directory instead of SSH')
+    parser.add_argument('--host', default=f'{USER}@{SERVER_IP}')
+    parser.add_argument('--path', default=REMOTE_PATH, help='live path (symlink) on the target')
+    parser.add_argument('--jobs', type=int, default=4, help='parallel upload streams')
+    parser.add_argument('--dry-run', action='store_true')
+    parser.add_argument('--rollback', action='store_true')
+    parser.add_argument('--reload-command', default=None,
+                        help=f'run on the target after switching (default: "{RELOAD_COMMAND}"; '
+                             'none with --local); "" disables it')
+    parser.add_argument('--no-build', action='store_true', help='skip build_assets.py')
+    args = parser.parse_args()
+
+    target = LocalTarget(args.local) if args.local else SSHTarget(args.host, args.path)
+    reload_command = args.reload_command
+    if reload_command is None:
+        reload_command = None if args.local else RELOAD_COMMAND
+    try:
+        if args.rollback:
+            rollback(target, reload_command)
+            return 0
+        if not args.no_build:
+            # Hash'li css/js (static/dist) release ile birlikte gider.
+            subprocess.run([sys.executable, os.path.join(SOURCE_DIR, 'build_assets.py')], check=True)
+        deploy(target, args.jobs, args.dry_run, reload_command)
+    except (DeployError, subprocess.CalledProcessError) as e:
+        print(f"  ❌ HATA: {e}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,4 +1,4 @@
-import type { MasrafRecord, Summary, CreateRecordPayload, ReminderRule, ReminderEvent, CreateReminderRulePayload, ReminderAction } from './types';
+import type { MasrafRecord, RecordPage, RecordChanges, Summary, ReportSeries, Forecast, CreateRecordPayload, ReminderRule, ReminderEvent, CreateReminderRulePayload, ReminderAction } from './types';
 
 const BASE = '/api/masrafci';
 
@@ -11,12 +11,81 @@ async function request<T>(url: string, init?: RequestInit): Promise<T> {
   return res.json();
 }
 
-export function fetchRecords(params?: { type?: string; month?: string }): Promise<MasrafRecord[]> {
+const PAGE_SIZE = 200;
+
+interface RecordCacheEntry {
+  records: Map<number, MasrafRecord>;
+  since: string;
+  etag: string | null;
+}
+
+// Per-filter cache: after the first paged load only changed rows are fetched.
+const recordCache = new Map<string, RecordCacheEntry>();
+
+function recordQuery(params?: { type?: string; month?: string }): URLSearchParams {
   const sp = new URLSearchParams();
   if (params?.type) sp.set('type', params.type);
   if (params?.month) sp.set('month', params.month);
-  const qs = sp.toString();
-  return request(`${BASE}/records${qs ? '?' + qs : ''}`);
+  return sp;
+}
+
+function sortRecords(records: Iterable<MasrafRecord>): MasrafRecord[] {
+  return Array.from(records).sort((a, b) =>
+    a.created_at === b.created_at ? b.id - a.id : (a.created_at < b.created_at ? 1 : -1));
+}
+
+export function fetchRecordsPage(params?: { type?: string; month?: string }, cursor?: string, limit: number = PAGE_SIZE): Promise<RecordPage> {
+  const sp = recordQuery(params);
+  sp.set('limit', String(limit));
+  if (cursor) sp.set('cursor', cursor);
+  return request(`${BASE}/records?${sp.toString()}`);
+}
+
+async function loadAllRecords(params?: { type?: string; month?: string }): Promise<RecordCacheEntry> {
+  const records = new Map<number, MasrafRecord>();
+  let page = await fetchRecordsPage(params);
+  const since = page.since ?? '0';
+  for (;;) {
+    for (const r of page.items) records.set(r.id, r);
+    if (!page.next_cursor) break;
+    page = await fetchRecordsPage(params, page.next_cursor);
+  }
+  return { records, since, etag: null };
+}
+
+async function syncRecords(params: { type?: string; month?: string } | undefined, entry: RecordCacheEntry): Promise<void> {
+  const sp = recordQuery(params);
+  sp.set('since', entry.since);
+  const headers: Record<string, string> = {};
+  if (entry.etag) headers['If-None-Match'] = entry.etag;
+  const res = await fetch(`${BASE}/records/changes?${sp.toString()}`, { headers });
+  if (res.status === 304) return;
+  if (!res.ok) {
+    const body = await res.json().catch(() => ({}));
+    throw new Error(body.error || `HTTP ${res.status}`);
+  }
+  const changes: RecordChanges = await res.json();
+  for (const id of changes.deleted) entry.records.delete(id);
+  for (const r of changes.items) entry.records.set(r.id, r);
+  entry.since = changes.since;
+  entry.etag = res.headers.get('ETag');
+}
+
+export async function fetchRecords(params?: { type?: string; month?: string }): Promise<MasrafRecord[]> {
+  const key = recordQuery(params).toString();
+  let entry = recordCache.get(key);
+  if (entry) {
+    try {
+      await syncRecords(params, entry);
+    } catch {
+      entry = undefined;
+    }
+  }
+  if (!entry) {
+    entry = await loadAllRecords(params);
+    recordCache.set(key, entry);
+  }
+  return sortRecords(entry.records.values());
 }
 
 export function createRecord(data: CreateRecordPayload): Promise<{ success: boolean; id: number }> {
@@ -27,6 +96,22 @@ export function createRecord(data: CreateRecordPayload): Promise<{ success: bool
   });
 }
 
+export interface ImportResult {
+  success: boolean;
+  imported: number;
+  duplicates: number;
+  skipped_credit: number;
+  errors: { line: number; error: string }[];
+}
+
+export function importRecords(file: File, type: string = 'harcama', mapping?: Record<string, string>): Promise<ImportResult> {
+  const form = new FormData();
+  form.append('file', file);
+  form.append('type', type);
+  if (mapping) form.append('mapping', JSON.stringify(mapping));
+  return request(`${BASE}/records/import`, { method: 'POST', body: form });
+}
+
 export function deleteRecord(id: number): Promise<{ success: boolean }> {
   return request(`${BASE}/records/${id}`, { method: 'DELETE' });
 }
@@ -36,6 +121,32 @@ export function fetchSummary(month?: string): Promise<Summary> {
   return request(`${BASE}/summary${qs}`);
 }
 
+export function fetchReports(params?: { from?: string; to?: string; type?: string }): Promise<ReportSeries> {
+  const sp = new URLSearchParams();
+  if (params?.from) sp.set('from', params.from);
+  if (params?.to) sp.set('to', params.to);
+  if (params?.type) sp.set('type', params.type);
+  const qs = sp.toString();
+  return request(`${BASE}/reports${qs ? '?' + qs : ''}`);
+}
+
+export function fetchForecast(params?: { from?: string; months?: number }): Promise<Forecast> {
+  const sp = new URLSearchParams();
+  if (params?.from) sp.set('from', params.from);
+  if (params?.months) sp.set('months', String(params.months));
+  const qs = sp.toString();
+  return request(`${BASE}/forecast${qs ? '?' + qs : ''}`);
+}
+
+export function exportRecordsUrl(params?: { format?: 'csv' | 'xlsx'; type?: string; kategori?: string; from?: string; to?: string }): string {
+  const sp = new URLSearchParams();
+  for (const [key, value] of Object.entries(params ?? {})) {
+    if (value) sp.set(key, value);
+  }
+  const qs = sp.toString();
+  return `${BASE}/export${qs ? '?' + qs : ''}`;
+}
+
 export function fetchReminderRules(): Promise<ReminderRule[]> {
   return request(`${BASE}/reminder-rules`);
 }
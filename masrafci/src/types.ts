@@ -23,6 +23,20 @@ export interface MasrafRecord {
   abone_no: string | null;
   notlar: string | null;
   created_at: string;
+  updated_at: string | null;
+  deleted_at: string | null;
+}
+
+export interface RecordPage {
+  items: MasrafRecord[];
+  next_cursor: string | null;
+  since: string | null;
+}
+
+export interface RecordChanges {
+  items: MasrafRecord[];
+  deleted: number[];
+  since: string;
 }
 
 export interface KategoriDagilimi {
@@ -100,3 +114,37 @@ export interface CreateRecordPayload {
   abone_no?: string;
   notlar?: string;
 }
+
+export interface ReportSeries {
+  months: string[];
+  toplam: number[];
+  by_type: Record<string, number[]>;
+  by_kategori: Record<string, number[]>;
+  by_kurum: Record<string, number[]>;
+  kurum_names: Record<string, string>;
+  yoy: {
+    previous: number[];
+    delta: number[];
+    delta_pct: (number | null)[];
+  };
+}
+
+export interface ForecastObligation {
+  ay: string;
+  kaynak: 'taksit' | 'fatura';
+  ad: string;
+  tutar: number;
+  record_id?: number;
+  taksit_no?: number;
+  taksit_sayisi?: number;
+  provider_key?: string;
+}
+
+export interface Forecast {
+  months: string[];
+  toplam: number[];
+  taksit: number[];
+  fatura: number[];
+  obligations: ForecastObligation[];
+  skipped: number;
+}
@@ -0,0 +1,102 @@
+"""Production entry point: gunicorn with threaded workers and graceful reload.
+
+    python3 serve.py                     # systemd ExecStart (see deploy.py)
+    kill -HUP <master pid>               # zero-downtime reload (systemctl reload)
+
+The app is imported once in the master and forked into workers (preload). On
+SIGHUP the master re-imports app.py, starts fresh workers with the new code and
+lets the old ones finish their in-flight requests before exiting. Workers are
+recycled after MAZZEL_MAX_REQUESTS requests (+ jitter) to cap memory growth.
+
+Every open /api/notifications/stream holds a worker thread for up to
+NOTIFICATIONS_STREAM_MAX_SEC (default 25s), so workers * threads caps the
+number of concurrent notification listeners plus in-flight requests.
+
+Environment:
+    MAZZEL_BIND             listen address (default 0.0.0.0:5000)
+    MAZZEL_WORKERS          worker processes (default 2 * CPU + 1)
+    MAZZEL_THREADS          threads per worker (default 8)
+    MAZZEL_PRELOAD          import the app in the master before forking (default on)
+    MAZZEL_MAX_REQUESTS     recycle a worker after N requests, 0 = never (default 10000)
+    MAZZEL_TIMEOUT          silent-worker timeout in seconds (default 60)
+    MAZZEL_GRACEFUL_TIMEOUT seconds old workers get to finish on reload/stop (default 30)
+"""
+
+import importlib
+import multiprocessing
+import os
+import sys
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except Exception:
+        return default
+
+
+def gunicorn_options():
+    workers = _env_int('MAZZEL_WORKERS', multiprocessing.cpu_count() * 2 + 1)
+    max_requests = _env_int('MAZZEL_MAX_REQUESTS', 10000)
+    preload_raw = (os.environ.get('MAZZEL_PRELOAD') or 'on').lower().strip()
+    return {
+        'bind': os.environ.get('MAZZEL_BIND', '0.0.0.0:5000'),
+        'workers': max(1, workers),
+        'threads': max(1, _env_int('MAZZEL_THREADS', 8)),
+        'worker_class': 'gthread',
+        'preload_app': preload_raw in ('1', 'true', 'yes', 'on'),
+        'max_requests': max(0, max_requests),
+        # Tum worker'lar ayni anda geri donusturulmesin diye rastgele sapma.
+        'max_requests_jitter': max_requests // 10,
+        'timeout': _env_int('MAZZEL_TIMEOUT', 60),
+        'graceful_timeout': _env_int('MAZZEL_GRACEFUL_TIMEOUT', 30),
+        'keepalive': 5,
+        'accesslog': os.environ.get('MAZZEL_ACCESS_LOG') or None,
+        'errorlog': '-',
+        'proc_name': 'mazzel-gateway',
+    }
+
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:  # gunicorn yalnizca POSIX'te calisir
+    BaseApplication = None
+
+
+if BaseApplication is not None:
+    class GatewayApplication(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # Reload'da yeni kodun yuklenmesi icin app ve blueprint modulleri her seferinde taze import edilir.
+            for name in [name for name in sys.modules if name in ('app', 'blueprints') or name.startswith('blueprints.')]:
+                sys.modules.pop(name)
+            # deploy_delta.py: bu dizin release symlink'idir; chdir ve cache temizligi
+            # sayesinde HUP sonrasi symlink'in gosterdigi yeni release yuklenir.
+            os.chdir(os.path.dirname(os.path.abspath(__file__)))
+            importlib.invalidate_caches()
+            return importlib.import_module('app').app
+
+        def reload(self):
+            super().reload()
+            # Preload acikken gunicorn eski callable'i tutar; HUP yeni kodu yuklemez.
+            # Bosaltinca Arbiter.setup() load()'u tekrar cagirir.
+            self.callable = None
+
+
+def main():
+    if BaseApplication is None:
+        sys.exit("Production modu icin gunicorn gerekli: pip install gunicorn "
+                 "(Windows'ta gelistirme icin: python app.py)")
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    GatewayApplication(gunicorn_options()).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,29 @@
+"""Distribute the shared design system (base templates, includes, css/js) to modules.
+
+    python sync_design.py                 # sync every module in TARGET_MODULES
+    python sync_design.py --dry-run       # report what would change, write nothing
+    python sync_design.py --dry-run --diff
+    python sync_design.py --watch         # re-sync whenever a shared file changes
+    python sync_design.py teklif-app      # only the given modules
+
+Each target keeps a manifest (.design-sync.json) with the sha256, size and mtime
+of every file this script wrote there. Only files whose content differs from the
+source are rewritten (atomically, via a temp file + rename), so unchanged files
+keep their mtime and don't trigger rebuilds/hot reloads in the modules. Files
+listed in the manifest that no longer exist in the source are pruned, as is
+anything under a synced directory (e.g. templates/includes) that isn't in the
+source. Modules are synced in parallel.
+"""
+
+import argparse
+import difflib
+import hashlib
+import json
+import logging
 import os
 import shutil
-import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -8,6 +31,7 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 # Configuration
 SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODULES_DIR = os.path.join(os.path.dirname(SOURCE_DIR), 'modules')
+MANIFEST_NAME = '.design-sync.json'
 
 # List of modules to sync to
 # Each module should have a 'templates' folder and a 'static' folder structure
@@ -26,48 +50,266 @@ FILES_TO_SYNC = [
     # Add other shared assets here
 ]
 
-def sync_design():
-    logging.info("🚀 Starting Design System Sync...")
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_atomic(path, data, mode_from=None):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    if mode_from is not None:
+        shutil.copymode(mode_from, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _read_manifest(target_base):
+    try:
+        with open(os.path.join(target_base, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f).get('files', {})
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def collect_sources(hash_cache=None):
+    """Map every shared file to its destination path and content hash.
+
+    Returns (sources, errors): sources is {dst_rel: {'src', 'sha256', 'size',
+    'mtime_ns'}}. hash_cache ({src_path: (size, mtime_ns, sha256)}) lets watch
+    mode skip re-hashing files whose stat hasn't changed.
+    """
+    hash_cache = {} if hash_cache is None else hash_cache
+    sources, errors = {}, []
+    for item in FILES_TO_SYNC:
+        src_path = os.path.join(SOURCE_DIR, item['src'])
+        if not os.path.exists(src_path):
+            errors.append(f"Source file missing: {src_path}")
+            continue
+        if item.get('is_dir'):
+            pairs = []
+            for dirpath, _dirnames, filenames in os.walk(src_path):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    rel = os.path.relpath(path, src_path).replace(os.sep, '/')
+                    pairs.append((path, f"{item['dst']}/{rel}"))
+        else:
+            pairs = [(src_path, item['dst'])]
+        for path, dst_rel in sorted(pairs):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:  # editor kaydederken gecici olarak silinmis olabilir
+                continue
+            cached = hash_cache.get(path)
+            if cached is None or cached[:2] != (st.st_size, st.st_mtime_ns):
+                cached = (st.st_size, st.st_mtime_ns, _sha256(path))
+                hash_cache[path] = cached
+            sources[dst_rel] = {'src': path, 'sha256': cached[2], 'size': st.st_size,
+                                'mtime_ns': st.st_mtime_ns}
+    return sources, errors
+
+
+def _is_unchanged(dst_path, source, entry):
+    try:
+        st = os.stat(dst_path)
+    except FileNotFoundError:
+        return False
+    # Manifest kaydi ve stat tutuyorsa dosyayi okumaya gerek yok.
+    if (entry and entry.get('sha256') == source['sha256']
+            and entry.get('size') == st.st_size and entry.get('mtime_ns') == st.st_mtime_ns):
+        return True
+    return st.st_size == source['size'] and _sha256(dst_path) == source['sha256']
+
+
+def plan_module(target_base, sources, prune=True):
+    """Compare a target against the sources; returns the writes and removals needed."""
+    manifest = _read_manifest(target_base)
+    writes = []
+    for dst_rel, source in sources.items():
+        dst_path = os.path.join(target_base, dst_rel)
+        if not _is_unchanged(dst_path, source, manifest.get(dst_rel)):
+            writes.append((dst_rel, 'changed' if os.path.exists(dst_path) else 'new'))
+
+    stale = {rel for rel in manifest if rel not in sources}
+    # Senkronlanan klasorler (templates/includes) tamamen kaynaga aittir.
+    for item in FILES_TO_SYNC:
+        dst_dir = os.path.join(target_base, item['dst'])
+        if item.get('is_dir') and os.path.isdir(dst_dir):
+            for dirpath, _dirnames, filenames in os.walk(dst_dir):
+                for filename in filenames:
+                    rel = os.path.relpath(os.path.join(dirpath, filename), target_base).replace(os.sep, '/')
+                    if rel not in sources:
+                        stale.add(rel)
+    removes = sorted(rel for rel in stale if prune and os.path.lexists(os.path.join(target_base, rel)))
+    return {'manifest': manifest, 'writes': writes, 'removes': removes}
+
+
+def _text_diff(dst_path, src_path, dst_rel):
+    try:
+        with open(dst_path, 'r', encoding='utf-8') as f:
+            old = f.readlines()
+        with open(src_path, 'r', encoding='utf-8') as f:
+            new = f.readlines()
+    except (OSError, UnicodeDecodeError):
+        return ['   (binary or unreadable, diff skipped)']
+    return [line.rstrip('\n') for line in
+            difflib.unified_diff(old, new, f'a/{dst_rel}', f'b/{dst_rel}')]
+
+
+def _prune_empty_dirs(target_base):
+    for item in FILES_TO_SYNC:
+        dst_dir = os.path.join(target_base, item['dst'])
+        if not item.get('is_dir') or not os.path.isdir(dst_dir):
+            continue
+        for dirpath, _dirnames, _filenames in os.walk(dst_dir, topdown=False):
+            if dirpath != dst_dir and not os.listdir(dirpath):
+                os.rmdir(dirpath)
+
+
+def sync_module(module, sources, dry_run=False, show_diff=False, prune=True):
+    """Sync one module; returns a result dict (logged by the caller, not here,
+    so parallel runs don't interleave their output)."""
+    target_base = os.path.join(MODULES_DIR, module)
+    result = {'module': module, 'skipped': False, 'writes': [], 'removes': [],
+              'errors': [], 'diff': []}
+    if not os.path.exists(target_base):
+        result['skipped'] = True
+        return result
+
+    plan = plan_module(target_base, sources, prune)
+    result['writes'], result['removes'] = plan['writes'], plan['removes']
+    if dry_run:
+        if show_diff:
+            for dst_rel, reason in plan['writes']:
+                if reason == 'changed':
+                    result['diff'].extend(_text_diff(os.path.join(target_base, dst_rel),
+                                                     sources[dst_rel]['src'], dst_rel))
+        return result
+
+    writes = {dst_rel for dst_rel, _reason in plan['writes']}
+    # Budanmayan eski kayitlar (kaynak eksikken) manifest'te kalir.
+    manifest = {rel: entry for rel, entry in plan['manifest'].items()
+                if rel not in sources and rel not in plan['removes']}
+    for dst_rel, source in sources.items():
+        dst_path = os.path.join(target_base, dst_rel)
+        try:
+            if dst_rel in writes:
+                with open(source['src'], 'rb') as f:
+                    _write_atomic(dst_path, f.read(), mode_from=source['src'])
+            st = os.stat(dst_path)
+            manifest[dst_rel] = {'sha256': source['sha256'], 'size': st.st_size,
+                                 'mtime_ns': st.st_mtime_ns}
+        except OSError as e:
+            result['errors'].append(f"{dst_rel}: {e}")
+    for dst_rel in plan['removes']:
+        try:
+            os.remove(os.path.join(target_base, dst_rel))
+        except OSError as e:
+            result['errors'].append(f"{dst_rel}: {e}")
+    if plan['removes']:
+        _prune_empty_dirs(target_base)
+
+    if manifest != plan['manifest']:
+        data = json.dumps({'version': 1, 'files': manifest}, indent=2, sort_keys=True)
+        _write_atomic(os.path.join(target_base, MANIFEST_NAME), data.encode('utf-8'))
+    return result
+
+
+def _log_result(result, dry_run):
+    module = result['module']
+    if result['skipped']:
+        logging.warning(f"   ↳ Module directory {os.path.join(MODULES_DIR, module)} does not exist. Skipping.")
+        return
+    if not result['writes'] and not result['removes'] and not result['errors']:
+        logging.info(f"📦 {module}: up to date")
+        return
+    verb = 'would update' if dry_run else 'updated'
+    logging.info(f"📦 {module}: {verb} {len(result['writes'])}, "
+                 f"{'would remove' if dry_run else 'removed'} {len(result['removes'])}")
+    for dst_rel, reason in result['writes']:
+        logging.info(f"   {'+' if reason == 'new' else '~'} {dst_rel}")
+    for dst_rel in result['removes']:
+        logging.info(f"   - {dst_rel}")
+    for line in result['diff']:
+        logging.info(f"     {line}")
+    for error in result['errors']:
+        logging.error(f"   ❌ Error syncing {error}")
+
+
+def sync_design(modules=None, dry_run=False, show_diff=False, jobs=None, hash_cache=None):
+    logging.info("🚀 Starting Design System Sync..." + (" (dry run)" if dry_run else ''))
     logging.info(f"Source: {SOURCE_DIR}")
     logging.info(f"Modules Dir: {MODULES_DIR}")
 
     if not os.path.exists(MODULES_DIR):
+        if dry_run:
+            logging.warning(f"⚠️ Modules directory not found at {MODULES_DIR}.")
+            return True
         logging.warning(f"⚠️ Modules directory not found at {MODULES_DIR}. Creating it for simulation...")
         os.makedirs(MODULES_DIR, exist_ok=True)
 
-    for module in TARGET_MODULES:
-        target_base = os.path.join(MODULES_DIR, module)
-        logging.info(f"📦 Syncing to module: {module}")
+    sources, errors = collect_sources(hash_cache)
+    for error in errors:
+        logging.error(f"   ❌ {error}")
 
-        if not os.path.exists(target_base):
-            logging.warning(f"   ↳ Module directory {target_base} does not exist. Skipping.")
-            continue
+    # Eksik bir kaynak yuzunden hedefteki kopyasi silinmesin: hata varsa budama yapilmaz.
+    prune = not errors
+    modules = modules or TARGET_MODULES
+    with ThreadPoolExecutor(max_workers=jobs or min(8, len(modules)) or 1) as pool:
+        results = list(pool.map(lambda module: sync_module(module, sources, dry_run, show_diff, prune), modules))
+    for result in results:
+        _log_result(result, dry_run)
 
-        for item in FILES_TO_SYNC:
-            src_path = os.path.join(SOURCE_DIR, item['src'])
-            dst_path = os.path.join(target_base, item['dst'])
+    failed = bool(errors) or any(result['errors'] for result in results)
+    logging.info("⚠️ Sync finished with errors." if failed else "✨ Sync completed successfully!")
+    return not failed
 
-            try:
-                if not os.path.exists(src_path):
-                    logging.error(f"   ❌ Source file missing: {src_path}")
-                    continue
 
-                # Create destination directory if it doesn't exist
-                os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+def watch(interval=1.0, **options):
+    """Poll the shared files and re-sync when one of them changes (Ctrl+C to stop)."""
+    hash_cache = {}
+    last_signature = None
+    logging.info(f"👀 Watching design files every {interval:g}s (Ctrl+C to stop)")
+    try:
+        while True:
+            sources, _errors = collect_sources(hash_cache)
+            signature = {rel: source['sha256'] for rel, source in sources.items()}
+            if signature != last_signature:
+                if last_signature is not None:
+                    changed = sorted(set(signature.items()) ^ set(last_signature.items()))
+                    logging.info(f"🔄 Change detected: {', '.join(sorted({rel for rel, _ in changed}))}")
+                try:
+                    sync_design(hash_cache=hash_cache, **options)
+                except OSError as e:
+                    logging.error(f"   ❌ Sync failed: {e}")
+                last_signature = signature
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        logging.info("👋 Watch stopped.")
+
 
-                if item.get('is_dir'):
-                    if os.path.exists(dst_path):
-                        shutil.rmtree(dst_path)
-                    shutil.copytree(src_path, dst_path)
-                    logging.info(f"   ✅ Copied directory: {item['src']} -> {item['dst']}")
-                else:
-                    shutil.copy2(src_path, dst_path)
-                    logging.info(f"   ✅ Copied file: {item['src']} -> {item['dst']}")
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('modules', nargs='*', help='modules to sync (default: TARGET_MODULES)')
+    parser.add_argument('--dry-run', action='store_true', help='report changes without writing')
+    parser.add_argument('--diff', action='store_true', help='with --dry-run, show unified diffs')
+    parser.add_argument('--jobs', type=int, default=None, help='modules synced in parallel')
+    parser.add_argument('--watch', action='store_true', help='re-sync whenever a shared file changes')
+    parser.add_argument('--interval', type=float, default=1.0, help='watch poll interval in seconds')
+    args = parser.parse_args()
 
-            except Exception as e:
-                logging.error(f"   ❌ Error syncing {item['src']}: {str(e)}")
+    options = {'modules': args.modules or None, 'dry_run': args.dry_run,
+               'show_diff': args.diff, 'jobs': args.jobs}
+    if args.watch:
+        watch(args.interval, **options)
+        return 0
+    return 0 if sync_design(**options) else 1
 
-    logging.info("✨ Sync completed successfully!")
 
 if __name__ == "__main__":
-    sync_design()
+    raise SystemExit(main())
@@ -1,7 +1,10 @@
 import os
 import subprocess
+import sys
 import time
 
+import deploy_delta
+
 # AYARLAR
 SERVER_IP = "45.76.89.61"
 USER = "root"
@@ -26,17 +29,19 @@ start_time = time.time()
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 
-# 1. Python dosyasini gonder
-print("📤 app.py gonderiliyor...")
-run_command(f'scp "{os.path.join(script_dir, "app.py")}" {USER}@{SERVER_IP}:{REMOTE_PATH}/')
-
-# 2. HTML sablonlarini gonder
-print("📤 Templates gonderiliyor...")
-run_command(f'scp -r "{os.path.join(script_dir, "templates")}" {USER}@{SERVER_IP}:{REMOTE_PATH}/')
-
-# 3. Servisi yeniden baslat
-print("♻️  Servis yeniden baslatiliyor...")
-run_command(f'ssh {USER}@{SERVER_IP} "systemctl restart {SERVICE_NAME}"')
+# 1. Hash'li statik dosyalari uret (sablonlar bunlara referans verir)
+print("🔨 Statik dosyalar uretiliyor...")
+run_command(f'python "{os.path.join(script_dir, "build_assets.py")}"')
+
+# 2. Yalnizca degisen dosyalar yeni bir release dizinine gonderilir, symlink tek
+# hamlede cevrilir ve servis kesintisiz yenilenir (SIGHUP; olmazsa restart).
+# Reload basarisiz olursa onceki release'e geri donulur. Ayrinti: deploy_delta.py
+try:
+    deploy_delta.deploy(deploy_delta.SSHTarget(f'{USER}@{SERVER_IP}', REMOTE_PATH),
+                        reload_command=f"systemctl reload {SERVICE_NAME} || systemctl restart {SERVICE_NAME}")
+except deploy_delta.DeployError as e:
+    print(f"  ❌ HATA: {e}")
+    sys.exit(1)
 
 elapsed = time.time() - start_time
 print("-" * 40)